@@ -1,12 +1,197 @@
-from fastapi import APIRouter
-from app.models.analysis import AnalysisRequest, AnalysisResponse
-from app.services.analysis_service import run_analysis
+from time import perf_counter
+from typing import TYPE_CHECKING, Annotated, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from app.api.encoding import MSGPACK, VARY, Negotiated, body_response, encode, encoded_response, negotiate
+from app.models.analysis import (
+    AnalysisOptionsModel,
+    AnalysisRequest,
+    AnalysisResponse,
+    BatchAnalysisRequest,
+    IncrementalAnalysisRequest,
+    IncrementalAnalysisResponse,
+    SimulationRequest,
+    SimulationResponse,
+    StreamAnalysisParams,
+)
+from app.data.programs import get_program_index
+from app.models.records import analysis_to_dict
+from app.services.analysis_service import result_cache
+from app.services.incremental import InvalidState, decode_state, encode_state, update_analysis
+from app.services.metrics import SERIALIZATION_STAGE
+from app.services.offload import (
+    PoolSaturated,
+    iter_analysis_batch_async,
+    run_analysis_async,
+    run_analysis_batch_async,
+)
+from app.services.transcript_stream import RecordError, TranscriptStream
+
+if TYPE_CHECKING:
+    from app.services.cohort import CohortStats
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
+POOL_SATURATED = HTTPException(
+    status_code=429,
+    detail="Analysis workers are saturated, retry shortly",
+    headers={"Retry-After": "1"}
+)
+
+def _cohort(request: AnalysisOptionsModel) -> Optional["CohortStats"]:
+    """The cohort of the request's programme to rank against, if it asked for percentiles."""
+    if not request.percentiles:
+        return None
+    # Cohort statistics (and NumPy) load on first use, not at worker startup
+    from app.services.cohort import cohort_stats
+    return cohort_stats.for_program(request.program)
+
+def _ranked(request: AnalysisOptionsModel, result: dict) -> dict:
+    cohort = _cohort(request)
+    return cohort.annotate(result) if cohort is not None else result
+
 @router.post("/", response_model=AnalysisResponse)
-def analyze(request: AnalysisRequest):
-    return run_analysis(
-        current_phase=request.current_phase,
-        grades=request.grades
+async def analyze(request: AnalysisRequest, negotiated: Negotiated = Depends(negotiate)):
+    try:
+        result = await run_analysis_async(
+            current_phase=request.current_phase,
+            grades=request.grades,
+            options=request.analysis_options(),
+            cohort=_cohort(request),
+            program=request.program
+        )
+    except PoolSaturated:
+        raise POOL_SATURATED
+
+    started = perf_counter()
+    body = encode(analysis_to_dict(result), negotiated.media_type)
+    SERIALIZATION_STAGE.observe(perf_counter() - started)
+    return body_response(body, negotiated)
+
+@router.post("/stream", response_model=AnalysisResponse)
+async def analyze_stream(
+    request: Request,
+    params: Annotated[StreamAnalysisParams, Query()],
+    negotiated: Negotiated = Depends(negotiate),
+):
+    """Analyze a transcript uploaded as NDJSON grade records, streamed or chunked.
+
+    Records are validated and folded in as the body arrives, so memory does
+    not grow with the upload; the first invalid record ends it with a 422.
+    """
+    transcript = TranscriptStream(get_program_index(params.program))
+    try:
+        async for chunk in request.stream():
+            transcript.feed(chunk)
+        transcript.close()
+    except RecordError as e:
+        raise RequestValidationError(e.errors)
+
+    try:
+        result = await run_analysis_async(
+            current_phase=params.current_phase,
+            grades=transcript.transcript(),
+            options=params.analysis_options(),
+            cohort=_cohort(params),
+            program=params.program
+        )
+    except PoolSaturated:
+        raise POOL_SATURATED
+
+    started = perf_counter()
+    body = encode(analysis_to_dict(result), negotiated.media_type)
+    SERIALIZATION_STAGE.observe(perf_counter() - started)
+    return body_response(body, negotiated)
+
+@router.post("/batch", response_model=List[AnalysisResponse])
+async def analyze_batch(
+    batch: BatchAnalysisRequest,
+    stream: bool = Query(False, description="Stream results back as NDJSON (or concatenated MessagePack)"),
+    negotiated: Negotiated = Depends(negotiate),
+):
+    """Analyze many transcripts in one request.
+
+    Streamed results are sent uncompressed so each one reaches the client
+    as soon as it is ready.
+    """
+    try:
+        if not stream:
+            results = await run_analysis_batch_async(batch.requests)
+            body = encode(
+                [analysis_to_dict(_ranked(request, result)) for request, result in zip(batch.requests, results)],
+                negotiated.media_type,
+            )
+            return body_response(body, negotiated)
+        results = iter_analysis_batch_async(batch.requests)
+    except PoolSaturated:
+        raise POOL_SATURATED
+
+    media_type = negotiated.media_type
+    separator = b"" if media_type == MSGPACK else b"\n"
+
+    async def records():
+        requests = iter(batch.requests)
+        async for result in results:
+            yield encode(analysis_to_dict(_ranked(next(requests), result)), media_type) + separator
+
+    return StreamingResponse(
+        records(),
+        media_type=MSGPACK if media_type == MSGPACK else "application/x-ndjson",
+        headers={"Vary": VARY},
     )
+
+@router.post("/incremental", response_model=IncrementalAnalysisResponse)
+async def analyze_incremental(
+    request: IncrementalAnalysisRequest, negotiated: Negotiated = Depends(negotiate)
+):
+    """Update a previous analysis with added, changed or removed grades.
+
+    The work is proportional to the delta, so it runs inline.
+    """
+    try:
+        state = decode_state(request.state) if request.state else None
+    except InvalidState as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    current_phase = request.current_phase or (state.phase if state is not None else None)
+    if current_phase is None:
+        raise HTTPException(status_code=422, detail="current_phase is required when no state is sent")
+
+    try:
+        result, new_state = update_analysis(
+            state, current_phase, request.upsert, request.remove,
+            index=get_program_index(request.program), options=request.analysis_options(), program=request.program
+        )
+    except InvalidState as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = _ranked(request, result)
+
+    started = perf_counter()
+    payload = analysis_to_dict(result)
+    payload["state"] = encode_state(new_state)
+    body = encode(payload, negotiated.media_type)
+    SERIALIZATION_STAGE.observe(perf_counter() - started)
+    return body_response(body, negotiated)
+
+@router.post("/simulate", response_model=SimulationResponse)
+async def analyze_simulation(request: SimulationRequest, negotiated: Negotiated = Depends(negotiate)):
+    """Score ranges and required grades for courses not yet taken, in one request.
+
+    A bounded grade sweep, vectorized over the simulated courses, so it runs inline.
+    """
+    from app.services.simulation import SimulationError, simulate
+
+    try:
+        result = simulate(
+            request.current_phase, request.grades, request.simulate, request.fields,
+            index=get_program_index(request.program)
+        )
+    except SimulationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return encoded_response(result, negotiated)
+
+@router.get("/cache")
+def cache_stats():
+    """Hit/miss/eviction counters for the analysis result cache."""
+    return result_cache.stats()
@@ -0,0 +1,79 @@
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api.analysis import POOL_SATURATED
+from app.api.encoding import Negotiated, encoded_response, negotiate
+from app.models.analysis import AnalysisRequest, BatchAnalysisRequest, check_program
+from app.models.cohort import CohortDistribution, CohortIngestResponse
+from app.models.course import CourseCategory
+from app.services.offload import PoolSaturated, cohort_from_batch_async
+
+if TYPE_CHECKING:
+    from app.services.cohort import CohortStats
+
+router = APIRouter(prefix="/cohort", tags=["Cohort"])
+
+def _phase_counts(cohort: "CohortStats") -> Dict[str, int]:
+    return {str(phase): n for phase, n in sorted(cohort.transcripts.items())}
+
+@router.post("/ingest", response_model=CohortIngestResponse)
+async def ingest(batch: BatchAnalysisRequest, negotiated: Negotiated = Depends(negotiate)):
+    """Score a batch of transcripts and add their scores to the cohort.
+
+    Per-request options are ignored: every category and field is counted.
+    Programme transcripts are scored against, and counted in, their
+    programme's cohort.
+    """
+    from app.services.cohort import cohort_stats
+
+    requests = [
+        AnalysisRequest.model_construct(
+            program=r.program, current_phase=r.current_phase, grades=r.grades, detail="summary"
+        )
+        for r in batch.requests
+    ]
+    try:
+        stats = await cohort_from_batch_async(requests)
+    except PoolSaturated:
+        raise POOL_SATURATED
+    cohort_stats.merge(stats)
+    await asyncio.to_thread(cohort_stats.sync)
+    payload = {"ingested": len(requests), "transcripts": _phase_counts(cohort_stats)}
+    if cohort_stats.programs:
+        payload["programs"] = {
+            program: _phase_counts(cohort) for program, cohort in sorted(cohort_stats.programs.items())
+        }
+    return encoded_response(payload, negotiated)
+
+@router.get("/distribution", response_model=CohortDistribution)
+def distribution(
+    phase: int = Query(ge=1, le=3),
+    category: Optional[CourseCategory] = None,
+    field: Optional[str] = None,
+    program: Optional[str] = Query(None, description="Degree programme; omit for the default catalogue"),
+    score: Optional[float] = Query(None, ge=0, le=20, description="Also return this score's percentile rank"),
+    negotiated: Negotiated = Depends(negotiate),
+):
+    """Distribution of one category's averages or one field's scores in a phase."""
+    from app.services.cohort import QUANTILES, GradeHistogram, cohort_stats
+
+    if (category is None) == (field is None):
+        raise HTTPException(status_code=422, detail="Pass exactly one of category or field")
+    try:
+        check_program(program)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    kind, name = ("category", category.value) if category is not None else ("field", field)
+    histogram = cohort_stats.for_program(program).histogram(phase, kind, name) or GradeHistogram()
+
+    payload = {
+        "phase": phase,
+        kind: name,
+        "count": histogram.count,
+        "mean": histogram.mean(),
+        "quantiles": {f"p{q}": histogram.quantile(q / 100) for q in QUANTILES},
+        "histogram": histogram.distribution(),
+    }
+    if score is not None:
+        payload["percentile"] = histogram.percentile_rank(score)
+    return encoded_response(payload, negotiated)
@@ -1,21 +1,48 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
 from typing import List, Optional
+from app.api.encoding import Negotiated, VARY, encoded_response, negotiate
+from app.data.programs import UnknownProgram
 from app.models.course import Course, CourseCategory
-from app.services.course_service import get_courses, get_course_by_id
+from app.services.catalogue_cache import CACHE_CONTROL, catalogue_for, etag_matches
+from app.services.course_service import get_course_by_id
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
+PROGRAM = Query(None, description="Degree programme; omit for the default catalogue")
+PROGRAM_NOT_FOUND = HTTPException(status_code=404, detail="Program not found")
+
 @router.get("/", response_model=List[Course])
 def list_courses(
     phase: Optional[int] = Query(None, ge=1, le=3),
     category: Optional[CourseCategory] = None,
+    program: Optional[str] = PROGRAM,
+    if_none_match: Optional[str] = Header(None),
+    negotiated: Negotiated = Depends(negotiate),
 ):
-    return get_courses(phase=phase, category=category)
+    """List courses from the pre-serialized catalogue, honouring If-None-Match."""
+    try:
+        cache = catalogue_for(program)
+    except UnknownProgram:
+        raise PROGRAM_NOT_FOUND
+    cached = cache.get(phase=phase, category=category, negotiated=negotiated)
+    headers = {"ETag": cached.etag, "Cache-Control": CACHE_CONTROL, "Vary": VARY}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    if cached.content_encoding:
+        headers["Content-Encoding"] = cached.content_encoding
+    return Response(content=cached.body, media_type=negotiated.media_type, headers=headers)
 
 @router.get("/{course_id}", response_model=Course)
-def get_course(course_id: int):
+def get_course(
+    course_id: int,
+    program: Optional[str] = PROGRAM,
+    negotiated: Negotiated = Depends(negotiate),
+):
     """Fetch a single course by ID."""
-    course = get_course_by_id(course_id)
+    try:
+        course = get_course_by_id(course_id, program=program)
+    except UnknownProgram:
+        raise PROGRAM_NOT_FOUND
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
-    return course
+    return encoded_response(course.to_dict(), negotiated)
@@ -0,0 +1,140 @@
+"""Response encodings, negotiated from the Accept and Accept-Encoding headers.
+
+JSON is the default and is produced by orjson when it is installed;
+MessagePack is served when the client asks for it. Bodies at or above
+COMPRESSION_MIN_SIZE are compressed with brotli or gzip. Payloads are the
+plain dicts and lists the services already build, so nothing goes through
+pydantic or jsonable_encoder on the way out.
+"""
+import gzip
+import json
+from typing import Any, Dict, NamedTuple, Optional
+from fastapi import Request, Response
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+VARY = "Accept, Accept-Encoding"
+
+# Dynamic bodies favour speed; cached catalogue bodies are compressed once, harder
+_LEVELS = {"gzip": (6, 9), "br": (4, 9)}
+
+
+def dump_json(payload: Any) -> bytes:
+    """Compact UTF-8 JSON, matching what FastAPI would emit for the same data."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dump_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def encode(payload: Any, media_type: str) -> bytes:
+    return dump_msgpack(payload) if media_type == MSGPACK else dump_json(payload)
+
+
+def compress(body: bytes, coding: str, cached: bool = False) -> bytes:
+    level = _LEVELS[coding][cached]
+    if coding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _preferences(header: Optional[str]) -> Dict[str, float]:
+    """Map each token in an Accept-style header to its q-value."""
+    preferences: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        token, *params = part.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        preferences[token] = q
+    return preferences
+
+
+class Negotiated(NamedTuple):
+    """The representation chosen for a response."""
+
+    media_type: str = JSON
+    coding: Optional[str] = None
+
+    def wants_compression(self, body: bytes) -> bool:
+        return self.coding is not None and len(body) >= settings.compression_min_size
+
+    def headers(self, body: bytes) -> Dict[str, str]:
+        headers = {"Vary": VARY}
+        if self.wants_compression(body):
+            headers["Content-Encoding"] = self.coding
+        return headers
+
+
+def negotiate(request: Request) -> Negotiated:
+    """Pick the media type and content coding for a request (a FastAPI dependency).
+
+    MessagePack is chosen only when listed explicitly and preferred over JSON;
+    anything else gets JSON. Brotli wins a tie with gzip.
+    """
+    accept = _preferences(request.headers.get("accept"))
+    msgpack_q = max((accept.get(t, 0.0) for t in MSGPACK_TYPES), default=0.0)
+    media_type = MSGPACK if msgpack is not None and msgpack_q > 0 and msgpack_q > accept.get(JSON, 0.0) else JSON
+
+    encodings = _preferences(request.headers.get("accept-encoding"))
+    wildcard = encodings.get("*", 0.0)
+    br_q = encodings.get("br", wildcard) if brotli is not None else 0.0
+    gzip_q = encodings.get("gzip", wildcard)
+    coding = None
+    if br_q > 0 and br_q >= gzip_q:
+        coding = "br"
+    elif gzip_q > 0:
+        coding = "gzip"
+    return Negotiated(media_type, coding)
+
+
+def body_response(
+    body: bytes,
+    negotiated: Negotiated = Negotiated(),
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Response for an already-encoded body, compressed if it is large enough."""
+    all_headers = negotiated.headers(body)
+    if "Content-Encoding" in all_headers:
+        body = compress(body, negotiated.coding)
+    all_headers.update(headers or {})
+    return Response(content=body, status_code=status_code, media_type=negotiated.media_type, headers=all_headers)
+
+
+def encoded_response(
+    payload: Any,
+    negotiated: Negotiated = Negotiated(),
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    return body_response(encode(payload, negotiated.media_type), negotiated, status_code, headers)
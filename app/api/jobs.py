@@ -0,0 +1,103 @@
+import asyncio
+import json
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from app.api.encoding import MSGPACK, Negotiated, body_response, dump_json, encoded_response, negotiate
+from app.models.analysis import BatchAnalysisRequest
+from app.models.jobs import JobResultsPage, JobStatus
+from app.services.jobs import FINISHED, PROGRESS_INTERVAL, JobQueueFull, job_queue, job_to_dict
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+QUEUE_FULL = HTTPException(
+    status_code=429,
+    detail="Too many analysis jobs are pending, retry later",
+    headers={"Retry-After": "30"}
+)
+
+def _job(job_id: str) -> Dict[str, Any]:
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@router.post("/", response_model=JobStatus, status_code=202)
+def submit_job(batch: BatchAnalysisRequest, negotiated: Negotiated = Depends(negotiate)):
+    """Queue a cohort for background analysis and return its job id at once.
+
+    Takes the same body as POST /analysis/batch.
+    """
+    try:
+        job = job_queue.submit(batch.requests)
+    except JobQueueFull:
+        raise QUEUE_FULL
+    return encoded_response(
+        job_to_dict(job), negotiated, status_code=202, headers={"Location": f"/jobs/{job['id']}"}
+    )
+
+@router.get("/{job_id}", response_model=JobStatus)
+def get_job(job_id: str, negotiated: Negotiated = Depends(negotiate)):
+    """Status and progress of a job."""
+    return encoded_response(job_to_dict(_job(job_id)), negotiated)
+
+@router.get("/{job_id}/results", response_model=JobResultsPage)
+def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    negotiated: Negotiated = Depends(negotiate),
+):
+    """One page of a job's results, in submission order.
+
+    Pages fill in while the job runs; results are spliced in as they were
+    stored, without decoding them.
+    """
+    job = _job(job_id)
+    bodies = job_queue.store.results(job_id, offset, limit)
+    page = job_to_dict(job)
+    page["offset"] = offset
+    end = offset + len(bodies)
+    page["next_offset"] = end if end < job["total"] else None
+    if negotiated.media_type == MSGPACK:
+        page["results"] = [json.loads(body) for body in bodies]
+        return encoded_response(page, negotiated)
+    body = dump_json(page)[:-1] + b',"results":[' + b",".join(bodies) + b"]}"
+    return body_response(body, negotiated)
+
+@router.get("/{job_id}/events")
+async def stream_job(job_id: str):
+    """Progress as NDJSON: the job's status on every change, until it finishes."""
+    job = await asyncio.to_thread(job_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    async def events():
+        current, last = job, None
+        # A job that expires or is deleted mid-stream just ends it
+        while current is not None:
+            state = (current["status"], current["completed"])
+            if state != last:
+                yield dump_json(job_to_dict(current)) + b"\n"
+                last = state
+            if current["status"] in FINISHED:
+                return
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            current = await asyncio.to_thread(job_queue.store.get, job_id)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.delete("/{job_id}", response_model=JobStatus, responses={204: {"description": "Finished job deleted"}})
+def cancel_job(job_id: str, negotiated: Negotiated = Depends(negotiate)):
+    """Cancel a queued or running job, discarding its results.
+
+    A finished job is deleted instead, results and all.
+    """
+    job = _job(job_id)
+    if job["status"] in FINISHED:
+        job_queue.store.delete(job_id)
+        return Response(status_code=204)
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return encoded_response(job_to_dict(job), negotiated)
@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.data.programs import programs
+from app.services.analysis_service import analysis_flight, result_cache
+from app.services.jobs import job_queue
+from app.services.metrics import Gauge, registry
+from app.services.offload import analysis_pool
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry.register(Gauge("analysis_cache_hits_total", "Analysis result cache hits.",
+                        lambda: result_cache.hits, kind="counter"))
+registry.register(Gauge("analysis_cache_misses_total", "Analysis result cache misses.",
+                        lambda: result_cache.misses, kind="counter"))
+registry.register(Gauge("analysis_cache_evictions_total", "Analysis result cache evictions.",
+                        lambda: result_cache.evictions, kind="counter"))
+registry.register(Gauge("analysis_coalesced_total", "Analysis requests that shared an identical in-flight computation.",
+                        lambda: analysis_flight.coalesced, kind="counter"))
+registry.register(Gauge("analysis_coalesce_overflow_total",
+                        "Analysis requests computed separately because the waiter limit was reached.",
+                        lambda: analysis_flight.overflow, kind="counter"))
+registry.register(Gauge("analysis_in_flight_keys", "Distinct analyses currently being computed.",
+                        lambda: analysis_flight.in_flight))
+registry.register(Gauge("analysis_pool_in_flight", "Analysis jobs admitted to the process pool.",
+                        lambda: analysis_pool.in_flight))
+registry.register(Gauge("analysis_pool_rejected_total", "Analysis jobs rejected with 429.",
+                        lambda: analysis_pool.rejected, kind="counter"))
+registry.register(Gauge("analysis_jobs_pending", "Background analysis jobs queued or running in this process.",
+                        lambda: job_queue.pending))
+registry.register(Gauge("analysis_jobs_rejected_total", "Background analysis jobs rejected with 429.",
+                        lambda: job_queue.rejected, kind="counter"))
+registry.register(Gauge("programs_loaded", "Programme catalogues held in memory.",
+                        lambda: len(programs.loaded())))
+registry.register(Gauge("program_loads_total", "Programme catalogues loaded from PROGRAMS_DIR.",
+                        lambda: programs.loads, kind="counter"))
+registry.register(Gauge("program_evictions_total", "Programme catalogues evicted (LRU or idle).",
+                        lambda: programs.evictions, kind="counter"))
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request and analysis metrics."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
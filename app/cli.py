@@ -0,0 +1,395 @@
+"""Command-line tools.
+
+    python -m app.cli score transcripts.csv -o results.ndjson
+
+`seed-db` copies the built-in catalogue into the database at DATABASE_URL
+(after `alembic upgrade head`).
+
+`export-catalogue` writes the built-in catalogue to a JSON or YAML file for
+CATALOGUE_FILE.
+
+`build-snapshot` writes the built-in catalogue, or a validated catalogue
+file, as a snapshot for CATALOGUE_SNAPSHOT; run it as a build step.
+`build-image` compiles one into a memory-mapped image for CATALOGUE_IMAGE.
+
+`score` streams a registrar export (student_id, course_name, grade, phase)
+through the same scoring as POST /analysis, spread across worker processes,
+and writes results incrementally. Rows must be grouped by student_id, which
+is how registrar exports are ordered. Grades in memory are bounded by the
+chunk size; only the ids of students already seen are kept for the whole
+run, to reject a student whose rows are split.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from app.config import settings
+from app.data.curriculum import get_curriculum_index
+from app.models.analysis import AnalysisRequest, GradeInput
+from app.models.records import analysis_to_dict
+from app.services.analysis_service import run_analysis_batch
+from app.services.name_resolver import resolve_course_name
+
+REQUIRED_COLUMNS = ("student_id", "course_name", "grade", "phase")
+
+# (student_id, current_phase, [(course_name, grade), ...])
+Student = Tuple[str, int, List[Tuple[str, float]]]
+
+
+class InputError(Exception):
+    """Raised for malformed or unordered transcript files."""
+
+
+def _read_csv_rows(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or ())
+        if missing:
+            raise InputError(f"Missing columns: {', '.join(sorted(missing))}")
+        yield from reader
+
+
+def _read_parquet_rows(path: str, batch_size: int = 65536) -> Iterator[Dict[str, object]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise InputError("Reading Parquet requires pyarrow (pip install pyarrow)")
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=list(REQUIRED_COLUMNS)):
+        yield from batch.to_pylist()
+
+
+def read_rows(path: str, fmt: str) -> Iterator[Dict[str, object]]:
+    if fmt == "parquet":
+        return _read_parquet_rows(path)
+    return _read_csv_rows(path)
+
+
+def group_students(rows: Iterable[Dict[str, object]]) -> Iterator[Student]:
+    """Group consecutive rows by student; a student's phase is their highest row phase.
+
+    Every student id seen is kept (O(students) memory, a few dozen bytes per
+    id) so that rows for one student split across the file are rejected
+    rather than scored as two students.
+    """
+    seen = set()
+    current_id: Optional[str] = None
+    phase = 0
+    grades: List[Tuple[str, float]] = []
+
+    for line, row in enumerate(rows, start=2):
+        student_id = str(row["student_id"])
+        if student_id != current_id:
+            if current_id is not None:
+                yield current_id, phase, grades
+            if student_id in seen:
+                raise InputError(f"Row {line}: rows for student '{student_id}' are not contiguous")
+            seen.add(student_id)
+            current_id, phase, grades = student_id, 0, []
+        try:
+            row_phase, grade = int(row["phase"]), float(row["grade"])
+        except (TypeError, ValueError):
+            raise InputError(f"Row {line}: invalid grade or phase")
+        if not 0 <= grade <= 20:
+            raise InputError(f"Row {line}: grade must be between 0 and 20")
+        if not 1 <= row_phase <= 3:
+            raise InputError(f"Row {line}: phase must be between 1 and 3")
+        phase = max(phase, row_phase)
+        grades.append((str(row["course_name"]), grade))
+
+    if current_id is not None:
+        yield current_id, phase, grades
+
+
+def chunked(students: Iterable[Student], size: int) -> Iterator[List[Student]]:
+    chunk: List[Student] = []
+    for student in students:
+        chunk.append(student)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_chunk(chunk: List[Student]) -> List[Tuple[str, dict]]:
+    """Score a chunk of students; runs in worker processes."""
+    # Names are checked by the scorer itself, which ignores unknown courses,
+    # once case and spacing variants take the catalogue's spelling; grade
+    # bounds are still enforced by GradeInput
+    index = get_curriculum_index()
+    requests = [
+        AnalysisRequest.model_construct(
+            current_phase=phase,
+            grades=[
+                GradeInput(course_name=resolve_course_name(name, index) or name, grade=grade)
+                for name, grade in grades
+            ]
+        )
+        for _, phase, grades in chunk
+    ]
+    results = run_analysis_batch(requests)
+    return [
+        (student_id, analysis_to_dict(result))
+        for (student_id, _, _), result in zip(chunk, results)
+    ]
+
+
+def flatten(student_id: str, response: dict, fields: Iterable[str], categories: Iterable[str]) -> dict:
+    """One flat row per student for CSV/Parquet output."""
+    row = {
+        "student_id": student_id,
+        "phase": response["phase"],
+        "coverage": response["coverage"],
+        "confidence": response["confidence"],
+        "warnings": "; ".join(response.get("warnings") or []),
+    }
+    averages = {cs["category"]: cs["average_grade"] for cs in response["category_scores"]}
+    for category in categories:
+        row[f"{category} average"] = averages.get(category)
+    signals = {fs["field"]: fs for fs in response["field_signals"]}
+    for field in fields:
+        signal = signals.get(field)
+        row[f"{field} score"] = signal["score"] if signal else None
+        row[f"{field} signal"] = signal["signal_strength"] if signal else None
+    return row
+
+
+def _close_output(out: TextIO) -> None:
+    # Close the --output file; stdout is only flushed
+    if out is sys.stdout:
+        out.flush()
+    else:
+        out.close()
+
+
+class NdjsonWriter:
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def write(self, results: List[Tuple[str, dict]]) -> None:
+        for student_id, response in results:
+            self.out.write(json.dumps({"student_id": student_id, **response}) + "\n")
+
+    def close(self) -> None:
+        _close_output(self.out)
+
+
+class CsvWriter:
+    def __init__(self, out: TextIO, fields: List[str], categories: List[str]):
+        self.fields, self.categories = fields, categories
+        columns = list(flatten("", {
+            "phase": 0, "coverage": 0, "confidence": "", "category_scores": [], "field_signals": []
+        }, fields, categories))
+        self.writer = csv.DictWriter(out, fieldnames=columns)
+        self.writer.writeheader()
+        self.out = out
+
+    def write(self, results: List[Tuple[str, dict]]) -> None:
+        self.writer.writerows(flatten(s, r, self.fields, self.categories) for s, r in results)
+
+    def close(self) -> None:
+        _close_output(self.out)
+
+
+class ParquetWriter:
+    def __init__(self, path: str, fields: List[str], categories: List[str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise InputError("Writing Parquet requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.fields, self.categories = fields, categories
+        columns = [("student_id", pa.string()), ("phase", pa.int64()), ("coverage", pa.float64()),
+                   ("confidence", pa.string()), ("warnings", pa.string())]
+        columns += [(f"{c} average", pa.float64()) for c in categories]
+        for field in fields:
+            columns += [(f"{field} score", pa.float64()), (f"{field} signal", pa.string())]
+        self.schema = pa.schema(columns)
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, results: List[Tuple[str, dict]]) -> None:
+        rows = [flatten(s, r, self.fields, self.categories) for s, r in results]
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _infer_format(path: str, choices: Tuple[str, ...], default: str) -> str:
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    ext = {"jsonl": "ndjson", "pq": "parquet"}.get(ext, ext)
+    return ext if ext in choices else default
+
+
+def score(args: argparse.Namespace) -> int:
+    in_format = args.input_format or _infer_format(args.input, ("csv", "parquet"), "csv")
+    out_format = args.format or _infer_format(args.output or "", ("csv", "ndjson", "parquet"), "ndjson")
+
+    index = get_curriculum_index()
+    fields = list(index.fields)
+    categories = list(index.category_courses)
+
+    if out_format == "parquet":
+        if not args.output:
+            raise InputError("Parquet output needs --output")
+        writer = ParquetWriter(args.output, fields, categories)
+    else:
+        out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        writer = CsvWriter(out, fields, categories) if out_format == "csv" else NdjsonWriter(out)
+
+    chunks = chunked(group_students(read_rows(args.input, in_format)), args.chunk_size)
+    students = 0
+    started = time.perf_counter()
+
+    try:
+        if args.workers <= 0:
+            for chunk in chunks:
+                writer.write(score_chunk(chunk))
+                students += len(chunk)
+        else:
+            # Keep a bounded window of chunks in flight and write them in input order
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                pending: Deque[Future] = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(score_chunk, chunk))
+                    if len(pending) >= args.workers * 2:
+                        results = pending.popleft().result()
+                        writer.write(results)
+                        students += len(results)
+                while pending:
+                    results = pending.popleft().result()
+                    writer.write(results)
+                    students += len(results)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = students / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {students} students in {elapsed:.2f}s ({rate:,.0f} students/sec)", file=sys.stderr)
+    return 0
+
+
+def seed_db(args: argparse.Namespace) -> int:
+    from app.data.courses import COURSES
+    from app.data.fields import FIELDS
+    from app.db import create_catalogue_engine, write_catalogue
+
+    url = args.url or settings.database_url
+    if not url:
+        raise InputError("No database: pass --url or set DATABASE_URL")
+    engine = create_catalogue_engine(url)
+    try:
+        write_catalogue(engine, COURSES, FIELDS)
+    finally:
+        engine.dispose()
+    print(f"Wrote {len(COURSES)} courses and {len(FIELDS)} fields", file=sys.stderr)
+    return 0
+
+
+def export_catalogue(args: argparse.Namespace) -> int:
+    from app.data.catalogue_file import CatalogueFileError, write_catalogue_file
+    from app.data.courses import COURSES
+    from app.data.fields import FIELDS
+
+    try:
+        write_catalogue_file(args.path, COURSES, FIELDS, version=args.version)
+    except CatalogueFileError as e:
+        raise InputError(str(e))
+    print(f"Wrote {len(COURSES)} courses and {len(FIELDS)} fields to {args.path}", file=sys.stderr)
+    return 0
+
+
+def _read_catalogue(source: Optional[str]) -> Tuple[Sequence[object], Dict[str, Dict[str, float]]]:
+    if source:
+        from app.data.catalogue_file import CatalogueFileError, read_catalogue_file
+        try:
+            _, courses, fields = read_catalogue_file(source)
+        except CatalogueFileError as e:
+            raise InputError(str(e))
+        return courses, fields
+    from app.data.courses import COURSES
+    from app.data.fields import FIELDS
+    return COURSES, FIELDS
+
+
+def build_snapshot(args: argparse.Namespace) -> int:
+    from app.data.snapshot import write_snapshot
+
+    courses, fields = _read_catalogue(args.source)
+    version = write_snapshot(args.path, courses, fields)
+    print(f"Wrote {len(courses)} courses and {len(fields)} fields to {args.path} (version {version})",
+          file=sys.stderr)
+    return 0
+
+
+def build_image(args: argparse.Namespace) -> int:
+    from app.data.image import ImageError, write_image
+
+    courses, fields = _read_catalogue(args.source)
+    try:
+        version = write_image(args.path, courses, fields)
+    except ImageError as e:
+        raise InputError(str(e))
+    print(f"Wrote {len(courses)} courses and {len(fields)} fields to {args.path} (version {version})",
+          file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Career Signals command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = commands.add_parser("score", help="Score a transcript export (CSV or Parquet)")
+    score_parser.add_argument("input", help="Transcript file with student_id, course_name, grade, phase")
+    score_parser.add_argument("-o", "--output", help="Output file (default: NDJSON on stdout)")
+    score_parser.add_argument("--format", choices=("csv", "ndjson", "parquet"),
+                              help="Output format (default: from the output extension, else ndjson)")
+    score_parser.add_argument("--input-format", choices=("csv", "parquet"),
+                              help="Input format (default: from the input extension)")
+    score_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                              help="Worker processes; 0 scores in this process")
+    score_parser.add_argument("--chunk-size", type=int, default=1000, help="Students per worker task")
+    score_parser.set_defaults(handler=score)
+
+    seed_parser = commands.add_parser("seed-db", help="Write the built-in catalogue to the database")
+    seed_parser.add_argument("--url", help="Database URL (default: DATABASE_URL)")
+    seed_parser.set_defaults(handler=seed_db)
+
+    export_parser = commands.add_parser("export-catalogue", help="Write the built-in catalogue to a file")
+    export_parser.add_argument("path", help="Output file (.json or .yaml)")
+    export_parser.add_argument("--version", help="Version to record (default: content hash)")
+    export_parser.set_defaults(handler=export_catalogue)
+
+    snapshot_parser = commands.add_parser("build-snapshot", help="Write a catalogue snapshot for fast startup")
+    snapshot_parser.add_argument("path", help="Output snapshot file")
+    snapshot_parser.add_argument("--from", dest="source",
+                                 help="Catalogue file to snapshot (default: the built-in catalogue)")
+    snapshot_parser.set_defaults(handler=build_snapshot)
+
+    image_parser = commands.add_parser("build-image", help="Write a catalogue image shared by every worker")
+    image_parser.add_argument("path", help="Output image file")
+    image_parser.add_argument("--from", dest="source",
+                              help="Catalogue file to compile (default: the built-in catalogue)")
+    image_parser.set_defaults(handler=build_image)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except InputError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Runtime configuration, read from the environment (and .env)."""
+
+    # Memoized analysis results; 0 disables the cache
+    analysis_cache_size: int = field(default_factory=lambda: _env_int("ANALYSIS_CACHE_SIZE", 4096))
+    analysis_cache_ttl: float = field(default_factory=lambda: _env_float("ANALYSIS_CACHE_TTL", 900.0))
+
+    # Process pool for large transcripts and batches
+    analysis_pool_workers: int = field(default_factory=lambda: _env_int("ANALYSIS_POOL_WORKERS", os.cpu_count() or 2))
+    analysis_pool_queue: int = field(default_factory=lambda: _env_int("ANALYSIS_POOL_QUEUE", 16))
+    analysis_inline_max_grades: int = field(default_factory=lambda: _env_int("ANALYSIS_INLINE_MAX_GRADES", 200))
+    analysis_inline_max_batch: int = field(default_factory=lambda: _env_int("ANALYSIS_INLINE_MAX_BATCH", 8))
+
+    # Identical concurrent analyses share one computation; 0 turns coalescing off
+    analysis_coalesce_max_waiters: int = field(
+        default_factory=lambda: _env_int("ANALYSIS_COALESCE_MAX_WAITERS", 64)
+    )
+
+    # Responses at least this large are compressed when the client accepts gzip or brotli
+    compression_min_size: int = field(default_factory=lambda: _env_int("COMPRESSION_MIN_SIZE", 1024))
+
+    # HMAC key for incremental analysis states; shared by every worker
+    analysis_state_secret: str = field(default_factory=lambda: os.getenv("ANALYSIS_STATE_SECRET", ""))
+
+    # Catalogue database; unset serves the built-in catalogue in app/data
+    database_url: str = field(default_factory=lambda: os.getenv("DATABASE_URL", ""))
+    db_pool_size: int = field(default_factory=lambda: _env_int("DB_POOL_SIZE", 5))
+    db_max_overflow: int = field(default_factory=lambda: _env_int("DB_MAX_OVERFLOW", 10))
+    db_pool_pre_ping: bool = field(default_factory=lambda: _env_bool("DB_POOL_PRE_PING", True))
+    # Prebuilt catalogue snapshot (python -m app.cli build-snapshot) to start from
+    catalogue_snapshot: str = field(default_factory=lambda: os.getenv("CATALOGUE_SNAPSHOT", ""))
+    # Compiled catalogue image (python -m app.cli build-image), mapped and shared by every worker
+    catalogue_image: str = field(default_factory=lambda: os.getenv("CATALOGUE_IMAGE", ""))
+    # Versioned JSON/YAML/TOML catalogue, used when DATABASE_URL is unset
+    catalogue_file: str = field(default_factory=lambda: os.getenv("CATALOGUE_FILE", ""))
+    catalogue_refresh_interval: float = field(
+        default_factory=lambda: _env_float("CATALOGUE_REFRESH_INTERVAL", 30.0)
+    )
+
+    # One catalogue per degree programme, named <program>.snapshot/.json/.yaml/.toml
+    programs_dir: str = field(default_factory=lambda: os.getenv("PROGRAMS_DIR", ""))
+    program_cache_size: int = field(default_factory=lambda: _env_int("PROGRAM_CACHE_SIZE", 8))
+    program_idle_ttl: float = field(default_factory=lambda: _env_float("PROGRAM_IDLE_TTL", 600.0))
+
+    # Cohort statistics file shared by every server process; unset keeps them in memory
+    cohort_stats_file: str = field(default_factory=lambda: os.getenv("COHORT_STATS_FILE", ""))
+    cohort_sync_interval: float = field(default_factory=lambda: _env_float("COHORT_SYNC_INTERVAL", 60.0))
+
+    # Background cohort jobs; JOBS_DB is a SQLite file shared by every server process, unset keeps jobs in memory
+    jobs_db: str = field(default_factory=lambda: os.getenv("JOBS_DB", ""))
+    jobs_ttl: float = field(default_factory=lambda: _env_float("JOBS_TTL", 3600.0))
+    jobs_max_running: int = field(default_factory=lambda: _env_int("JOBS_MAX_RUNNING", 2))
+    jobs_max_pending: int = field(default_factory=lambda: _env_int("JOBS_MAX_PENDING", 32))
+    jobs_chunk_size: int = field(default_factory=lambda: _env_int("JOBS_CHUNK_SIZE", 500))
+    jobs_cleanup_interval: float = field(default_factory=lambda: _env_float("JOBS_CLEANUP_INTERVAL", 60.0))
+
+
+settings = Settings()
@@ -0,0 +1,190 @@
+"""Curriculum and field weights loaded from a versioned JSON, YAML or TOML file.
+
+    version = "2026-10-18"
+
+    [[courses]]
+    id = 1
+    course_name = "Entrepreneurial Management"
+    category = "Business"
+    phase = 1
+    credits = 3
+
+    [fields."Data Science"]
+    Data = 0.6
+    Programming = 0.3
+
+Courses keep file order, which is the catalogue order results follow.
+Replace the file atomically (write elsewhere, then rename) so a poll never
+sees it half-written; a file that fails to parse is skipped and retried.
+"""
+import json
+import logging
+import os
+import threading
+import tomllib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.data.curriculum import CurriculumIndex, catalogue_version, reload_curriculum
+from app.models.course import Course, CourseCategory
+from app.models.records import CourseRecord
+
+logger = logging.getLogger(__name__)
+
+Fields = Dict[str, Dict[str, float]]
+
+FORMATS = {".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml"}
+
+
+class CatalogueFileError(Exception):
+    """Raised for unreadable or invalid catalogue files."""
+
+
+def _format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise CatalogueFileError(f"Unsupported catalogue file type '{ext}' (use .json, .yaml or .toml)")
+    return FORMATS[ext]
+
+
+def _yaml():
+    # PyYAML is optional; JSON and TOML catalogues work without it
+    try:
+        import yaml
+    except ImportError:
+        raise CatalogueFileError("YAML catalogues need PyYAML (pip install pyyaml)")
+    return yaml
+
+
+def _parse(raw: bytes, fmt: str) -> Any:
+    if fmt == "json":
+        return json.loads(raw)
+    if fmt == "toml":
+        return tomllib.loads(raw.decode("utf-8"))
+    return _yaml().safe_load(raw)
+
+
+def _validate_fields(raw: Any) -> Fields:
+    if not isinstance(raw, dict):
+        raise CatalogueFileError("'fields' must map field names to category weights")
+    fields: Fields = {}
+    for name, weights in raw.items():
+        if not isinstance(weights, dict):
+            raise CatalogueFileError(f"Field '{name}' must map categories to weights")
+        fields[name] = {}
+        for category, weight in weights.items():
+            try:
+                category = CourseCategory(category).value
+            except ValueError:
+                raise CatalogueFileError(f"Field '{name}': unknown category '{category}'")
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+                raise CatalogueFileError(f"Field '{name}': weight for '{category}' must be a number")
+            fields[name][category] = float(weight)
+    return fields
+
+
+def read_catalogue_file(path: str) -> Tuple[str, List[CourseRecord], Fields]:
+    """Parse and validate a catalogue file into (version, courses, fields).
+
+    The version is the file's `version` key, or the content hash without one.
+    """
+    fmt = _format(path)
+    try:
+        with open(path, "rb") as f:
+            data = _parse(f.read(), fmt)
+    except CatalogueFileError:
+        raise
+    except Exception as e:
+        raise CatalogueFileError(f"Cannot read {path}: {e}") from e
+
+    if not isinstance(data, dict) or not isinstance(data.get("courses"), list):
+        raise CatalogueFileError("Catalogue file needs a 'courses' list and a 'fields' table")
+    try:
+        courses = [
+            CourseRecord.from_course(Course.model_validate(course), i)
+            for i, course in enumerate(data["courses"])
+        ]
+    except ValidationError as e:
+        raise CatalogueFileError(f"Invalid course: {e}") from e
+
+    names = [c.course_name for c in courses]
+    if len(set(names)) != len(names) or len({c.id for c in courses}) != len(courses):
+        raise CatalogueFileError("Course ids and names must be unique")
+
+    fields = _validate_fields(data.get("fields", {}))
+    version = data.get("version")
+    return (str(version) if version is not None else catalogue_version(courses, fields)), courses, fields
+
+
+def write_catalogue_file(path: str, courses: Sequence[Any], fields: Fields, version: Optional[str] = None) -> None:
+    """Write a catalogue as JSON or YAML, replacing the file atomically."""
+    fmt = _format(path)
+    records = [CourseRecord.from_course(c, i) for i, c in enumerate(courses)]
+    data = {
+        "version": version or catalogue_version(records, fields),
+        "courses": [c.to_dict() for c in records],
+        "fields": fields,
+    }
+    if fmt == "json":
+        text = json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+    elif fmt == "yaml":
+        text = _yaml().safe_dump(data, sort_keys=False, allow_unicode=True)
+    else:
+        raise CatalogueFileError("Writing TOML catalogues is not supported; use .json or .yaml")
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class FileCatalogue:
+    """Catalogue file watched by polling its mtime and size."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version: Optional[str] = None
+        self.loads = 0
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._content: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> Optional[CurriculumIndex]:
+        """Reload if the file changed; return the new index if it did.
+
+        An unchanged file costs one os.stat; a touched file with identical
+        content is parsed but not swapped in. On any error the previous
+        catalogue stays in place and the file is re-read on the next call.
+        """
+        with self._lock:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if not force and stamp == self._stamp:
+                return None
+            version, courses, fields = read_catalogue_file(self.path)
+            self._stamp = stamp
+            content = catalogue_version(courses, fields)
+            if not force and content == self._content:
+                return None
+
+            index = reload_curriculum(courses, fields)
+            self.version, self._content = version, content
+            self.loads += 1
+            logger.info("Loaded catalogue version %s from %s (%d courses)", version, self.path, len(courses))
+            return index
+
+    def close(self) -> None:
+        pass
+
+
+_catalogue: Optional[FileCatalogue] = None
+
+
+def get_file_catalogue() -> Optional[FileCatalogue]:
+    """The configured catalogue file, or None when CATALOGUE_FILE is unset."""
+    global _catalogue
+    if _catalogue is None and settings.catalogue_file:
+        _catalogue = FileCatalogue(settings.catalogue_file)
+    return _catalogue
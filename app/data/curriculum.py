@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+from app.config import settings
+from app.models.records import CourseRecord
+
+
+class CurriculumIndex:
+    """Precompiled lookups over the course catalogue and field weights.
+
+    Built once from COURSES and FIELDS so the analysis path only does work
+    proportional to the submitted grades. Courses are held as compact
+    CourseRecords; any Course-like objects are accepted.
+    """
+
+    def __init__(
+        self,
+        courses: Sequence[Any],
+        fields: Dict[str, Dict[str, float]],
+        version: Optional[str] = None
+    ):
+        # Record position keeps results in catalogue order
+        self.courses: Tuple[CourseRecord, ...] = tuple(
+            CourseRecord.from_course(c, i) for i, c in enumerate(courses)
+        )
+        self.fields = fields
+        # A version recorded with the catalogue (e.g. in a snapshot) saves hashing it
+        self.version = version or catalogue_version(self.courses, fields)
+
+        self.by_name: Dict[str, CourseRecord] = {c.course_name: c for c in self.courses}
+
+        self.phases: Tuple[int, ...] = tuple(sorted({c.phase for c in self.courses}))
+
+        # Cumulative: phase N includes every course from phases <= N
+        self.phase_courses: Dict[int, Tuple[CourseRecord, ...]] = {}
+        self.phase_credits: Dict[int, int] = {}
+        for phase in range(1, max(self.phases, default=0) + 1):
+            eligible = tuple(c for c in self.courses if c.phase <= phase)
+            self.phase_courses[phase] = eligible
+            self.phase_credits[phase] = sum(c.credits for c in eligible)
+
+        category_courses: Dict[str, List[CourseRecord]] = {}
+        for course in self.courses:
+            category_courses.setdefault(course.category, []).append(course)
+        self.category_courses: Dict[str, Tuple[CourseRecord, ...]] = {
+            category: tuple(courses) for category, courses in category_courses.items()
+        }
+
+        self._index_fields(fields)
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.Lock()
+
+    def _index_fields(self, fields: Dict[str, Dict[str, float]]) -> None:
+        # Reverse map so only fields touching a graded category get scored
+        self.field_order: Dict[str, int] = {field: i for i, field in enumerate(fields)}
+        category_fields: Dict[str, List[str]] = {}
+        for field, weights in fields.items():
+            for category in weights:
+                category_fields.setdefault(category, []).append(field)
+        self.category_fields: Dict[str, Tuple[str, ...]] = {
+            category: tuple(names) for category, names in category_fields.items()
+        }
+
+    def __contains__(self, course_name: str) -> bool:
+        return course_name in self.by_name
+
+    def derived(self, name: str, build: Callable[[], Any]) -> Any:
+        """Build `name` once from this index; it is dropped with the index."""
+        value = self._derived.get(name)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build()
+        return value
+
+    def eligible_courses(self, phase: int) -> Tuple[CourseRecord, ...]:
+        """Courses a student in the given phase could have taken."""
+        if phase > len(self.phase_courses):
+            return self.courses
+        return self.phase_courses.get(phase, ())
+
+    def total_credits(self, phase: int) -> int:
+        """Credits available up to and including the given phase."""
+        if phase > len(self.phase_credits):
+            return sum(c.credits for c in self.courses)
+        return self.phase_credits.get(phase, 0)
+
+
+def catalogue_version(courses: Sequence[CourseRecord], fields: Dict[str, Dict[str, float]]) -> str:
+    """Content hash of the catalogue and field weights."""
+    payload = json.dumps(
+        [[c.to_dict() for c in courses], fields],
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+logger = logging.getLogger(__name__)
+
+ReloadListener = Callable[[CurriculumIndex], None]
+
+_index: Optional[CurriculumIndex] = None
+_reload_listeners: List[ReloadListener] = []
+_reload_lock = threading.Lock()
+
+
+def get_curriculum_index() -> CurriculumIndex:
+    """Return the current index, building it on first use.
+
+    The first index comes from CATALOGUE_IMAGE or CATALOGUE_SNAPSHOT when
+    one is set, otherwise from the built-in catalogue.
+    """
+    global _index
+    if _index is None:
+        if settings.catalogue_image:
+            from app.data.image import read_image
+            _index = read_image(settings.catalogue_image)
+        elif settings.catalogue_snapshot:
+            from app.data.snapshot import read_snapshot
+            _index = read_snapshot(settings.catalogue_snapshot)
+        else:
+            from app.data.courses import COURSES
+            from app.data.fields import FIELDS
+            _index = CurriculumIndex(COURSES, FIELDS)
+    return _index
+
+
+def on_curriculum_reload(listener: ReloadListener) -> ReloadListener:
+    """Register a callback run with the new index after every reload."""
+    _reload_listeners.append(listener)
+    return listener
+
+
+def reload_curriculum(
+    courses: Optional[Sequence[Any]] = None,
+    fields: Optional[Dict[str, Dict[str, float]]] = None,
+    index: Optional[CurriculumIndex] = None
+) -> CurriculumIndex:
+    """Swap in a new catalogue and notify everything derived from it.
+
+    Omitted arguments keep the current courses or fields; a prebuilt `index`
+    is swapped in as it is. The new index is built before the swap, and
+    callers that already hold the old one finish on it. Listeners run in the
+    reloading thread, so caches they rebuild are ready before requests need
+    them.
+    """
+    global _index
+    with _reload_lock:
+        if index is None:
+            current = get_curriculum_index()
+            index = CurriculumIndex(
+                current.courses if courses is None else courses,
+                current.fields if fields is None else fields
+            )
+        _index = index
+        for listener in _reload_listeners:
+            listener(index)
+    return index
+
+
+class CatalogueSource(Protocol):
+    """An external catalogue (file, database) that can be re-read on demand."""
+
+    version: Any
+
+    def refresh(self, force: bool = False) -> Optional[CurriculumIndex]:
+        """Reload if the source changed; return the new index if it did."""
+
+    def close(self) -> None:
+        """Release connections or handles."""
+
+
+async def poll_catalogue(source: CatalogueSource, interval: float) -> None:
+    """Refresh a catalogue source every `interval` seconds, off the event loop."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(source.refresh)
+        except Exception:
+            logger.exception("Catalogue refresh failed; still serving version %s", source.version)
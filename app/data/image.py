@@ -0,0 +1,390 @@
+"""Compiled catalogue images, memory-mapped and shared by every worker.
+
+    python -m app.cli build-image catalogue.image [--from catalogue.yaml]
+    CATALOGUE_IMAGE=catalogue.image uvicorn app.main:app --workers 8
+
+An image is a flat, read-only file. It holds fixed-width course records, a
+string table, an open-addressing name index, an id index, the course
+positions behind every GET /courses filter (and each cumulative phase), the
+field-weight matrices, and the JSON body for every filter. Workers mmap it
+rather than building CourseRecords, dicts and response bodies of their own.
+The pages live once in the OS page cache, whatever the number of workers.
+
+MappedCurriculumIndex and ImageCourses present the image through the same
+interface as CurriculumIndex, so run_analysis and CourseRepository work on
+it unchanged. Records are decoded on access. Only the field weights, which
+are small, are decoded up front. Hashes are CRC-32 rather than Python's
+hash(), which differs between processes.
+
+Layout (little-endian, sections 8-byte aligned): header, section offsets,
+then courses, strings, names, ids, categories, fields, slot categories,
+slot weights, filters, positions, bodies.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.data.curriculum import CurriculumIndex, catalogue_version
+from app.models.records import CourseRecord
+
+IMAGE_MAGIC = b"CSCATIMG"
+IMAGE_FORMAT = 1
+
+_HEADER = struct.Struct("<8sIIIIII16s")  # magic, format, courses, categories, fields, slots, hash slots, version
+_SECTIONS = ("courses", "strings", "names", "ids", "categories", "fields",
+             "slot_categories", "slot_weights", "filters", "positions", "bodies")
+_OFFSETS = struct.Struct(f"<{len(_SECTIONS)}Q")
+_COURSE = struct.Struct("<iIHBBH2x")  # id, name offset, name length, category, phase, credits
+_STRING = struct.Struct("<II")  # offset, length into the string table
+_FILTER = struct.Struct("<BBBxIIIQQ")  # cumulative, phase, category, positions offset, count, credits, body
+
+ANY = 0xFF  # category of an unfiltered entry; phase 0 means any phase
+
+# Decoded records kept per worker for repeated lookups; cleared when full
+MEMO_SIZE = 4096
+
+FilterKey = Tuple[Optional[int], Optional[str]]
+
+
+class ImageError(Exception):
+    """Raised for files that are not readable catalogue images."""
+
+
+def _align(buffer: bytearray) -> int:
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+    return len(buffer)
+
+
+def write_image(path: str, courses: Sequence[Any], fields: Dict[str, Dict[str, float]]) -> str:
+    """Compile a catalogue into an image, replacing the file atomically; returns its version."""
+    # Bodies must be byte-identical to the ones GET /courses would serialize
+    from app.api.encoding import dump_json
+
+    records = [CourseRecord.from_course(c, i) for i, c in enumerate(courses)]
+    version = catalogue_version(records, fields)
+    categories = list(dict.fromkeys(
+        [c.category for c in records] + [category for weights in fields.values() for category in weights]
+    ))
+    if len(categories) >= ANY:
+        raise ImageError(f"An image holds at most {ANY - 1} categories")
+    category_index = {category: k for k, category in enumerate(categories)}
+
+    strings = bytearray()
+    interned: Dict[str, Tuple[int, int]] = {}
+
+    def string(text: str) -> Tuple[int, int]:
+        if text not in interned:
+            raw = text.encode("utf-8")
+            interned[text] = (len(strings), len(raw))
+            strings.extend(raw)
+        return interned[text]
+
+    course_table = bytearray()
+    for c in records:
+        offset, length = string(c.course_name)
+        try:
+            course_table += _COURSE.pack(c.id, offset, length, category_index[c.category], c.phase, c.credits)
+        except struct.error as e:
+            raise ImageError(f"Course {c.id} does not fit a fixed-width image record: {e}") from e
+
+    hash_slots = 1 << max(1, (2 * len(records) - 1).bit_length())
+    names = [0] * hash_slots  # position + 1; 0 is empty
+    for c in records:
+        slot = zlib.crc32(c.course_name.encode("utf-8")) & (hash_slots - 1)
+        while names[slot]:
+            slot = (slot + 1) & (hash_slots - 1)
+        names[slot] = c.position + 1
+
+    by_id = sorted((c.id, c.position) for c in records)
+
+    n_slots = max((len(weights) for weights in fields.values()), default=0)
+    slot_categories = [-1] * (n_slots * len(fields))
+    slot_weights = [0.0] * (n_slots * len(fields))
+    for f, weights in enumerate(fields.values()):
+        for p, (category, weight) in enumerate(weights.items()):
+            slot_categories[p * len(fields) + f] = category_index[category]
+            slot_weights[p * len(fields) + f] = weight
+
+    # The same filters as CourseIndexes.filtered, then cumulative phases as in CurriculumIndex
+    groups: Dict[Tuple[int, int, int], List[CourseRecord]] = {(0, 0, ANY): records}
+    for c in records:
+        groups.setdefault((0, c.phase, ANY), []).append(c)
+    for c in records:
+        groups.setdefault((0, 0, category_index[c.category]), []).append(c)
+    for c in records:
+        groups.setdefault((0, c.phase, category_index[c.category]), []).append(c)
+    for phase in range(1, max((c.phase for c in records), default=0) + 1):
+        groups[(1, phase, ANY)] = [c for c in records if c.phase <= phase]
+
+    filters = bytearray()
+    positions: List[int] = []
+    bodies = bytearray()
+    for (cumulative, phase, category), members in groups.items():
+        body_offset = body_length = 0
+        if not cumulative:
+            rendered = dump_json([c.to_dict() for c in members])
+            body_offset, body_length = len(bodies), len(rendered)
+            bodies += rendered
+        filters += _FILTER.pack(
+            cumulative, phase, category, len(positions), len(members),
+            sum(c.credits for c in members), body_offset, body_length,
+        )
+        positions.extend(c.position for c in members)
+
+    sections = {
+        "courses": bytes(course_table),
+        "strings": bytes(strings),
+        "names": struct.pack(f"<{hash_slots}I", *names),
+        "ids": struct.pack(f"<{len(by_id)}i", *(i for i, _ in by_id))
+        + struct.pack(f"<{len(by_id)}I", *(p for _, p in by_id)),
+        "categories": b"".join(_STRING.pack(*string(category)) for category in categories),
+        "fields": b"".join(_STRING.pack(*string(field)) for field in fields),
+        "slot_categories": struct.pack(f"<{len(slot_categories)}q", *slot_categories),
+        "slot_weights": struct.pack(f"<{len(slot_weights)}d", *slot_weights),
+        "filters": bytes(filters),
+        "positions": struct.pack(f"<{len(positions)}I", *positions),
+        "bodies": bytes(bodies),
+    }
+    # The string table grew while the other sections were packed
+    sections["strings"] = bytes(strings)
+
+    out = bytearray(_HEADER.size + _OFFSETS.size)
+    offsets = []
+    for name in _SECTIONS:
+        offsets.append(_align(out))
+        out += sections[name]
+    _HEADER.pack_into(
+        out, 0, IMAGE_MAGIC, IMAGE_FORMAT, len(records), len(categories), len(fields),
+        n_slots, hash_slots, version.encode("ascii"),
+    )
+    _OFFSETS.pack_into(out, _HEADER.size, *offsets)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(out)
+    os.replace(tmp, path)
+    return version
+
+
+class CatalogueImage:
+    """A read-only view over a mapped catalogue image."""
+
+    def __init__(self, path: str):
+        try:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise ImageError(f"Cannot map catalogue image {path}: {e}") from e
+        view = memoryview(self._map)
+        if len(view) < _HEADER.size + _OFFSETS.size:
+            raise ImageError(f"{path} is not a catalogue image")
+        magic, fmt, n_courses, n_categories, n_fields, n_slots, hash_slots, version = _HEADER.unpack_from(view)
+        if magic != IMAGE_MAGIC or fmt != IMAGE_FORMAT:
+            raise ImageError(f"{path} is not a catalogue image in format {IMAGE_FORMAT}; rebuild it")
+        offsets = dict(zip(_SECTIONS, _OFFSETS.unpack_from(view, _HEADER.size)))
+        if sorted(offsets.values()) != list(offsets.values()) or offsets["bodies"] > len(view):
+            raise ImageError(f"{path} is a truncated or corrupt catalogue image")
+
+        def section(name: str, size: int) -> memoryview:
+            if offsets[name] + size > len(view):
+                raise ImageError(f"{path} is a truncated or corrupt catalogue image")
+            return view[offsets[name]:offsets[name] + size]
+
+        self.path = path
+        self.version = version.decode("ascii")
+        self.size = len(view)
+        self.n_slots = n_slots
+        self._courses = section("courses", n_courses * _COURSE.size)
+        self._strings = view[offsets["strings"]:]
+        self._names = section("names", 4 * hash_slots).cast("I")
+        self._ids = section("ids", 4 * n_courses).cast("i")
+        self._id_positions = section("ids", 8 * n_courses)[4 * n_courses:].cast("I")
+        self._positions = view[offsets["positions"]:offsets["bodies"]].cast("I")
+        bodies = view[offsets["bodies"]:]
+        self.categories = [self.string(*entry) for entry in _STRING.iter_unpack(section("categories", 8 * n_categories))]
+        self.field_names = [self.string(*entry) for entry in _STRING.iter_unpack(section("fields", 8 * n_fields))]
+        self.slot_categories = section("slot_categories", 8 * n_slots * n_fields).cast("q")
+        self.slot_weights = section("slot_weights", 8 * n_slots * n_fields).cast("d")
+
+        self.filters: Dict[FilterKey, Tuple["ImageCourses", memoryview]] = {}
+        self.cumulative: Dict[int, Tuple["ImageCourses", int]] = {}
+        filter_count = (offsets["positions"] - offsets["filters"]) // _FILTER.size
+        for cumulative, phase, category, start, count, credits, body_offset, body_length in _FILTER.iter_unpack(
+            section("filters", filter_count * _FILTER.size)
+        ):
+            if start + count > len(self._positions) or body_offset + body_length > len(bodies):
+                raise ImageError(f"{path} is a truncated or corrupt catalogue image")
+            courses = ImageCourses(self, self._positions[start:start + count])
+            if cumulative:
+                self.cumulative[phase] = (courses, credits)
+            else:
+                key = (phase or None, None if category == ANY else self.categories[category])
+                self.filters[key] = (courses, bodies[body_offset:body_offset + body_length])
+
+    def __len__(self) -> int:
+        return len(self._courses) // _COURSE.size
+
+    def string(self, offset: int, length: int) -> str:
+        return str(self._strings[offset:offset + length], "utf-8")
+
+    def record(self, position: int) -> CourseRecord:
+        course_id, offset, length, category, phase, credits = _COURSE.unpack_from(
+            self._courses, position * _COURSE.size
+        )
+        return CourseRecord(
+            course_id, self.string(offset, length), self.categories[category], phase, credits, position
+        )
+
+    def find(self, name: str) -> Optional[int]:
+        """Position of the course with this name, or None."""
+        raw = name.encode("utf-8")
+        mask = len(self._names) - 1
+        slot = zlib.crc32(raw) & mask
+        while True:
+            entry = self._names[slot]
+            if not entry:
+                return None
+            _, offset, length, _, _, _ = _COURSE.unpack_from(self._courses, (entry - 1) * _COURSE.size)
+            if self._strings[offset:offset + length] == raw:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def find_id(self, course_id: int) -> Optional[int]:
+        """Position of the course with this id, or None."""
+        i = bisect_left(self._ids, course_id)
+        if i < len(self._ids) and self._ids[i] == course_id:
+            return self._id_positions[i]
+        return None
+
+    def fields(self) -> Dict[str, Dict[str, float]]:
+        """Field weights in their original order, decoded from the weight matrices."""
+        n_fields = len(self.field_names)
+        fields: Dict[str, Dict[str, float]] = {}
+        for f, field in enumerate(self.field_names):
+            weights: Dict[str, float] = {}
+            for p in range(self.n_slots):
+                category = self.slot_categories[p * n_fields + f]
+                if category < 0:
+                    break
+                weights[self.categories[category]] = self.slot_weights[p * n_fields + f]
+            fields[field] = weights
+        return fields
+
+
+class ImageCourses(Sequence):
+    """Courses at a list of image positions, decoded on access."""
+
+    __slots__ = ("image", "positions")
+
+    def __init__(self, image: CatalogueImage, positions: Union[memoryview, range]):
+        self.image = image
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ImageCourses(self.image, self.positions[i])
+        return self.image.record(self.positions[i])
+
+    def __iter__(self) -> Iterator[CourseRecord]:
+        record = self.image.record
+        return (record(position) for position in self.positions)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+
+class ImageNames:
+    """Course lookup by name with the dict interface run_analysis uses."""
+
+    __slots__ = ("image", "_memo")
+
+    def __init__(self, image: CatalogueImage):
+        self.image = image
+        self._memo: Dict[str, CourseRecord] = {}
+
+    def get(self, name: str, default: Any = None) -> Any:
+        record = self._memo.get(name)
+        if record is None:
+            position = self.image.find(name)
+            if position is None:
+                return default
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            record = self._memo[name] = self.image.record(position)
+        return record
+
+    def __getitem__(self, name: str) -> CourseRecord:
+        record = self.get(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.get(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.image)
+
+    def __iter__(self) -> Iterator[str]:
+        return (record.course_name for record in ImageCourses(self.image, range(len(self.image))))
+
+
+class ImageIds:
+    """Course lookup by id over the image's sorted id table."""
+
+    __slots__ = ("image",)
+
+    def __init__(self, image: CatalogueImage):
+        self.image = image
+
+    def get(self, course_id: int, default: Any = None) -> Any:
+        position = self.image.find_id(course_id)
+        return default if position is None else self.image.record(position)
+
+    def __getitem__(self, course_id: int) -> CourseRecord:
+        record = self.get(course_id)
+        if record is None:
+            raise KeyError(course_id)
+        return record
+
+    def __contains__(self, course_id: object) -> bool:
+        return isinstance(course_id, int) and self.image.find_id(course_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.image)
+
+
+class MappedCurriculumIndex(CurriculumIndex):
+    """A CurriculumIndex over a catalogue image; only the field weights live in the worker."""
+
+    def __init__(self, image: CatalogueImage):
+        self.image = image
+        self.courses = ImageCourses(image, range(len(image)))
+        self.fields = image.fields()
+        self.version = image.version
+        self.by_name = ImageNames(image)
+        self.phases = tuple(sorted({phase for phase, _ in image.filters if phase is not None}))
+        self.phase_courses = {phase: courses for phase, (courses, _) in image.cumulative.items()}
+        self.phase_credits = {phase: credits for phase, (_, credits) in image.cumulative.items()}
+        self.category_courses = {
+            category: courses for (phase, category), (courses, _) in image.filters.items()
+            if phase is None and category is not None
+        }
+        self._index_fields(self.fields)
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+
+def read_image(path: str) -> MappedCurriculumIndex:
+    return MappedCurriculumIndex(CatalogueImage(path))
@@ -0,0 +1,154 @@
+"""Per-programme catalogues for deployments serving several degree programmes.
+
+    programs/
+        bsc-informatics.image        # python -m app.cli build-image ... --from ...
+        bsc-economics.snapshot       # python -m app.cli build-snapshot ... --from ...
+        msc-data-science.yaml        # any catalogue file format
+
+With PROGRAMS_DIR set, a request naming a programme is scored against that
+programme's catalogue, found by file name. There is no directory scan: a
+request only opens its own programme's file. The catalogue is loaded on
+first use and kept with everything derived from it, such as course indexes
+and GET /courses bodies. Programmes are dropped least recently used first
+beyond PROGRAM_CACHE_SIZE, or once idle for PROGRAM_IDLE_TTL seconds. An
+idle programme costs nothing but a later reload. Requests without a
+programme use the default catalogue (built-in, database or file) as before.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.data.curriculum import CurriculumIndex, get_curriculum_index
+
+# Images and snapshots first: they load fastest
+EXTENSIONS = (".image", ".snapshot", ".json", ".yaml", ".yml", ".toml")
+
+_PROGRAM_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+
+class UnknownProgram(Exception):
+    """Raised for programme ids with no catalogue."""
+
+
+class Program:
+    """A loaded programme: its curriculum index and structures built from it."""
+
+    __slots__ = ("id", "index", "last_used", "_derived", "_lock")
+
+    def __init__(self, program_id: str, index: CurriculumIndex):
+        self.id = program_id
+        self.index = index
+        self.last_used = time.monotonic()
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name: str, build: Callable[[], Any]) -> Any:
+        """Build `name` once from this programme's index; it is dropped with the programme."""
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build()
+        return value
+
+
+class ProgramRegistry:
+    """Programme catalogues from a directory, loaded lazily and evicted LRU."""
+
+    def __init__(self, directory: str, max_loaded: int, idle_ttl: float):
+        self.directory = directory
+        self.max_loaded = max_loaded
+        self.idle_ttl = idle_ttl
+        self._loaded: "OrderedDict[str, Program]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One load per programme at a time; other programmes are not held up
+        self._loading: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def path(self, program_id: str) -> Optional[str]:
+        """The catalogue file for a programme, or None if it has none."""
+        if not self.directory or not _PROGRAM_ID.fullmatch(program_id):
+            return None
+        for ext in EXTENSIONS:
+            path = os.path.join(self.directory, program_id + ext)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def get(self, program_id: str) -> Program:
+        """The loaded programme, loading it on first use; raises UnknownProgram."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            program = self._loaded.get(program_id)
+            if program is not None:
+                self._loaded.move_to_end(program_id)
+                program.last_used = now
+                return program
+            loading = self._loading.setdefault(program_id, threading.Lock())
+
+        try:
+            with loading:
+                with self._lock:
+                    program = self._loaded.get(program_id)
+                if program is None:
+                    program = Program(program_id, self._load(program_id))
+                    with self._lock:
+                        self._loaded[program_id] = program
+                        self.loads += 1
+                        while len(self._loaded) > self.max_loaded:
+                            self._loaded.popitem(last=False)
+                            self.evictions += 1
+        finally:
+            with self._lock:
+                if self._loading.get(program_id) is loading:
+                    del self._loading[program_id]
+        return program
+
+    def _load(self, program_id: str) -> CurriculumIndex:
+        path = self.path(program_id)
+        if path is None:
+            raise UnknownProgram(f"Unknown program: '{program_id}'")
+        if path.endswith(".image"):
+            from app.data.image import read_image
+            return read_image(path)
+        if path.endswith(".snapshot"):
+            from app.data.snapshot import read_snapshot
+            return read_snapshot(path)
+        from app.data.catalogue_file import read_catalogue_file
+        _, courses, fields = read_catalogue_file(path)
+        return CurriculumIndex(courses, fields)
+
+    def _evict_idle(self, now: float) -> None:
+        # Least recently used first, so stop at the first programme still in use
+        while self._loaded:
+            program = next(iter(self._loaded.values()))
+            if now - program.last_used < self.idle_ttl:
+                break
+            self._loaded.popitem(last=False)
+            self.evictions += 1
+
+    def loaded(self) -> List[str]:
+        """Ids of the programmes in memory, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loaded.clear()
+
+
+programs = ProgramRegistry(settings.programs_dir, settings.program_cache_size, settings.program_idle_ttl)
+
+
+def get_program_index(program: Optional[str] = None) -> CurriculumIndex:
+    """The curriculum index for a programme, or the default catalogue for None."""
+    if program is None:
+        return get_curriculum_index()
+    return programs.get(program).index
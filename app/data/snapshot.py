@@ -0,0 +1,52 @@
+"""Prebuilt catalogue snapshots for fast worker startup.
+
+    python -m app.cli build-snapshot catalogue.snapshot
+    CATALOGUE_SNAPSHOT=catalogue.snapshot uvicorn app.main:app --workers 8
+
+A snapshot is a pickle of plain tuples plus the field weights and the
+catalogue version. It was validated when it was built, so loading it builds
+CourseRecords directly, with no pydantic models and no re-hashing of the
+catalogue. Snapshots are build artifacts: only load ones you built, since
+unpickling runs code.
+"""
+import os
+import pickle
+from typing import Any, Dict, Sequence
+
+from app.data.curriculum import CurriculumIndex, catalogue_version
+from app.models.records import CourseRecord
+
+SNAPSHOT_FORMAT = 1
+
+
+class SnapshotError(Exception):
+    """Raised for snapshots that cannot be read."""
+
+
+def write_snapshot(path: str, courses: Sequence[Any], fields: Dict[str, Dict[str, float]]) -> str:
+    """Write a snapshot atomically; returns its catalogue version (the content hash)."""
+    records = [CourseRecord.from_course(c, i) for i, c in enumerate(courses)]
+    version = catalogue_version(records, fields)
+    data = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "courses": [(c.id, c.course_name, c.category, c.phase, c.credits) for c in records],
+        "fields": fields,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return version
+
+
+def read_snapshot(path: str) -> CurriculumIndex:
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        raise SnapshotError(f"Cannot read catalogue snapshot {path}: {e}") from e
+    if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"{path} is not a catalogue snapshot in format {SNAPSHOT_FORMAT}; rebuild it")
+    courses = [CourseRecord(*row, position) for position, row in enumerate(data["courses"])]
+    return CurriculumIndex(courses, data["fields"], version=data["version"])
@@ -0,0 +1,15 @@
+from typing import Optional
+
+from app.config import settings
+from app.db.catalogue import CatalogueNotSeeded, DatabaseCatalogue, read_catalogue, write_catalogue
+from app.db.engine import create_catalogue_engine
+
+_catalogue: Optional[DatabaseCatalogue] = None
+
+
+def get_database_catalogue() -> Optional[DatabaseCatalogue]:
+    """The configured database catalogue, or None when DATABASE_URL is unset."""
+    global _catalogue
+    if _catalogue is None and settings.database_url:
+        _catalogue = DatabaseCatalogue(create_catalogue_engine(settings.database_url))
+    return _catalogue
@@ -0,0 +1,139 @@
+"""Database-backed catalogue, cached in process.
+
+The whole catalogue is read with one query per table and swapped in through
+reload_curriculum, so the analysis path and every derived cache keep working
+off the in-memory CurriculumIndex. Staleness is detected by polling the
+single catalogue_meta row; requests never touch the database.
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import Engine, delete, insert, select, update
+from sqlalchemy.engine import Connection
+
+from app.data.curriculum import CurriculumIndex, reload_curriculum
+from app.db.models import CatalogueMeta, CourseRow, FieldRow, FieldWeightRow
+from app.models.course import CourseCategory
+from app.models.records import CourseRecord
+
+logger = logging.getLogger(__name__)
+
+Fields = Dict[str, Dict[str, float]]
+
+
+class CatalogueNotSeeded(Exception):
+    """Raised when the catalogue tables exist but have never been written."""
+
+
+class CatalogueVersion(NamedTuple):
+    version: int
+    updated_at: datetime
+
+
+def _read_version(conn: Connection) -> Optional[CatalogueVersion]:
+    row = conn.execute(
+        select(CatalogueMeta.version, CatalogueMeta.updated_at).where(CatalogueMeta.id == 1)
+    ).first()
+    return None if row is None else CatalogueVersion(row.version, row.updated_at)
+
+
+def _bump_version(conn: Connection) -> None:
+    now = datetime.now(timezone.utc)
+    updated = conn.execute(
+        update(CatalogueMeta)
+        .where(CatalogueMeta.id == 1)
+        .values(version=CatalogueMeta.version + 1, updated_at=now)
+    )
+    if updated.rowcount == 0:
+        conn.execute(insert(CatalogueMeta).values(id=1, version=1, updated_at=now))
+
+
+def write_catalogue(engine: Engine, courses: Sequence[Any], fields: Fields) -> None:
+    """Replace the stored catalogue and bump its version, in one transaction."""
+    with engine.begin() as conn:
+        conn.execute(delete(FieldWeightRow))
+        conn.execute(delete(FieldRow))
+        conn.execute(delete(CourseRow))
+        if courses:
+            conn.execute(insert(CourseRow), [
+                {**CourseRecord.from_course(course, i).to_dict(), "position": i}
+                for i, course in enumerate(courses)
+            ])
+        if fields:
+            conn.execute(insert(FieldRow), [
+                {"name": name, "position": i} for i, name in enumerate(fields)
+            ])
+            weights = [
+                {"field": name, "category": category, "weight": weight, "position": i}
+                for name, categories in fields.items()
+                for i, (category, weight) in enumerate(categories.items())
+            ]
+            if weights:
+                conn.execute(insert(FieldWeightRow), weights)
+        _bump_version(conn)
+
+
+def read_catalogue(conn: Connection) -> Tuple[List[CourseRecord], Fields]:
+    """Bulk-load courses and field weights in catalogue order."""
+    rows = conn.execute(
+        select(CourseRow.id, CourseRow.course_name, CourseRow.category, CourseRow.phase, CourseRow.credits)
+        .order_by(CourseRow.position, CourseRow.id)
+    ).all()
+    courses = [
+        CourseRecord(row.id, row.course_name, CourseCategory(row.category).value, row.phase, row.credits, i)
+        for i, row in enumerate(rows)
+    ]
+
+    fields: Fields = {
+        name: {} for name in conn.execute(select(FieldRow.name).order_by(FieldRow.position)).scalars()
+    }
+    weights = conn.execute(
+        select(FieldWeightRow.field, FieldWeightRow.category, FieldWeightRow.weight)
+        .order_by(FieldWeightRow.field, FieldWeightRow.position)
+    )
+    for field, category, weight in weights:
+        fields[field][category] = weight
+    return courses, fields
+
+
+class DatabaseCatalogue:
+    """Read-through cache of the stored catalogue, refreshed on version change."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.version: Optional[CatalogueVersion] = None
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def current_version(self) -> Optional[CatalogueVersion]:
+        with self.engine.connect() as conn:
+            return _read_version(conn)
+
+    def refresh(self, force: bool = False) -> Optional[CurriculumIndex]:
+        """Reload the catalogue if its version moved; return the new index if it did.
+
+        A cheap version query is all that runs when nothing changed. On any
+        error the previous catalogue stays in place.
+        """
+        with self._lock:
+            with self.engine.connect() as conn:
+                version = _read_version(conn)
+                if version is None:
+                    raise CatalogueNotSeeded("catalogue_meta is empty; run `python -m app.cli seed-db`")
+                if not force and version == self.version:
+                    return None
+                # Read in the same transaction as the version, so a write that
+                # lands afterwards bumps it past what is recorded here
+                courses, fields = read_catalogue(conn)
+
+            index = reload_curriculum(courses, fields)
+            self.version = version
+            self.loads += 1
+            logger.info("Loaded catalogue version %d (%d courses)", version.version, len(courses))
+            return index
+
+
+    def close(self) -> None:
+        self.engine.dispose()
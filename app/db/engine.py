@@ -0,0 +1,19 @@
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+
+def create_catalogue_engine(
+    url: str,
+    pool_size: int = settings.db_pool_size,
+    max_overflow: int = settings.db_max_overflow,
+    pool_pre_ping: bool = settings.db_pool_pre_ping,
+) -> Engine:
+    """Pooled engine; pre-ping drops connections the server has closed."""
+    kwargs = {"pool_pre_ping": pool_pre_ping}
+    parsed = make_url(url)
+    # In-memory SQLite lives in a single connection and has no pool to size
+    if not (parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")):
+        kwargs.update(pool_size=pool_size, max_overflow=max_overflow)
+    return create_engine(url, **kwargs)
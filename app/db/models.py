@@ -0,0 +1,54 @@
+"""SQLAlchemy tables for the course catalogue and field weights."""
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class CourseRow(Base):
+    __tablename__ = "courses"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    course_name: Mapped[str] = mapped_column(String(200), unique=True)
+    category: Mapped[str] = mapped_column(String(64))
+    phase: Mapped[int] = mapped_column(Integer)
+    credits: Mapped[int] = mapped_column(Integer)
+    # Catalogue order; averages and contributor lists follow it
+    position: Mapped[int] = mapped_column(Integer, index=True)
+
+
+class FieldRow(Base):
+    __tablename__ = "fields"
+
+    name: Mapped[str] = mapped_column(String(200), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+
+
+class FieldWeightRow(Base):
+    __tablename__ = "field_weights"
+    __table_args__ = (UniqueConstraint("field", "category"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    field: Mapped[str] = mapped_column(ForeignKey("fields.name", ondelete="CASCADE"))
+    category: Mapped[str] = mapped_column(String(64))
+    weight: Mapped[float] = mapped_column(Float)
+    # Order of the weights within a field, which fixes the float summation order
+    position: Mapped[int] = mapped_column(Integer)
+
+
+class CatalogueMeta(Base):
+    """Single row bumped on every catalogue write; readers poll it."""
+
+    __tablename__ = "catalogue_meta"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
@@ -1,9 +1,68 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
 from app.api.courses import router as courses_router
 from app.api.analysis import router as analysis_router
+from app.api.cohort import router as cohort_router
+from app.api.jobs import router as jobs_router
+from app.api.metrics import router as metrics_router
+from app.config import settings
+from app.data.curriculum import CatalogueSource, get_curriculum_index, poll_catalogue
+from app.services.catalogue_cache import catalogue_cache
+from app.services.incremental import warn_unshared_secret
+from app.services.jobs import job_queue, poll_job_cleanup
+from app.services.metrics import MetricsMiddleware
+from app.services.offload import analysis_pool
 
 
-app = FastAPI(title="Career Signals API")
+def catalogue_source() -> Optional[CatalogueSource]:
+    """The configured external catalogue; SQLAlchemy is only imported when one is a database."""
+    if settings.database_url:
+        from app.db import get_database_catalogue
+        return get_database_catalogue()
+    if settings.catalogue_file:
+        from app.data.catalogue_file import get_file_catalogue
+        return get_file_catalogue()
+    return None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warn_unshared_secret()
+    source = catalogue_source()
+    poller = None
+    if source is not None:
+        # Serve the external catalogue from the first request, then follow its version
+        source.refresh(force=True)
+        poller = asyncio.create_task(poll_catalogue(source, settings.catalogue_refresh_interval))
+    cohort_poller = None
+    if settings.cohort_stats_file:
+        from app.services.cohort import cohort_stats, poll_cohort_stats
+        # Load the shared cohort, then exchange new scores with the other processes
+        cohort_stats.sync()
+        cohort_poller = asyncio.create_task(poll_cohort_stats(cohort_stats, settings.cohort_sync_interval))
+    # Expired jobs are removed even when this process never ran them
+    job_cleaner = asyncio.create_task(poll_job_cleanup(job_queue.store, settings.jobs_cleanup_interval))
+    yield
+    job_cleaner.cancel()
+    job_queue.shutdown()
+    if poller is not None:
+        poller.cancel()
+        source.close()
+    if cohort_poller is not None:
+        cohort_poller.cancel()
+        cohort_stats.sync()
+    analysis_pool.shutdown()
+
+
+app = FastAPI(title="Career Signals API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+# Build the curriculum index and catalogue responses once at startup,
+# not on the first request
+get_curriculum_index()
+catalogue_cache.warm()
 
 @app.get("/")
 def read_root():
@@ -11,3 +70,6 @@ def read_root():
 
 app.include_router(courses_router)
 app.include_router(analysis_router)
+app.include_router(cohort_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
@@ -1,42 +1,194 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator, model_validator
+from time import perf_counter
+from typing import Dict, List, Literal, Optional, Sequence
+from app.data.curriculum import CurriculumIndex, get_curriculum_index
+from app.data.programs import UnknownProgram, get_program_index
+from app.models.records import AnalysisOptions
+from app.services.metrics import VALIDATION_STAGE
+from app.services.name_resolver import name_resolver, resolve_course_name
 
 class GradeInput(BaseModel):
     course_name: str
     grade: float = Field(ge=0, le=20, description="Grade must be between 0 and 20")
 
 class CategoryScore(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     category: str
     average_grade: float
     total_credits: int
+    course_ids: Optional[List[int]] = None  # graded courses, with detail="categories"
+    percentile: Optional[float] = None  # rank within the cohort, with percentiles=true
+
+def unknown_course(course_name: str, suggestions: Sequence[str] = ()) -> str:
+    if not suggestions:
+        return f"Unknown course name: '{course_name}'. Must be one of the courses in the catalogue."
+    quoted = [f"'{name}'" for name in suggestions]
+    alternatives = quoted[0] if len(quoted) == 1 else f"{', '.join(quoted[:-1])} or {quoted[-1]}"
+    return f"Unknown course name: '{course_name}'. Did you mean {alternatives}?"
+
+def canonical_course_name(course_name: str, index: CurriculumIndex) -> str:
+    """The catalogue's spelling of a course name, ignoring case and spacing; raises ValueError."""
+    if course_name in index:
+        return course_name
+    resolver = name_resolver(index)
+    canonical = resolver.resolve(course_name)
+    if canonical is None:
+        raise ValueError(unknown_course(course_name, resolver.suggest(course_name)))
+    return canonical
+
+def check_program(program: Optional[str]) -> Optional[str]:
+    """Reject programmes with no catalogue in PROGRAMS_DIR."""
+    if program is not None:
+        try:
+            get_program_index(program)
+        except UnknownProgram as e:
+            raise ValueError(str(e))
+    return program
+
+def check_course_names(grades: List[GradeInput], index: Optional[CurriculumIndex] = None) -> List[GradeInput]:
+    """Reject grades for courses that are not in the catalogue.
+
+    A name that differs from a catalogue name only in case or spacing is
+    replaced by the catalogue's spelling.
+    """
+    started = perf_counter()
+    index = index or get_curriculum_index()
+
+    try:
+        for grade_input in grades:
+            if grade_input.course_name not in index:
+                grade_input.course_name = canonical_course_name(grade_input.course_name, index)
+    finally:
+        VALIDATION_STAGE.observe(perf_counter() - started)
+    return grades
+
+
+class AnalysisOptionsModel(BaseModel):
+    top_k: Optional[int] = Field(None, ge=1, description="Return only the k strongest field signals")
+    min_score: Optional[float] = Field(None, ge=0, le=20, description="Drop field signals scoring below this")
+    min_evidence_level: Optional[Literal["Partial", "Complete"]] = Field(
+        None, description="Drop field signals with weaker evidence"
+    )
+    detail: Literal["summary", "categories", "full"] = Field(
+        "full", description="How much contributor detail to return"
+    )
+    percentiles: bool = Field(False, description="Rank each score against the ingested cohort")
+
+    def analysis_options(self) -> Optional[AnalysisOptions]:
+        """The requested options, or None for the default full response."""
+        options = AnalysisOptions(self.top_k, self.min_score, self.min_evidence_level, self.detail)
+        return None if options == AnalysisOptions() else options
 
-class AnalysisRequest(BaseModel):
+
+class AnalysisRequest(AnalysisOptionsModel):
+    program: Optional[str] = Field(None, description="Degree programme; omit for the default catalogue")
     current_phase: int = Field(ge=1, le=3, description="Phase must be 1, 2, or 3")
     grades: List[GradeInput]
-    
+
+    @field_validator('program')
+    @classmethod
+    def validate_program(cls, program: Optional[str]):
+        return check_program(program)
+
     @field_validator('grades')
     @classmethod
-    def validate_course_names(cls, grades: List[GradeInput]):
-        from app.data.courses import COURSES
-        valid_course_names = {c.course_name for c in COURSES}
-        
-        for grade_input in grades:
-            if grade_input.course_name not in valid_course_names:
-                raise ValueError(
-                    f"Unknown course name: '{grade_input.course_name}'. "
-                    f"Must be one of the courses in the catalogue."
-                )
-        return grades
+    def validate_course_names(cls, grades: List[GradeInput], info: ValidationInfo):
+        if "program" not in info.data:
+            return grades  # the unknown programme is the error to report
+        return check_course_names(grades, get_program_index(info.data["program"]))
+
+
+class StreamAnalysisParams(AnalysisOptionsModel):
+    """Query parameters of POST /analysis/stream; the grades arrive as the NDJSON body."""
+
+    program: Optional[str] = Field(None, description="Degree programme; omit for the default catalogue")
+    current_phase: int = Field(ge=1, le=3, description="Phase must be 1, 2, or 3")
+
+    @field_validator('program')
+    @classmethod
+    def validate_program(cls, program: Optional[str]):
+        return check_program(program)
+
+
+class BatchAnalysisRequest(BaseModel):
+    requests: List[AnalysisRequest]
+
+
+class IncrementalAnalysisRequest(AnalysisOptionsModel):
+    state: Optional[str] = Field(None, description="State from the previous response; omit to start")
+    program: Optional[str] = Field(None, description="Degree programme; must match the state's")
+    current_phase: Optional[int] = Field(None, ge=1, le=3, description="Defaults to the state's phase")
+    upsert: List[GradeInput] = Field(default_factory=list, description="Grades added or changed")
+    remove: List[str] = Field(default_factory=list, description="Course names whose grades were withdrawn")
+
+    @field_validator('program')
+    @classmethod
+    def validate_program(cls, program: Optional[str]):
+        return check_program(program)
+
+    @field_validator('upsert')
+    @classmethod
+    def validate_course_names(cls, grades: List[GradeInput], info: ValidationInfo):
+        if "program" not in info.data:
+            return grades  # the unknown programme is the error to report
+        return check_course_names(grades, get_program_index(info.data["program"]))
+
+    @field_validator('remove')
+    @classmethod
+    def resolve_removed_names(cls, names: List[str], info: ValidationInfo):
+        if "program" not in info.data:
+            return names
+        # Withdrawing a course that was never graded is not an error, so unknown names stay
+        index = get_program_index(info.data["program"])
+        return [resolve_course_name(name, index) or name for name in names]
+
+
+class SimulatedCourse(BaseModel):
+    course_name: str
+    min_grade: float = Field(0, ge=0, le=20, description="Lowest grade to consider")
+    max_grade: float = Field(20, ge=0, le=20, description="Highest grade to consider")
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.min_grade > self.max_grade:
+            raise ValueError("min_grade must not exceed max_grade")
+        return self
+
+
+class SimulationRequest(BaseModel):
+    program: Optional[str] = Field(None, description="Degree programme; omit for the default catalogue")
+    current_phase: int = Field(ge=1, le=3, description="Phase to score at, e.g. 3 for a phase-3 plan")
+    grades: List[GradeInput] = Field(default_factory=list, description="Grades already earned")
+    simulate: List[SimulatedCourse] = Field(min_length=1, description="Courses not yet taken, with grade ranges")
+    fields: Optional[List[str]] = Field(None, description="Only report these fields")
+
+    @field_validator('program')
+    @classmethod
+    def validate_program(cls, program: Optional[str]):
+        return check_program(program)
+
+    @field_validator('grades', 'simulate')
+    @classmethod
+    def validate_course_names(cls, grades, info: ValidationInfo):
+        if "program" not in info.data:
+            return grades  # the unknown programme is the error to report
+        return check_course_names(grades, get_program_index(info.data["program"]))
 
 
 class FieldSignal(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     field: str
     score: float
     signal_strength: str
-    contributors: dict  # {"categories": [...], "courses": [...]}
+    contributors: Optional[dict] = None  # {"categories": [...], "courses": [...]}; trimmed by detail
     evidence_level: str  # "Complete" or "Partial"
+    percentile: Optional[float] = None  # rank within the cohort, with percentiles=true
 
 class AnalysisResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     phase: int
     coverage: float
     confidence: str
@@ -44,3 +196,29 @@ class AnalysisResponse(BaseModel):
     field_signals: List[FieldSignal]
     warnings: Optional[List[str]] = None
 
+
+
+class IncrementalAnalysisResponse(AnalysisResponse):
+    state: str
+
+
+class CategoryRange(BaseModel):
+    category: str
+    current_average: Optional[float] = None
+    min_average: float
+    max_average: float
+
+class FieldRange(BaseModel):
+    field: str
+    current_score: Optional[float] = None
+    min_score: float
+    max_score: float
+    min_signal: str
+    max_signal: str
+    evidence_level: str
+    required_grade: Dict[str, Optional[float]]  # lowest grade in every simulated course per strength
+
+class SimulationResponse(BaseModel):
+    phase: int
+    categories: List[CategoryRange]
+    fields: List[FieldRange]
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+class CohortIngestResponse(BaseModel):
+    ingested: int = Field(description="Transcripts added by this request")
+    transcripts: Dict[str, int] = Field(description="Transcripts in the cohort, per phase")
+    programs: Optional[Dict[str, Dict[str, int]]] = Field(
+        None, description="Transcripts in each programme's cohort, per phase"
+    )
+
+class CohortDistribution(BaseModel):
+    phase: int
+    category: Optional[str] = None
+    field: Optional[str] = None
+    count: int
+    mean: Optional[float] = None
+    quantiles: Dict[str, Optional[float]]  # "p10" ... "p90"
+    histogram: List[int]  # counts per whole grade, [0, 1) up to [19, 20]
+    percentile: Optional[float] = None  # rank of the requested score
@@ -1,5 +1,5 @@
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class CourseCategory(str, Enum):
     DATA = "Data"
@@ -11,6 +11,8 @@ class CourseCategory(str, Enum):
     HANDS_ON = "Hands-On Experience"
 
 class Course(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int = Field(description="Unique course identifier")
     course_name: str
     category: CourseCategory
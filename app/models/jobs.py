@@ -0,0 +1,19 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from app.models.analysis import AnalysisResponse
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    total: int = Field(description="Transcripts submitted")
+    completed: int = Field(description="Transcripts scored so far")
+    error: Optional[str] = None  # why a failed job stopped
+    created_at: datetime
+    updated_at: datetime
+    expires_at: datetime = Field(description="When the job and its results are removed")
+
+class JobResultsPage(JobStatus):
+    offset: int
+    next_offset: Optional[int] = Field(None, description="Offset of the next page; null on the last one")
+    results: List[AnalysisResponse]  # in submission order
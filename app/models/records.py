@@ -0,0 +1,143 @@
+"""Compact internal records used on the hot path.
+
+Pydantic models stay at the API boundary; inside the service the catalogue
+and intermediate results are plain __slots__ objects with the same attribute
+names, so the response models can validate them with from_attributes.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class _Record:
+    """Value equality and a readable repr over __slots__."""
+
+    __slots__ = ()
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class CourseRecord(_Record):
+    __slots__ = ("id", "course_name", "category", "phase", "credits", "position")
+
+    def __init__(self, id: int, course_name: str, category: str, phase: int, credits: int, position: int = 0):
+        self.id = id
+        self.course_name = course_name
+        self.category = category
+        self.phase = phase
+        self.credits = credits
+        self.position = position
+
+    @classmethod
+    def from_course(cls, course: Any, position: int) -> "CourseRecord":
+        """Build from a Course model or any object with the same attributes."""
+        if type(course) is cls and course.position == position:
+            return course
+        return cls(
+            course.id,
+            course.course_name,
+            getattr(course.category, "value", course.category),
+            course.phase,
+            course.credits,
+            position,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "course_name": self.course_name,
+            "category": self.category,
+            "phase": self.phase,
+            "credits": self.credits,
+        }
+
+
+
+class CategoryResult(_Record):
+    __slots__ = ("category", "average_grade", "total_credits", "course_ids", "percentile")
+
+    def __init__(self, category: str, average_grade: float, total_credits: int,
+                 course_ids: Optional[List[int]] = None, percentile: Optional[float] = None):
+        self.category = category
+        self.average_grade = average_grade
+        self.total_credits = total_credits
+        self.course_ids = course_ids
+        self.percentile = percentile
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "category": self.category,
+            "average_grade": self.average_grade,
+            "total_credits": self.total_credits,
+        }
+        if self.course_ids is not None:
+            data["course_ids"] = self.course_ids
+        if self.percentile is not None:
+            data["percentile"] = self.percentile
+        return data
+
+
+class FieldResult(_Record):
+    __slots__ = ("field", "score", "signal_strength", "contributors", "evidence_level", "percentile")
+
+    def __init__(self, field: str, score: float, signal_strength: str,
+                 contributors: Optional[Dict[str, List[str]]], evidence_level: str,
+                 percentile: Optional[float] = None):
+        self.field = field
+        self.score = score
+        self.signal_strength = signal_strength
+        self.contributors = contributors
+        self.evidence_level = evidence_level
+        self.percentile = percentile
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "field": self.field,
+            "score": self.score,
+            "signal_strength": self.signal_strength,
+        }
+        if self.contributors is not None:
+            data["contributors"] = self.contributors
+        data["evidence_level"] = self.evidence_level
+        if self.percentile is not None:
+            data["percentile"] = self.percentile
+        return data
+
+
+# Contributor detail, from cheapest to complete:
+#   summary     no contributors
+#   categories  contributing categories per field, graded course ids per category
+#   full        contributing categories and course names per field
+DETAIL_LEVELS = ("summary", "categories", "full")
+
+
+class AnalysisOptions(NamedTuple):
+    """What a request wants back: field-signal limits (None means no limit) and detail level."""
+
+    top_k: Optional[int] = None
+    min_score: Optional[float] = None
+    min_evidence_level: Optional[str] = None
+    detail: str = "full"
+
+
+def analysis_to_dict(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain-JSON form of a run_analysis result, in AnalysisResponse field order."""
+    warnings: Optional[List[str]] = result.get("warnings")
+    return {
+        "phase": result["phase"],
+        "coverage": result["coverage"],
+        "confidence": result["confidence"],
+        "category_scores": [cs.to_dict() for cs in result["category_scores"]],
+        "field_signals": [fs.to_dict() for fs in result["field_signals"]],
+        "warnings": warnings,
+    }
@@ -1,13 +1,37 @@
-from typing import List
-from app.data.courses import COURSES
-from app.data.fields import FIELDS
-from app.models.analysis import GradeInput, CategoryScore, FieldSignal
+import heapq
+from operator import attrgetter
+from time import perf_counter
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence
+
+from app.config import settings
+from app.data.curriculum import CurriculumIndex, get_curriculum_index, on_curriculum_reload
+from app.data.programs import get_program_index
+from app.models.analysis import AnalysisRequest, GradeInput
+from app.models.records import AnalysisOptions, CategoryResult, FieldResult
+from app.services.metrics import CATEGORY_STAGE, FIELD_STAGE
+from app.services.result_cache import AnalysisResultCache, transcript_fingerprint
+from app.services.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from app.services.cohort import CohortStats
+
+result_cache = AnalysisResultCache(
+    max_size=settings.analysis_cache_size,
+    ttl=settings.analysis_cache_ttl
+)
+on_curriculum_reload(lambda index: result_cache.clear())
+
+# Cache misses for the same fingerprint that overlap share one run_analysis
+analysis_flight = SingleFlight(max_waiters=settings.analysis_coalesce_max_waiters)
+
+# Lowest score for each signal strength above "Emerging", strongest first
+SIGNAL_THRESHOLDS = (("Strong", 14), ("Consistent", 11))
 
 def signal_strength(score: float) -> str:
-    if score >= 14:
-        return "Strong"
-    if score >= 11:
-        return "Consistent"
+    for level, threshold in SIGNAL_THRESHOLDS:
+        if score >= threshold:
+            return level
     return "Emerging"
 
 def calculate_confidence(coverage: float) -> str:
@@ -18,35 +42,84 @@ def calculate_confidence(coverage: float) -> str:
         return "Medium"
     return "Low"
 
+# Ordered weakest to strongest, for min_evidence_level
+EVIDENCE_LEVELS = ("Partial", "Complete")
+
+
+class FieldSelector:
+    """Keep only the field signals a request asked for, best first.
+
+    Fields are offered as they are scored; with top_k a size-k min-heap keeps
+    the running best, so contributor lists and result objects are built only
+    for the fields returned. Ties keep field order, as the stable sort of the
+    full list would.
+    """
+
+    __slots__ = ("top_k", "min_score", "min_evidence", "entries")
+
+    def __init__(self, options: Optional[AnalysisOptions] = None):
+        options = options or AnalysisOptions()
+        self.top_k = options.top_k
+        self.min_score = options.min_score
+        self.min_evidence = EVIDENCE_LEVELS.index(options.min_evidence_level or EVIDENCE_LEVELS[0])
+        self.entries: List[tuple] = []
+
+    def offer(self, order: int, score: float, evidence_level: str, payload: Any) -> None:
+        rounded = round(score, 2)
+        if self.min_score is not None and rounded < self.min_score:
+            return
+        if EVIDENCE_LEVELS.index(evidence_level) < self.min_evidence:
+            return
+        # (score, -order) is unique, so payloads are never compared
+        entry = (rounded, -order, payload)
+        if self.top_k is None:
+            self.entries.append(entry)
+        elif len(self.entries) < self.top_k:
+            heapq.heappush(self.entries, entry)
+        elif entry > self.entries[0]:
+            heapq.heapreplace(self.entries, entry)
+
+    def best(self) -> List[Any]:
+        """Payloads of the kept fields, highest score first."""
+        return [payload for _, _, payload in sorted(self.entries, reverse=True)]
+
+
 def run_analysis(
     current_phase: int,
-    grades: List[GradeInput]
+    grades: List[GradeInput],
+    index: Optional[CurriculumIndex] = None,
+    options: Optional[AnalysisOptions] = None,
+    cohort: Optional["CohortStats"] = None
 ) -> dict:
-
+    """Score a transcript; with a cohort, each score also gets its percentile rank."""
+    index = index or get_curriculum_index()
+    detail = (options or AnalysisOptions()).detail
+    started = perf_counter()
     warnings = []
     
     # Index grades by course name
     grade_map = {g.course_name: g.grade for g in grades}
 
-    # Filter courses by phase
-    eligible_courses = [
-        c for c in COURSES if c.phase <= current_phase
-    ]
+    # Graded courses eligible for the phase, in catalogue order
+    graded_courses = sorted(
+        (
+            index.by_name[name] for name in grade_map
+            if name in index.by_name and index.by_name[name].phase <= current_phase
+        ),
+        key=attrgetter("position")
+    )
     
     # Check if no eligible courses for phase
-    if not eligible_courses:
+    if not index.eligible_courses(current_phase):
         warnings.append(f"No courses available for phase {current_phase}")
 
     category_totals = {}
     category_credits = {}
 
     completed_credits = 0
-    total_credits = sum(c.credits for c in eligible_courses)
-
-    for course in eligible_courses:
-        if course.course_name not in grade_map:
-            continue
+    total_credits = index.total_credits(current_phase)
 
+    for course in graded_courses:
         grade = grade_map[course.course_name]
         completed_credits += course.credits
 
@@ -57,6 +130,13 @@ def run_analysis(
 
         category_totals[category] += grade * course.credits
         category_credits[category] += course.credits
+
+    # Compact references that stand in for per-field course lists
+    category_course_ids = None
+    if detail == "categories":
+        category_course_ids = {}
+        for course in graded_courses:
+            category_course_ids.setdefault(course.category, []).append(course.id)
     
     # Check if grades submitted but none matched
     if grades and completed_credits == 0:
@@ -67,10 +147,11 @@ def run_analysis(
     for category in category_totals:
         avg = category_totals[category] / category_credits[category]
         category_scores.append(
-            CategoryScore(
+            CategoryResult(
                 category=category,
                 average_grade=round(avg, 2),
-                total_credits=category_credits[category]
+                total_credits=category_credits[category],
+                course_ids=None if category_course_ids is None else category_course_ids[category]
             )
         )
 
@@ -88,13 +169,26 @@ def run_analysis(
         for cs in category_scores
     }
 
-    field_signals = []
+    scored_categories = perf_counter()
+    CATEGORY_STAGE.observe(scored_categories - started)
+
+    # Only fields that weight a graded category can produce a signal
+    candidate_fields = sorted(
+        {
+            field
+            for category in category_score_map
+            for field in index.category_fields.get(category, ())
+        },
+        key=index.field_order.__getitem__
+    )
 
-    for field, weights in FIELDS.items():
+    selector = FieldSelector(options)
+
+    for order, field in enumerate(candidate_fields):
+        weights = index.fields[field]
         total_weight = 0
         weighted_sum = 0
         contributing_categories = []
-        contributing_courses = []
 
         for category, weight in weights.items():
             if category in category_score_map:
@@ -111,29 +205,41 @@ def run_analysis(
         all_categories = set(weights.keys())
         present_categories = set(contributing_categories)
         evidence_level = "Complete" if present_categories == all_categories else "Partial"
-        
-        # Find contributing courses
-        for course in eligible_courses:
-            if course.category in contributing_categories:
-                if course.course_name in grade_map:
-                    contributing_courses.append(course.course_name)
+
+        selector.offer(order, score, evidence_level, (field, score, contributing_categories, evidence_level))
+
+    # Contributor lists only for the fields that are returned, strongest first
+    field_signals = []
+    for field, score, contributing_categories, evidence_level in selector.best():
+        if detail == "full":
+            present_categories = set(contributing_categories)
+            contributing_courses = [
+                course.course_name for course in graded_courses
+                if course.category in present_categories
+            ]
+            contributors = {
+                "categories": contributing_categories,
+                "courses": contributing_courses
+            }
+        elif detail == "categories":
+            contributors = {"categories": contributing_categories}
+        else:
+            contributors = None
 
         field_signals.append(
-            FieldSignal(
+            FieldResult(
                 field=field,
                 score=round(score, 2),
                 signal_strength=signal_strength(score),
-                contributors={
-                    "categories": contributing_categories,
-                    "courses": contributing_courses
-                },
+                contributors=contributors,
                 evidence_level=evidence_level
             )
         )
 
     # Sort outputs for better UX (strongest signals first)
     category_scores.sort(key=lambda x: x.average_grade, reverse=True)
-    field_signals.sort(key=lambda x: x.score, reverse=True)
+
+    FIELD_STAGE.observe(perf_counter() - scored_categories)
 
     # Calculate confidence
     confidence = calculate_confidence(coverage)
@@ -150,4 +256,297 @@ def run_analysis(
     if warnings:
         result["warnings"] = warnings
     
+    return cohort.annotate(result) if cohort is not None else result
+
+
+def run_analysis_cached(
+    current_phase: int,
+    grades: List[GradeInput],
+    index: Optional[CurriculumIndex] = None,
+    options: Optional[AnalysisOptions] = None,
+    cohort: Optional["CohortStats"] = None
+) -> dict:
+    """run_analysis memoized on the transcript fingerprint and catalogue version.
+
+    Concurrent misses for the same key (e.g. from threadpool routes) are
+    computed once. Percentiles change as the cohort grows, so they are added
+    after the cache.
+    """
+    index = index or get_curriculum_index()
+    key = transcript_fingerprint(current_phase, grades, index.version, options)
+    result = result_cache.get(key)
+    if result is None:
+        def compute() -> dict:
+            computed = run_analysis(current_phase, grades, index=index, options=options)
+            result_cache.put(key, computed)
+            return computed
+
+        result = analysis_flight.do(key, compute)
+    if cohort is not None:
+        return cohort.annotate(result)
+    # Callers get their own top-level dict; the cached one stays untouched
+    return dict(result)
+
+
+def _scoring_matrices(index: CurriculumIndex) -> SimpleNamespace:
+    """The scoring matrices for a catalogue, built once and kept with its index."""
+    return index.derived("matrices", lambda: _build_scoring_matrices(index))
+
+
+def _build_scoring_matrices(index: CurriculumIndex) -> SimpleNamespace:
+    """Precompute the course→category and category→field weight matrices."""
+    # NumPy is only needed for batches; importing it lazily keeps worker startup fast
+    import numpy as np
+
+    courses = index.courses
+    categories = list(dict.fromkeys(c.category for c in courses))
+    category_index = {category: k for k, category in enumerate(categories)}
+    n_categories = len(categories)
+
+    credits = np.array([c.credits for c in courses], dtype=np.float64)
+    phases = np.array([c.phase for c in courses], dtype=np.int64)
+    course_category = np.array(
+        [category_index[c.category] for c in courses], dtype=np.int64
+    )
+
+    # One-hot course→category matrix, and its credit-weighted twin
+    course_to_category = np.zeros((len(courses), n_categories), dtype=np.float64)
+    course_to_category[np.arange(len(courses)), course_category] = 1.0
+    course_credits = course_to_category * credits[:, None]
+
+    # Category→field weights, laid out as one slot per position in each
+    # field's weight dict so accumulation follows the same order as
+    # run_analysis. Index n_categories is a padding column that is never present.
+    fields = list(index.fields)
+    n_slots = max((len(weights) for weights in index.fields.values()), default=0)
+    slot_categories = np.full((n_slots, len(fields)), n_categories, dtype=np.int64)
+    slot_weights = np.zeros((n_slots, len(fields)), dtype=np.float64)
+    for f, weights in enumerate(index.fields.values()):
+        for p, (category, weight) in enumerate(weights.items()):
+            slot_categories[p, f] = category_index.get(category, n_categories)
+            slot_weights[p, f] = weight
+
+    return SimpleNamespace(
+        index=index,
+        categories=categories,
+        category_index=category_index,
+        course_index={c.course_name: c.position for c in courses},
+        credits=credits,
+        phases=phases,
+        course_category=course_category,
+        course_to_category=course_to_category,
+        course_credits=course_credits,
+        fields=fields,
+        slot_categories=slot_categories,
+        slot_weights=slot_weights,
+    )
+
+
+def run_analysis_batch(
+    requests: Sequence[AnalysisRequest],
+    index: Optional[CurriculumIndex] = None
+) -> List[dict]:
+    """Score many transcripts at once; each result matches run_analysis.
+
+    Without an index, each request is scored against its own programme's
+    catalogue, one vectorized pass per programme.
+    """
+    if index is not None:
+        return _score_batch(requests, index)
+    positions: Dict[Optional[str], List[int]] = {}
+    for i, request in enumerate(requests):
+        positions.setdefault(getattr(request, "program", None), []).append(i)
+    if len(positions) <= 1:
+        return _score_batch(requests, get_program_index(next(iter(positions), None)))
+
+    results: List[Any] = [None] * len(requests)
+    for program, members in positions.items():
+        scored = _score_batch([requests[i] for i in members], get_program_index(program))
+        for i, result in zip(members, scored):
+            results[i] = result
+    return results
+
+
+def _score_batch(requests: Sequence[AnalysisRequest], index: CurriculumIndex) -> List[dict]:
+    import numpy as np
+
+    m = _scoring_matrices(index)
+    n_students = len(requests)
+    n_courses = len(m.credits)
+    if n_students == 0:
+        return []
+
+    # Students×courses grade matrix; later duplicates overwrite earlier ones,
+    # mirroring the grade_map built by run_analysis
+    grade_matrix = np.zeros((n_students, n_courses), dtype=np.float64)
+    graded = np.zeros((n_students, n_courses), dtype=bool)
+    current_phases = np.empty(n_students, dtype=np.int64)
+    for i, request in enumerate(requests):
+        current_phases[i] = request.current_phase
+        for g in request.grades:
+            j = m.course_index.get(g.course_name)
+            if j is not None:
+                grade_matrix[i, j] = g.grade
+                graded[i, j] = True
+
+    graded &= m.phases[None, :] <= current_phases[:, None]
+    grade_matrix[~graded] = 0.0
+
+    # Category aggregation
+    category_totals = (grade_matrix * m.credits) @ m.course_to_category
+    category_credits = graded.astype(np.float64) @ m.course_credits
+    category_present = graded.astype(np.float64) @ m.course_to_category > 0
+    completed_credits = category_credits.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        averages = np.where(category_present, category_totals / category_credits, 0.0)
+
+    # Field scoring works on rounded averages, like run_analysis
+    rounded = np.array(
+        [[round(avg, 2) for avg in row] for row in averages.tolist()],
+        dtype=np.float64,
+    ).reshape(n_students, -1)
+    padding = np.zeros((n_students, 1))
+    rounded = np.hstack([rounded, padding])
+    present = np.hstack([category_present, padding.astype(bool)])
+
+    weighted_sums = np.zeros((n_students, len(m.fields)), dtype=np.float64)
+    total_weights = np.zeros((n_students, len(m.fields)), dtype=np.float64)
+    for slot_categories, slot_weights in zip(m.slot_categories, m.slot_weights):
+        slot_present = present[:, slot_categories]
+        weighted_sums += np.where(slot_present, rounded[:, slot_categories] * slot_weights, 0.0)
+        total_weights += np.where(slot_present, slot_weights, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        field_scores = weighted_sums / total_weights
+
+    results = []
+    for i, request in enumerate(requests):
+        results.append(
+            _assemble_batch_result(
+                m,
+                request,
+                graded_columns=np.flatnonzero(graded[i]).tolist(),
+                category_credits=category_credits[i].tolist(),
+                rounded=rounded[i].tolist(),
+                present=present[i].tolist(),
+                completed_credits=int(completed_credits[i]),
+                total_weights=total_weights[i].tolist(),
+                field_scores=field_scores[i].tolist(),
+            )
+        )
+    return results
+
+
+def iter_analysis_batch(
+    requests: Sequence[AnalysisRequest],
+    chunk_size: int = 500,
+    index: Optional[CurriculumIndex] = None
+) -> Iterator[dict]:
+    """Yield batch results chunk by chunk so callers can stream them."""
+    for start in range(0, len(requests), chunk_size):
+        yield from run_analysis_batch(requests[start:start + chunk_size], index=index)
+
+
+def _assemble_batch_result(
+    m: SimpleNamespace,
+    request: AnalysisRequest,
+    graded_columns: List[int],
+    category_credits: List[float],
+    rounded: List[float],
+    present: List[bool],
+    completed_credits: int,
+    total_weights: List[float],
+    field_scores: List[float],
+) -> dict:
+    """Build one AnalysisResponse-shaped dict from a row of the batch matrices."""
+    current_phase = request.current_phase
+    options = request.analysis_options()
+    detail = (options or AnalysisOptions()).detail
+    warnings = []
+
+    if not m.index.eligible_courses(current_phase):
+        warnings.append(f"No courses available for phase {current_phase}")
+
+    if request.grades and completed_credits == 0:
+        warnings.append("Grades were submitted but none matched eligible courses for this phase")
+
+    # Categories appear in the order their first graded course does
+    category_order = list(dict.fromkeys(m.course_category[j] for j in graded_columns))
+    category_course_ids = None
+    if detail == "categories":
+        category_course_ids = {k: [] for k in category_order}
+        for j in graded_columns:
+            category_course_ids[m.course_category[j]].append(m.index.courses[j].id)
+    category_scores = [
+        CategoryResult(
+            category=m.categories[k],
+            average_grade=rounded[k],
+            total_credits=int(category_credits[k]),
+            course_ids=None if category_course_ids is None else category_course_ids[k]
+        )
+        for k in category_order
+    ]
+
+    total_credits = m.index.total_credits(current_phase)
+    coverage = round(
+        completed_credits / total_credits, 2
+    ) if total_credits > 0 else 0.0
+
+    if coverage < 0.2 and coverage > 0:
+        warnings.append(f"Very low coverage ({coverage:.0%}): Results may not be representative")
+
+    selector = FieldSelector(options)
+    for f, (field, weights) in enumerate(m.index.fields.items()):
+        if total_weights[f] == 0:
+            continue
+
+        contributing_categories = [
+            category for category in weights
+            if present[m.category_index.get(category, len(m.categories))]
+        ]
+        evidence_level = "Complete" if set(contributing_categories) == set(weights) else "Partial"
+        score = field_scores[f]
+        selector.offer(f, score, evidence_level, (field, score, contributing_categories, evidence_level))
+
+    field_signals = []
+    for field, score, contributing_categories, evidence_level in selector.best():
+        if detail == "full":
+            contributing_columns = {m.category_index[category] for category in contributing_categories}
+            contributing_courses = [
+                m.index.courses[j].course_name for j in graded_columns
+                if m.course_category[j] in contributing_columns
+            ]
+            contributors = {
+                "categories": contributing_categories,
+                "courses": contributing_courses
+            }
+        elif detail == "categories":
+            contributors = {"categories": contributing_categories}
+        else:
+            contributors = None
+
+        field_signals.append(
+            FieldResult(
+                field=field,
+                score=round(score, 2),
+                signal_strength=signal_strength(score),
+                contributors=contributors,
+                evidence_level=evidence_level
+            )
+        )
+
+    category_scores.sort(key=lambda x: x.average_grade, reverse=True)
+
+    result = {
+        "phase": current_phase,
+        "coverage": coverage,
+        "confidence": calculate_confidence(coverage),
+        "category_scores": category_scores,
+        "field_signals": field_signals
+    }
+
+    if warnings:
+        result["warnings"] = warnings
+
     return result
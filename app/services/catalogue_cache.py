@@ -0,0 +1,124 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from app.api.encoding import JSON, MSGPACK, Negotiated, compress, dump_json, encode
+from app.data.curriculum import on_curriculum_reload
+from app.data.programs import programs
+from app.models.course import CourseCategory
+from app.models.records import CourseRecord
+from app.services.course_service import CourseIndexes, CourseRepository, program_indexes
+
+CACHE_CONTROL = "public, max-age=300"
+
+_ETAG_SUFFIXES = {JSON: "", MSGPACK: "-msgpack"}
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    content_encoding: Optional[str] = None
+
+
+class CatalogueEntry:
+    """One filtered course list and its serialized representations.
+
+    The identity JSON body is built up front, unless the storage already has
+    one; MessagePack and compressed variants are built on first request and
+    kept. Every variant has its own ETag, derived from the JSON body.
+    """
+
+    def __init__(self, courses: Sequence[CourseRecord], body: Optional[bytes] = None):
+        self.courses = courses
+        if body is None:
+            body = dump_json(self.payload())
+        self._digest = hashlib.sha256(body).hexdigest()[:32]
+        self._variants: Dict[Negotiated, CachedResponse] = {Negotiated(): CachedResponse(body, f'"{self._digest}"')}
+        self._lock = threading.RLock()
+
+    def payload(self) -> List[Dict[str, Any]]:
+        return [c.to_dict() for c in self.courses]
+
+    def variant(self, negotiated: Negotiated = Negotiated()) -> CachedResponse:
+        cached = self._variants.get(negotiated)
+        if cached is not None:
+            return cached
+        with self._lock:
+            if negotiated not in self._variants:
+                self._variants[negotiated] = self._render(negotiated)
+        return self._variants[negotiated]
+
+    def _render(self, negotiated: Negotiated) -> CachedResponse:
+        identity = Negotiated(negotiated.media_type)
+        if negotiated != identity:
+            body, etag, _ = self.variant(identity)
+            if not negotiated.wants_compression(body):
+                return CachedResponse(body, etag)
+            return CachedResponse(
+                compress(body, negotiated.coding, cached=True),
+                f'{etag[:-1]}-{negotiated.coding}"',
+                negotiated.coding,
+            )
+        body = encode(self.payload(), negotiated.media_type)
+        return CachedResponse(body, f'"{self._digest}{_ETAG_SUFFIXES[negotiated.media_type]}"')
+
+
+class CatalogueResponseCache:
+    """Pre-serialized bodies for every GET /courses filter combination."""
+
+    def __init__(self, indexes: Callable[[], CourseIndexes] = CourseRepository.indexes):
+        self._indexes = indexes
+        self._entries: Optional[Dict[Tuple[Optional[int], Optional[str]], CatalogueEntry]] = None
+        self._empty = CatalogueEntry([])
+
+    def warm(self) -> Dict[Tuple[Optional[int], Optional[str]], CatalogueEntry]:
+        """Serialize every filter combination up front."""
+        indexes = self._indexes()
+        entries = {
+            key: CatalogueEntry(courses, indexes.body(key))
+            for key, courses in indexes.filtered.items()
+        }
+        self._entries = entries
+        return entries
+
+    def invalidate(self) -> None:
+        self._entries = None
+
+    def get(
+        self,
+        phase: Optional[int] = None,
+        category: Optional[CourseCategory] = None,
+        negotiated: Negotiated = Negotiated()
+    ) -> CachedResponse:
+        # Read once: a catalogue reload may invalidate from another thread
+        entries = self._entries
+        if entries is None:
+            entries = self.warm()
+        if category is not None:
+            category = CourseCategory(category).value
+        return entries.get((phase, category), self._empty).variant(negotiated)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    candidates: Iterable[str] = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in candidates)
+
+
+catalogue_cache = CatalogueResponseCache()
+
+
+def catalogue_for(program: Optional[str] = None) -> CatalogueResponseCache:
+    """The response cache for a programme, or the default catalogue; raises UnknownProgram.
+
+    A programme's bodies are serialized on its first GET /courses and
+    dropped when the programme is evicted.
+    """
+    if program is None:
+        return catalogue_cache
+    entry = programs.get(program)
+    return entry.derived("catalogue", lambda: CatalogueResponseCache(lambda: program_indexes(entry)))
+
+# Re-serialize in the reloading thread; requests keep the old bodies until then
+on_curriculum_reload(lambda index: catalogue_cache.warm())
@@ -0,0 +1,325 @@
+"""Cohort statistics: score distributions per (phase, category) and (phase, field).
+
+Category averages and field scores are rounded to two decimals on the 0-20
+scale, so a fixed histogram with one bucket per hundredth (2001 buckets)
+holds them exactly. Histograms merge by adding counts, which is how results
+scored in worker processes and statistics saved by other server processes
+are combined. Percentile and quantile queries use a cumulative count that is
+rebuilt once after each change, so they are constant time.
+
+Each degree programme has its own cohort, nested in the default one, since
+its categories and fields are scored against a different catalogue.
+
+With a stats file configured, `sync` folds the scores ingested since the
+last sync into the file under an exclusive lock and reloads the total, so
+every server process sharing the file converges on the same cohort.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.analysis import AnalysisRequest
+from app.models.records import CategoryResult, FieldResult
+from app.services.analysis_service import run_analysis_batch
+
+logger = logging.getLogger(__name__)
+
+STATS_FORMAT = 1
+SCALE = 100
+BUCKETS = 20 * SCALE + 1
+QUANTILES = (10, 25, 50, 75, 90)
+
+# (phase, kind, name)
+Key = Tuple[int, str, str]
+
+
+def _buckets(values: Sequence[float]) -> np.ndarray:
+    return np.clip(np.rint(np.asarray(values, dtype=np.float64) * SCALE), 0, BUCKETS - 1).astype(np.int64)
+
+
+class GradeHistogram:
+    """Counts of scores on the 0-20 scale at 0.01 resolution."""
+
+    __slots__ = ("counts", "_cumulative")
+
+    def __init__(self, counts: Optional[np.ndarray] = None):
+        self.counts = np.zeros(BUCKETS, dtype=np.int64) if counts is None else counts
+        self._cumulative: Optional[np.ndarray] = None
+
+    @property
+    def count(self) -> int:
+        return int(self.cumulative[-1])
+
+    @property
+    def cumulative(self) -> np.ndarray:
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self.counts)
+        return self._cumulative
+
+    def add(self, values: Sequence[float]) -> None:
+        self.counts += np.bincount(_buckets(values), minlength=BUCKETS)
+        self._cumulative = None
+
+    def merge(self, other: "GradeHistogram") -> None:
+        self.counts += other.counts
+        self._cumulative = None
+
+    def percentile_rank(self, value: float) -> Optional[float]:
+        """Percent of the cohort scoring below `value`, counting ties as half."""
+        count = self.count
+        if count == 0:
+            return None
+        bucket = min(max(round(value * SCALE), 0), BUCKETS - 1)
+        below = int(self.cumulative[bucket - 1]) if bucket else 0
+        return round(100 * (below + int(self.counts[bucket]) / 2) / count, 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Smallest score with at least a fraction `q` of the cohort at or below it."""
+        count = self.count
+        if count == 0:
+            return None
+        bucket = int(np.searchsorted(self.cumulative, max(q * count, 1)))
+        return bucket / SCALE
+
+    def mean(self) -> Optional[float]:
+        count = self.count
+        if count == 0:
+            return None
+        return round(float(self.counts @ np.arange(BUCKETS)) / SCALE / count, 2)
+
+    def distribution(self) -> List[int]:
+        """Counts per whole grade: [0, 1), [1, 2), ..., [19, 20]."""
+        bins = np.add.reduceat(self.counts[:-1], np.arange(0, BUCKETS - 1, SCALE))
+        bins[-1] += self.counts[-1]
+        return bins.tolist()
+
+    def to_dict(self) -> Dict[str, List[int]]:
+        buckets = np.flatnonzero(self.counts)
+        return {"buckets": buckets.tolist(), "counts": self.counts[buckets].tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[int]]) -> "GradeHistogram":
+        histogram = cls()
+        np.add.at(histogram.counts, np.asarray(data["buckets"], dtype=np.int64), data["counts"])
+        return histogram
+
+
+class CohortStats:
+    """Histograms for every (phase, category) and (phase, field) seen in ingested results.
+
+    `programs` holds the cohort of each degree programme; the programme
+    cohorts share this one's lock, file and sync.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.histograms: Dict[Key, GradeHistogram] = {}
+        self.transcripts: Dict[int, int] = {}
+        self.programs: Dict[str, CohortStats] = {}
+        # Ingested since the last sync, not yet in the stats file
+        self._pending: Optional[CohortStats] = CohortStats() if path else None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _add(self, values: Dict[Key, List[float]], transcripts: Dict[int, int]) -> None:
+        for key, scores in values.items():
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = GradeHistogram()
+            histogram.add(scores)
+        for phase, n in transcripts.items():
+            self.transcripts[phase] = self.transcripts.get(phase, 0) + n
+
+    def _program(self, program: Optional[str]) -> "CohortStats":
+        if program is None:
+            return self
+        cohort = self.programs.get(program)
+        if cohort is None:
+            cohort = self.programs[program] = CohortStats()
+        return cohort
+
+    def for_program(self, program: Optional[str]) -> "CohortStats":
+        """The cohort to rank a programme's results against; empty if none were ingested."""
+        if program is None:
+            return self
+        return self.programs.get(program) or CohortStats()
+
+    def ingest(self, results: Iterable[Dict[str, Any]], programs: Optional[Iterable[Optional[str]]] = None) -> int:
+        """Add the category averages and field scores of run_analysis results.
+
+        `programs` gives each result's programme, in order; None is the default catalogue.
+        """
+        values: Dict[Optional[str], Dict[Key, List[float]]] = {}
+        transcripts: Dict[Optional[str], Dict[int, int]] = {}
+        for result, program in zip(results, programs if programs is not None else repeat(None)):
+            phase = result["phase"]
+            counts = transcripts.setdefault(program, {})
+            counts[phase] = counts.get(phase, 0) + 1
+            scores = values.setdefault(program, {})
+            for cs in result["category_scores"]:
+                scores.setdefault((phase, "category", cs.category), []).append(cs.average_grade)
+            for fs in result["field_signals"]:
+                scores.setdefault((phase, "field", fs.field), []).append(fs.score)
+
+        with self._lock:
+            for program, counts in transcripts.items():
+                self._program(program)._add(values[program], counts)
+                if self._pending is not None:
+                    self._pending._program(program)._add(values[program], counts)
+        return sum(n for counts in transcripts.values() for n in counts.values())
+
+    def merge(self, other: "CohortStats") -> None:
+        """Add another cohort's counts, e.g. one built in a worker process."""
+        with self._lock:
+            self._merge(other)
+            if self._pending is not None:
+                self._pending._merge(other)
+
+    def _merge(self, other: "CohortStats") -> None:
+        for key, histogram in other.histograms.items():
+            if key in self.histograms:
+                self.histograms[key].merge(histogram)
+            else:
+                self.histograms[key] = GradeHistogram(histogram.counts.copy())
+        for phase, n in other.transcripts.items():
+            self.transcripts[phase] = self.transcripts.get(phase, 0) + n
+        for program, cohort in other.programs.items():
+            self._program(program)._merge(cohort)
+
+    def histogram(self, phase: int, kind: str, name: str) -> Optional[GradeHistogram]:
+        return self.histograms.get((phase, kind, name))
+
+    def percentile_rank(self, phase: int, kind: str, name: str, value: float) -> Optional[float]:
+        histogram = self.histograms.get((phase, kind, name))
+        return histogram.percentile_rank(value) if histogram is not None else None
+
+    def annotate(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """A copy of a run_analysis result with each score ranked against the cohort.
+
+        The records are copied, so cached results are never modified.
+        """
+        phase = result["phase"]
+        annotated = dict(result)
+        annotated["category_scores"] = [
+            CategoryResult(
+                cs.category, cs.average_grade, cs.total_credits, cs.course_ids,
+                percentile=self.percentile_rank(phase, "category", cs.category, cs.average_grade),
+            )
+            for cs in result["category_scores"]
+        ]
+        annotated["field_signals"] = [
+            FieldResult(
+                fs.field, fs.score, fs.signal_strength, fs.contributors, fs.evidence_level,
+                percentile=self.percentile_rank(phase, "field", fs.field, fs.score),
+            )
+            for fs in result["field_signals"]
+        ]
+        return annotated
+
+    def clear(self) -> None:
+        with self._lock:
+            self.histograms = {}
+            self.transcripts = {}
+            self.programs = {}
+            if self._pending is not None:
+                self._pending = CohortStats()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "v": STATS_FORMAT,
+            "transcripts": {str(phase): n for phase, n in sorted(self.transcripts.items())},
+            "histograms": [
+                {"phase": phase, "kind": kind, "name": name, **histogram.to_dict()}
+                for (phase, kind, name), histogram in sorted(self.histograms.items())
+            ],
+        }
+        if self.programs:
+            data["programs"] = {program: cohort.to_dict() for program, cohort in sorted(self.programs.items())}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CohortStats":
+        if data.get("v") != STATS_FORMAT:
+            raise ValueError("Unsupported cohort statistics format")
+        stats = cls()
+        stats.transcripts = {int(phase): n for phase, n in data["transcripts"].items()}
+        for entry in data["histograms"]:
+            stats.histograms[(entry["phase"], entry["kind"], entry["name"])] = GradeHistogram.from_dict(entry)
+        # Files written before programme cohorts have none
+        stats.programs = {program: cls.from_dict(cohort) for program, cohort in data.get("programs", {}).items()}
+        return stats
+
+    # Sent to and from worker processes in the sparse file form
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__()
+        self._merge(CohortStats.from_dict(state))
+
+    def sync(self) -> None:
+        """Fold scores ingested since the last sync into the stats file and reload it.
+
+        Does nothing without a path. A missing file starts empty.
+        """
+        if self.path is None:
+            return
+        with self._sync_lock:
+            with self._lock:
+                pending, self._pending = self._pending, CohortStats()
+            try:
+                with open(f"{self.path}.lock", "w") as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    total = load_cohort_stats(self.path) if os.path.exists(self.path) else CohortStats()
+                    total._merge(pending)
+                    save_cohort_stats(total, self.path)
+            except Exception:
+                # Keep the scores for the next attempt
+                with self._lock:
+                    self._pending._merge(pending)
+                raise
+            with self._lock:
+                # Scores ingested while the file was being written stay pending and visible
+                total._merge(self._pending)
+                self.histograms, self.transcripts, self.programs = total.histograms, total.transcripts, total.programs
+
+
+def load_cohort_stats(path: str) -> CohortStats:
+    with open(path, "r", encoding="utf-8") as f:
+        return CohortStats.from_dict(json.load(f))
+
+
+def save_cohort_stats(stats: CohortStats, path: str) -> None:
+    """Write statistics as JSON, replacing the file atomically."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(stats.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def cohort_from_batch(requests: Sequence[AnalysisRequest]) -> CohortStats:
+    """Score transcripts and collect their statistics; runs in worker processes."""
+    stats = CohortStats()
+    stats.ingest(run_analysis_batch(requests), [r.program for r in requests])
+    return stats
+
+
+async def poll_cohort_stats(stats: CohortStats, interval: float) -> None:
+    """Sync cohort statistics with their file every `interval` seconds, off the event loop."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(stats.sync)
+        except Exception:
+            logger.exception("Cohort statistics sync with %s failed", stats.path)
+
+
+cohort_stats = CohortStats(settings.cohort_stats_file or None)
@@ -1,35 +1,152 @@
-from typing import List, Optional
-from app.models.course import Course, CourseCategory
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Tuple
+from app.data.curriculum import get_curriculum_index, on_curriculum_reload
+from app.data.programs import Program, programs
+from app.models.course import CourseCategory
+from app.models.records import CourseRecord
+
+if TYPE_CHECKING:
+    from app.data.image import CatalogueImage
+
+FilterKey = Tuple[Optional[int], Optional[str]]
+
+
+class CourseIndexes:
+    """Immutable lookups over a course list, precomputed for every filter.
+
+    Storage-agnostic: any repository that can list its courses can build one.
+    Courses are held as CourseRecords; FastAPI turns them into Course models
+    at the response boundary.
+    """
+
+    def __init__(self, courses: Sequence[Any]):
+        self.all: Tuple[CourseRecord, ...] = tuple(
+            c if isinstance(c, CourseRecord) else CourseRecord.from_course(c, i)
+            for i, c in enumerate(courses)
+        )
+        self.by_id: Dict[int, CourseRecord] = {c.id: c for c in self.all}
+
+        by_phase: Dict[int, list] = {}
+        by_category: Dict[str, list] = {}
+        by_phase_category: Dict[FilterKey, list] = {}
+        for course in self.all:
+            by_phase.setdefault(course.phase, []).append(course)
+            by_category.setdefault(course.category, []).append(course)
+            by_phase_category.setdefault((course.phase, course.category), []).append(course)
+
+        self.by_phase: Dict[int, Tuple[CourseRecord, ...]] = {
+            phase: tuple(courses) for phase, courses in by_phase.items()
+        }
+
+        # Every (phase, category) filter, with None meaning "any"
+        self.filtered: Dict[FilterKey, Tuple[CourseRecord, ...]] = {(None, None): self.all}
+        for phase, courses in self.by_phase.items():
+            self.filtered[(phase, None)] = courses
+        for category, courses in by_category.items():
+            self.filtered[(None, category)] = tuple(courses)
+        for key, courses in by_phase_category.items():
+            self.filtered[key] = tuple(courses)
+
+    def filter(
+        self,
+        phase: Optional[int] = None,
+        category: Optional[CourseCategory] = None
+    ) -> Tuple[CourseRecord, ...]:
+        if category is not None:
+            category = CourseCategory(category).value
+        return self.filtered.get((phase, category), ())
+
+    def body(self, key: FilterKey) -> Optional[bytes]:
+        """A prebuilt JSON body for a filter, if the storage has one."""
+        return None
+
+
+class ImageCourseIndexes(CourseIndexes):
+    """CourseIndexes read in place from a catalogue image, bodies included."""
+
+    def __init__(self, image: "CatalogueImage"):
+        from app.data.image import ImageIds
+
+        self.image = image
+        self.filtered: Dict[FilterKey, Sequence[CourseRecord]] = {
+            key: courses for key, (courses, _) in image.filters.items()
+        }
+        self.all = self.filtered[(None, None)]
+        self.by_id = ImageIds(image)
+        self.by_phase = {
+            phase: courses for (phase, category), courses in self.filtered.items()
+            if phase is not None and category is None
+        }
+
+    def body(self, key: FilterKey) -> Optional[bytes]:
+        return self.image.filters[key][1]
+
+
+def build_indexes(courses: Sequence[Any]) -> CourseIndexes:
+    """Indexes over a course list; courses from a catalogue image are indexed in place."""
+    # Only image-backed course lists carry their image
+    image = getattr(courses, "image", None)
+    if image is not None:
+        return ImageCourseIndexes(image)
+    return CourseIndexes(courses)
+
 
 class CourseRepository:
     """Abstraction for data access—will make switching to DB painless."""
-    
+
+    _indexes: Optional[CourseIndexes] = None
+
+    @classmethod
+    def indexes(cls) -> CourseIndexes:
+        if cls._indexes is None:
+            cls._indexes = build_indexes(cls.load())
+        return cls._indexes
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the indexes so they are rebuilt from the next load()."""
+        cls._indexes = None
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """Build fresh indexes and swap them in, so readers never see a gap."""
+        cls._indexes = build_indexes(cls.load())
+
     @staticmethod
-    def get_all() -> List[Course]:
-        from app.data.courses import COURSES
-        return COURSES
+    def load() -> Sequence[CourseRecord]:
+        return get_curriculum_index().courses
+
+    @classmethod
+    def get_all(cls) -> Sequence[CourseRecord]:
+        return cls.indexes().all
     
-    @staticmethod
-    def get_by_id(course_id: int) -> Optional[Course]:
-        all_courses = CourseRepository.get_all()
-        return next((c for c in all_courses if c.id == course_id), None)
+    @classmethod
+    def get_by_id(cls, course_id: int) -> Optional[CourseRecord]:
+        return cls.indexes().by_id.get(course_id)
     
-    @staticmethod
-    def filter(phase: Optional[int] = None, category: Optional[CourseCategory] = None) -> List[Course]:
-        results = CourseRepository.get_all()
-        if phase is not None:
-            results = [c for c in results if c.phase == phase]
-        if category is not None:
-            results = [c for c in results if c.category == category]
-        return results
+    @classmethod
+    def filter(cls, phase: Optional[int] = None, category: Optional[CourseCategory] = None) -> Sequence[CourseRecord]:
+        return cls.indexes().filter(phase=phase, category=category)
+
+on_curriculum_reload(lambda index: CourseRepository.rebuild())
+
+def program_indexes(program: Program) -> CourseIndexes:
+    """Course indexes over one programme's catalogue, kept with the programme."""
+    return program.derived("courses", lambda: build_indexes(program.index.courses))
+
+def course_indexes(program: Optional[str] = None) -> CourseIndexes:
+    """Indexes for a programme, or the default catalogue; raises UnknownProgram."""
+    if program is None:
+        return CourseRepository.indexes()
+    return program_indexes(programs.get(program))
 
 def get_courses(
     phase: Optional[int] = None,
-    category: Optional[CourseCategory] = None
-) -> List[Course]:
+    category: Optional[CourseCategory] = None,
+    program: Optional[str] = None
+) -> Sequence[CourseRecord]:
     """Business logic wrapper around repository."""
-    return CourseRepository.filter(phase=phase, category=category)
+    return course_indexes(program).filter(phase=phase, category=category)
 
-def get_course_by_id(course_id: int) -> Optional[Course]:
+def get_course_by_id(course_id: int, program: Optional[str] = None) -> Optional[CourseRecord]:
     """Fetch a single course by ID."""
-    return CourseRepository.get_by_id(course_id)
+    return course_indexes(program).by_id.get(course_id)
@@ -0,0 +1,295 @@
+"""Incremental analysis: update a previous result with a grade delta.
+
+The client keeps an opaque, HMAC-signed state returned with each result and
+sends it back with the grades that were added, changed or removed. Only the
+categories those grades belong to are re-aggregated; the other category sums
+come from the state. Field signals are re-derived from the category averages,
+which costs one pass over the field weights (the response carries every
+field, so storing them in the state would only make it larger).
+
+Results must match run_analysis exactly, and float sums depend on order, so
+an affected category is re-summed from its stored grades in catalogue order
+rather than patched with +/- adjustments. A state from another catalogue
+version or phase is recomputed in full from its grades. The state names its
+degree programme, and is only valid for updates in that programme.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import zlib
+from operator import attrgetter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.config import settings
+from app.data.curriculum import CurriculumIndex
+from app.data.programs import get_program_index
+from app.models.analysis import GradeInput
+from app.models.records import AnalysisOptions, CategoryResult, CourseRecord, FieldResult
+from app.services.analysis_service import FieldSelector, calculate_confidence, signal_strength
+
+STATE_FORMAT = 1
+
+# Grades for courses that are unknown to the catalogue or beyond the phase
+INELIGIBLE = ""
+
+logger = logging.getLogger(__name__)
+
+# Signing key; without ANALYSIS_STATE_SECRET states only verify in this process
+_secret = settings.analysis_state_secret.encode() or secrets.token_bytes(32)
+
+
+def warn_unshared_secret() -> None:
+    """Log at startup when states are signed with a key private to this process."""
+    if not settings.analysis_state_secret:
+        logger.warning(
+            "ANALYSIS_STATE_SECRET is not set; incremental analysis states are signed with a "
+            "per-process key and fail verification on any other worker"
+        )
+
+
+class InvalidState(Exception):
+    """Raised for state tokens that are malformed or fail verification."""
+
+
+class AnalysisState:
+    """Everything needed to update a result without the full transcript.
+
+    `grades` groups the submitted grades by category; `categories` holds the
+    weighted sum, credit total and first catalogue position of each graded
+    category.
+    """
+
+    __slots__ = ("catalogue", "phase", "grades", "categories", "program")
+
+    def __init__(
+        self,
+        catalogue: str,
+        phase: int,
+        grades: Dict[str, Dict[str, float]],
+        categories: Dict[str, Tuple[float, int, int]],
+        program: Optional[str] = None,
+    ):
+        self.catalogue = catalogue
+        self.phase = phase
+        self.grades = grades
+        self.categories = categories
+        self.program = program
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def encode_state(state: AnalysisState) -> str:
+    payload = json.dumps(
+        {
+            "v": STATE_FORMAT,
+            "catalogue": state.catalogue,
+            "phase": state.phase,
+            "grades": state.grades,
+            "categories": state.categories,
+            "program": state.program,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    body = zlib.compress(payload)
+    signature = hmac.new(_secret, body, hashlib.sha256).digest()
+    return f"{_b64encode(body)}.{_b64encode(signature)}"
+
+
+def decode_state(token: str) -> AnalysisState:
+    try:
+        body_text, signature_text = token.split(".")
+        body, signature = _b64decode(body_text), _b64decode(signature_text)
+    except ValueError:
+        raise InvalidState("Malformed analysis state")
+    if not hmac.compare_digest(signature, hmac.new(_secret, body, hashlib.sha256).digest()):
+        raise InvalidState("Analysis state signature does not match")
+
+    data = json.loads(zlib.decompress(body))
+    if data.get("v") != STATE_FORMAT:
+        raise InvalidState("Unsupported analysis state format")
+    return AnalysisState(
+        catalogue=data["catalogue"],
+        phase=data["phase"],
+        grades=data["grades"],
+        categories={category: tuple(entry) for category, entry in data["categories"].items()},
+        # States signed before programmes were recorded are for the default catalogue
+        program=data.get("program"),
+    )
+
+
+def _category_of(index: CurriculumIndex, course_name: str, phase: int) -> str:
+    course = index.by_name.get(course_name)
+    return course.category if course is not None and course.phase <= phase else INELIGIBLE
+
+
+def _graded_courses(index: CurriculumIndex, names: Iterable[str]) -> List[CourseRecord]:
+    """Courses for the given names, in catalogue order."""
+    return sorted((index.by_name[name] for name in names), key=attrgetter("position"))
+
+
+def update_analysis(
+    state: Optional[AnalysisState],
+    current_phase: int,
+    upsert: Sequence[GradeInput] = (),
+    remove: Sequence[str] = (),
+    index: Optional[CurriculumIndex] = None,
+    options: Optional[AnalysisOptions] = None,
+    program: Optional[str] = None,
+) -> Tuple[dict, AnalysisState]:
+    """Apply a grade delta to a state; returns the run_analysis result and the new state.
+
+    Without a state this is a full analysis of `upsert`. Raises InvalidState
+    for a state from another programme.
+    """
+    if state is not None and state.program != program:
+        raise InvalidState("Analysis state belongs to another programme")
+    index = index or get_program_index(program)
+    detail = (options or AnalysisOptions()).detail
+    reuse = state is not None and state.catalogue == index.version and state.phase == current_phase
+
+    if reuse:
+        grades = {category: dict(names) for category, names in state.grades.items()}
+        categories = dict(state.categories)
+    else:
+        # Regroup every stored grade under the current catalogue and phase
+        grades = {}
+        for names in (state.grades.values() if state is not None else ()):
+            for name, grade in names.items():
+                grades.setdefault(_category_of(index, name, current_phase), {})[name] = grade
+        categories = {}
+
+    # Apply the delta, remembering which categories it touched
+    affected: Set[str] = set()
+    for name in remove:
+        for category in (_category_of(index, name, current_phase), INELIGIBLE):
+            if grades.get(category, {}).pop(name, None) is not None:
+                affected.add(category)
+    for g in upsert:
+        category = _category_of(index, g.course_name, current_phase)
+        grades.setdefault(category, {})[g.course_name] = g.grade
+        affected.add(category)
+    grades = {category: names for category, names in grades.items() if names}
+    if not reuse:
+        affected = set(grades)
+    affected.discard(INELIGIBLE)
+
+    # Re-sum affected categories in catalogue order, as run_analysis does
+    for category in affected:
+        total = 0
+        credits = 0
+        courses = _graded_courses(index, grades.get(category, ()))
+        for course in courses:
+            total += grades[category][course.course_name] * course.credits
+            credits += course.credits
+        if courses:
+            categories[category] = (total, credits, courses[0].position)
+        else:
+            categories.pop(category, None)
+
+    # Categories appear in the order their first graded course does
+    ordered = sorted(categories, key=lambda category: categories[category][2])
+    category_scores = [
+        CategoryResult(
+            category=category,
+            average_grade=round(categories[category][0] / categories[category][1], 2),
+            total_credits=categories[category][1],
+            course_ids=(
+                [c.id for c in _graded_courses(index, grades[category])] if detail == "categories" else None
+            ),
+        )
+        for category in ordered
+    ]
+    category_score_map = {cs.category: cs.average_grade for cs in category_scores}
+
+    candidate_fields = sorted(
+        {field for category in category_score_map for field in index.category_fields.get(category, ())},
+        key=index.field_order.__getitem__,
+    )
+    # Many fields share a set of contributing categories; build each course list once
+    graded: List[CourseRecord] = []
+    contributor_courses: Dict[FrozenSet[str], List[str]] = {}
+
+    def courses_for(present: FrozenSet[str]) -> List[str]:
+        if present not in contributor_courses:
+            if not graded:
+                graded.extend(_graded_courses(
+                    index, (name for category in categories for name in grades[category])
+                ))
+            contributor_courses[present] = [c.course_name for c in graded if c.category in present]
+        return contributor_courses[present]
+
+    selector = FieldSelector(options)
+    for order, field in enumerate(candidate_fields):
+        weights = index.fields[field]
+        total_weight = 0
+        weighted_sum = 0
+        contributing_categories = []
+        for category, weight in weights.items():
+            if category in category_score_map:
+                weighted_sum += category_score_map[category] * weight
+                total_weight += weight
+                contributing_categories.append(category)
+        if total_weight == 0:
+            continue
+
+        score = weighted_sum / total_weight
+        present_categories = frozenset(contributing_categories)
+        evidence_level = "Complete" if present_categories == set(weights) else "Partial"
+        selector.offer(order, score, evidence_level, (field, score, contributing_categories, evidence_level))
+
+    def contributors(contributing_categories: List[str]) -> Optional[dict]:
+        if detail == "full":
+            return {
+                "categories": contributing_categories,
+                "courses": courses_for(frozenset(contributing_categories)),
+            }
+        if detail == "categories":
+            return {"categories": contributing_categories}
+        return None
+
+    field_signals = [
+        FieldResult(
+            field=field,
+            score=round(score, 2),
+            signal_strength=signal_strength(score),
+            contributors=contributors(contributing_categories),
+            evidence_level=evidence_level,
+        )
+        for field, score, contributing_categories, evidence_level in selector.best()
+    ]
+
+    warnings: List[str] = []
+    if not index.eligible_courses(current_phase):
+        warnings.append(f"No courses available for phase {current_phase}")
+
+    completed_credits = sum(credits for _, credits, _ in categories.values())
+    if grades and completed_credits == 0:
+        warnings.append("Grades were submitted but none matched eligible courses for this phase")
+
+    total_credits = index.total_credits(current_phase)
+    coverage = round(completed_credits / total_credits, 2) if total_credits > 0 else 0.0
+    if coverage < 0.2 and coverage > 0:
+        warnings.append(f"Very low coverage ({coverage:.0%}): Results may not be representative")
+
+    category_scores.sort(key=lambda x: x.average_grade, reverse=True)
+
+    result = {
+        "phase": current_phase,
+        "coverage": coverage,
+        "confidence": calculate_confidence(coverage),
+        "category_scores": category_scores,
+        "field_signals": field_signals,
+    }
+    if warnings:
+        result["warnings"] = warnings
+
+    return result, AnalysisState(index.version, current_phase, grades, categories, program)
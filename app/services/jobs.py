@@ -0,0 +1,346 @@
+"""Background analysis jobs for cohorts too large to score within one request.
+
+A job is a batch of transcripts submitted once and scored in a background
+thread, one chunk at a time, through the same process pool as the analysis
+routes. At most JOBS_MAX_RUNNING jobs run at once per server process and
+each holds at most one pool slot, so a cohort never takes every worker
+from interactive traffic; further jobs wait in a queue of JOBS_MAX_PENDING.
+
+Status, progress and results live in SQLite (JOBS_DB; in memory when
+unset), so every server process sharing the database file can report on a
+job, serve its results or cancel it. Only the process that accepted a job
+runs it, and it checks for cancellation between chunks. Each result is
+stored as its JSON body, so pages are assembled from stored bytes. Jobs
+expire JOBS_TTL seconds after their last update and are then removed with
+their results.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.api.encoding import dump_json
+from app.config import settings
+from app.models.analysis import AnalysisRequest
+from app.models.records import analysis_to_dict
+from app.services.analysis_service import run_analysis_batch
+from app.services.offload import AnalysisPool, analysis_pool
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+# Seconds between progress checks of a streamed job
+PROGRESS_INTERVAL = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (job_id, position)
+) WITHOUT ROWID;
+"""
+
+
+class JobQueueFull(Exception):
+    """Raised when this process already holds JOBS_MAX_PENDING unfinished jobs."""
+
+
+class JobStore:
+    """Jobs and their results in one SQLite database, shared by threads and processes.
+
+    Results are only added while a job is running, so a cancelled or expired
+    job never gains results afterwards.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use, so processes that never see a job never open the file
+        if self._conn is None:
+            conn = sqlite3.connect(self.path or ":memory:", timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            if self.path:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _write(self, statements) -> Any:
+        """Run statements(conn) in one immediate transaction and return what it returns."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    def create(self, total: int, ttl: float) -> Dict[str, Any]:
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex, "status": QUEUED, "total": total, "completed": 0, "error": None,
+            "created_at": now, "updated_at": now, "expires_at": now + ttl,
+        }
+        self._write(lambda conn: conn.execute(
+            "INSERT INTO jobs VALUES (:id, :status, :total, :completed, :error, :created_at, :updated_at, :expires_at)",
+            job,
+        ))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job, or None if it does not exist or has expired."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT * FROM jobs WHERE id = ? AND expires_at >= ?", (job_id, time.time())
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def start(self, job_id: str, ttl: float) -> bool:
+        """Mark a queued job running; False if it was cancelled or has expired."""
+        now = time.time()
+        return self._write(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ?, expires_at = ? WHERE id = ? AND status = ?",
+            (RUNNING, now, now + ttl, job_id, QUEUED),
+        ).rowcount) == 1
+
+    def add_results(self, job_id: str, start: int, bodies: Sequence[bytes], ttl: float) -> bool:
+        """Store the results at positions start.. of a running job; False if it stopped running."""
+        now = time.time()
+
+        def statements(conn: sqlite3.Connection) -> bool:
+            updated = conn.execute(
+                "UPDATE jobs SET completed = completed + ?, updated_at = ?, expires_at = ? WHERE id = ? AND status = ?",
+                (len(bodies), now, now + ttl, job_id, RUNNING),
+            ).rowcount
+            if updated:
+                conn.executemany(
+                    "INSERT INTO job_results VALUES (?, ?, ?)",
+                    ((job_id, start + i, body) for i, body in enumerate(bodies)),
+                )
+            return updated == 1
+
+        return self._write(statements)
+
+    def finish(self, job_id: str, status: str, ttl: float, error: Optional[str] = None) -> bool:
+        """Move an unfinished job to a final status; False if it had already finished."""
+        now = time.time()
+        return self._write(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ?, expires_at = ? WHERE id = ? AND status IN (?, ?)",
+            (status, error, now, now + ttl, job_id, QUEUED, RUNNING),
+        ).rowcount) == 1
+
+    def cancel(self, job_id: str, ttl: float) -> Optional[Dict[str, Any]]:
+        """Cancel an unfinished job and discard its results; returns the job as it now is."""
+        now = time.time()
+
+        def statements(conn: sqlite3.Connection) -> None:
+            cancelled = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, expires_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, now, now + ttl, job_id, QUEUED, RUNNING),
+            ).rowcount
+            if cancelled:
+                conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+
+        self._write(statements)
+        return self.get(job_id)
+
+    def delete(self, job_id: str) -> None:
+        def statements(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+        self._write(statements)
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[bytes]:
+        """Stored result bodies from position `offset`, in submission order."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT body FROM job_results WHERE job_id = ? AND position >= ? AND position < ? ORDER BY position",
+                (job_id, offset, offset + limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self) -> int:
+        """Remove expired jobs and their results; returns how many jobs were removed."""
+        if self._conn is None and not self.path:
+            return 0
+        now = time.time()
+
+        def statements(conn: sqlite3.Connection) -> int:
+            conn.execute(
+                "DELETE FROM job_results WHERE job_id IN (SELECT id FROM jobs WHERE expires_at < ?)", (now,)
+            )
+            return conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,)).rowcount
+
+        return self._write(statements)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+def job_to_dict(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain-JSON form of a stored job, in JobStatus field order."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "completed": job["completed"],
+        "error": job["error"],
+        "created_at": _timestamp(job["created_at"]),
+        "updated_at": _timestamp(job["updated_at"]),
+        "expires_at": _timestamp(job["expires_at"]),
+    }
+
+
+def result_body(request: AnalysisRequest, result: Dict[str, Any]) -> bytes:
+    """The stored form of one result: its JSON response body."""
+    if request.percentiles:
+        from app.services.cohort import cohort_stats
+        result = cohort_stats.for_program(request.program).annotate(result)
+    return dump_json(analysis_to_dict(result))
+
+
+class JobQueue:
+    """Runs jobs in background threads, at most max_running at once, a chunk at a time.
+
+    Submissions past max_pending unfinished jobs fail fast with JobQueueFull.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        pool: AnalysisPool,
+        max_running: int,
+        max_pending: int,
+        chunk_size: int,
+        ttl: float
+    ):
+        self.store = store
+        self.pool = pool
+        self.max_running = max_running
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        # Set at shutdown; running jobs stop at their next chunk
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._futures)
+
+    def submit(self, requests: Sequence[AnalysisRequest]) -> Dict[str, Any]:
+        """Store a new job and queue it; raises JobQueueFull when the queue is full."""
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFull()
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.max_running, thread_name_prefix="analysis-job")
+            job = self.store.create(len(requests), self.ttl)
+            self._futures[job["id"]] = self._threads.submit(self._run, job["id"], list(requests), self._stop)
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a job, whichever process runs it; it stops before its next chunk."""
+        return self.store.cancel(job_id, self.ttl)
+
+    def _score(self, chunk: List[AnalysisRequest]) -> List[dict]:
+        if len(chunk) <= settings.analysis_inline_max_batch:
+            return run_analysis_batch(chunk)
+        return self.pool.run(run_analysis_batch, chunk)
+
+    def _run(self, job_id: str, requests: List[AnalysisRequest], stop: threading.Event) -> None:
+        try:
+            if not self.store.start(job_id, self.ttl):
+                return  # cancelled or expired while queued
+            for start in range(0, len(requests), self.chunk_size):
+                if stop.is_set():
+                    self.store.finish(job_id, FAILED, self.ttl, "Server stopped before the job finished")
+                    return
+                chunk = requests[start:start + self.chunk_size]
+                bodies = [result_body(request, result) for request, result in zip(chunk, self._score(chunk))]
+                if not self.store.add_results(job_id, start, bodies, self.ttl):
+                    return  # cancelled or expired
+            self.store.finish(job_id, COMPLETED, self.ttl)
+        except Exception as e:
+            logger.exception("Analysis job %s failed", job_id)
+            self.store.finish(job_id, FAILED, self.ttl, str(e) or type(e).__name__)
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def shutdown(self) -> None:
+        """Stop taking jobs; queued jobs fail now and running ones after their current chunk."""
+        with self._lock:
+            threads, self._threads = self._threads, None
+            stop, self._stop = self._stop, threading.Event()
+        if threads is None:
+            return
+        stop.set()
+        threads.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            never_ran = [job_id for job_id, future in self._futures.items() if future.cancelled()]
+            for job_id in never_ran:
+                del self._futures[job_id]
+        for job_id in never_ran:
+            self.store.finish(job_id, FAILED, self.ttl, "Server stopped before the job ran")
+
+
+async def poll_job_cleanup(store: JobStore, interval: float) -> None:
+    """Remove expired jobs every `interval` seconds, off the event loop."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(store.purge)
+        except Exception:
+            logger.exception("Removing expired jobs from %s failed", store.path or "memory")
+
+
+job_queue = JobQueue(
+    JobStore(settings.jobs_db),
+    analysis_pool,
+    max_running=settings.jobs_max_running,
+    max_pending=settings.jobs_max_pending,
+    chunk_size=settings.jobs_chunk_size,
+    ttl=settings.jobs_ttl
+)
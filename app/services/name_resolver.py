@@ -0,0 +1,109 @@
+"""Course-name resolution: case-insensitive matches and typo suggestions.
+
+Clients send names as registrars spell them: "databases", "Data Processing
+and Analysis". A name that is not in the catalogue exactly is looked up by
+its normalized key (NFKC, case-folded, "&" as "and", whitespace collapsed)
+and replaced by the canonical name. A name that still misses gets the catalogue names
+closest to it by trigram similarity as suggestions, but is never guessed.
+
+The normalized map and the trigram index are built from the catalogue the
+first time a name misses, then reused; exact names never touch them.
+Candidates come from the query's rarest trigrams first, within a budget, so
+common trigrams shared by thousands of names do not make lookups slower as
+the catalogue grows.
+"""
+import unicodedata
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Set
+
+from app.data.curriculum import CurriculumIndex
+
+# pg_trgm's default: share at least 30% of trigrams (Jaccard)
+SIMILARITY_THRESHOLD = 0.3
+SUGGESTIONS = 3
+# Posting-list entries counted per lookup, rarest trigrams first
+CANDIDATE_BUDGET = 2048
+# Best partial matches whose similarity is computed exactly
+CANDIDATES_VERIFIED = 32
+
+
+def normalize(name: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().replace("&", " and ").split())
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CourseNameResolver:
+    """Canonical names for normalized keys, and a trigram index for suggestions."""
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+        self.keys = [normalize(name) for name in self.names]
+        # Names that collide once normalized are ambiguous and never resolved
+        self._canonical: Dict[str, Optional[str]] = {}
+        for name, key in zip(self.names, self.keys):
+            self._canonical[key] = None if key in self._canonical else name
+        self._postings: Optional[Dict[str, array]] = None
+        self._sizes = array("H")  # trigrams per key
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The catalogue name `name` normalizes to, or None."""
+        return self._canonical.get(normalize(name))
+
+    def suggest(self, name: str, limit: int = SUGGESTIONS) -> List[str]:
+        """Up to `limit` catalogue names most similar to `name`, best first."""
+        query = trigrams(normalize(name))
+        postings = self._trigram_index()
+        matching = sorted((postings[g] for g in query if g in postings), key=len)
+        selected = []
+        budget = CANDIDATE_BUDGET
+        for posting in matching:
+            if len(posting) > budget and selected:
+                break
+            selected.append(posting)
+            budget -= len(posting)
+        counts = Counter(chain.from_iterable(selected))
+        # Counts are the shared trigrams unless postings were skipped
+        exact = len(selected) == len(matching)
+
+        scored = []
+        best = sorted(counts.items(), key=itemgetter(1), reverse=True)[:CANDIDATES_VERIFIED]
+        for i, shared in best:
+            if not exact:
+                # A query trigram is in a candidate's set when it occurs in its padded key
+                shared = sum(map(f"  {self.keys[i]} ".__contains__, query))
+            similarity = shared / (len(query) + self._sizes[i] - shared)
+            if similarity >= SIMILARITY_THRESHOLD:
+                scored.append((-similarity, i))
+        return [self.names[i] for _, i in sorted(scored)[:limit]]
+
+    def _trigram_index(self) -> Dict[str, array]:
+        if self._postings is None:
+            postings: Dict[str, List[int]] = defaultdict(list)
+            sizes = array("H")
+            for i, key in enumerate(self.keys):
+                grams = trigrams(key)
+                sizes.append(min(len(grams), 0xFFFF))
+                for gram in grams:
+                    postings[gram].append(i)
+            self._sizes = sizes
+            self._postings = {gram: array("I", ids) for gram, ids in postings.items()}
+        return self._postings
+
+
+def name_resolver(index: CurriculumIndex) -> CourseNameResolver:
+    """The resolver for a catalogue, built on its first unknown name and kept with its index."""
+    return index.derived("resolver", lambda: CourseNameResolver([c.course_name for c in index.courses]))
+
+
+def resolve_course_name(name: str, index: CurriculumIndex) -> Optional[str]:
+    """`name` itself if it is in the catalogue, else its canonical spelling, else None."""
+    if name in index:
+        return name
+    return name_resolver(index).resolve(name)
@@ -0,0 +1,230 @@
+import asyncio
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, List, Optional, Sequence
+from app.config import settings
+from app.data.curriculum import CurriculumIndex, get_curriculum_index, on_curriculum_reload, reload_curriculum
+from app.data.programs import get_program_index
+from app.models.analysis import AnalysisRequest, GradeInput
+from app.models.records import AnalysisOptions
+from app.services.analysis_service import (
+    analysis_flight,
+    result_cache,
+    run_analysis,
+    run_analysis_batch,
+    run_analysis_cached,
+)
+from app.services.result_cache import transcript_fingerprint
+
+if TYPE_CHECKING:
+    from app.services.cohort import CohortStats
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+def _init_worker(courses, fields, image: Optional[str] = None) -> None:
+    # Workers score against the catalogue the parent had when the pool started;
+    # an image is mapped again rather than copied, so its pages stay shared
+    if image:
+        from app.data.image import read_image
+        reload_curriculum(index=read_image(image))
+    else:
+        reload_curriculum(courses=courses, fields=fields)
+
+
+def _worker_catalogue(index: CurriculumIndex) -> tuple:
+    image = getattr(index, "image", None)
+    if image is not None:
+        return None, None, image.path
+    return index.courses, index.fields
+
+
+class AnalysisPool:
+    """Bounded ProcessPoolExecutor with non-blocking admission control.
+
+    At most max_workers + max_queue jobs are admitted at once; past that,
+    submissions fail fast with PoolSaturated instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                index = get_curriculum_index()
+                # Spawned, not forked: the server process has live threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=_worker_catalogue(index)
+                )
+            return self._pool
+
+    def acquire(self) -> None:
+        """Reserve a slot or raise PoolSaturated."""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise PoolSaturated()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._released.notify()
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn in a worker process; the caller must hold a slot."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), fn, *args)
+
+    async def submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Acquire a slot, run fn in a worker process and release the slot."""
+        self.acquire()
+        try:
+            return await self.call(fn, *args)
+        finally:
+            self.release()
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn in a worker process from a background thread.
+
+        Waits for a free slot instead of raising PoolSaturated, so background
+        work queues behind requests rather than failing.
+        """
+        with self._released:
+            while self.in_flight >= self.capacity:
+                self._released.wait()
+            self.in_flight += 1
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self.release()
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=cancel_futures)
+
+
+analysis_pool = AnalysisPool(
+    max_workers=settings.analysis_pool_workers,
+    max_queue=settings.analysis_pool_queue
+)
+
+# New workers must pick up the new catalogue; running jobs finish on the old one
+on_curriculum_reload(lambda index: analysis_pool.shutdown(cancel_futures=False))
+
+
+def run_program_analysis(
+    program: Optional[str],
+    current_phase: int,
+    grades: List[GradeInput],
+    options: Optional[AnalysisOptions] = None
+) -> dict:
+    """run_analysis against a programme's catalogue; workers load it from PROGRAMS_DIR themselves."""
+    return run_analysis(current_phase, grades, index=get_program_index(program), options=options)
+
+
+async def run_analysis_async(
+    current_phase: int,
+    grades: List[GradeInput],
+    options: Optional[AnalysisOptions] = None,
+    cohort: Optional["CohortStats"] = None,
+    program: Optional[str] = None
+) -> dict:
+    """Score small transcripts inline and offload large ones to the pool.
+
+    Identical transcripts arriving while one is in the pool wait for it
+    rather than taking another worker. Percentiles are added here, against
+    this process's cohort.
+    """
+    index = get_program_index(program)
+    if len(grades) <= settings.analysis_inline_max_grades:
+        return run_analysis_cached(current_phase, grades, index=index, options=options, cohort=cohort)
+
+    key = transcript_fingerprint(current_phase, grades, index.version, options)
+    result = result_cache.get(key)
+    if result is None:
+        async def compute() -> dict:
+            computed = await analysis_pool.submit(run_program_analysis, program, current_phase, grades, options)
+            result_cache.put(key, computed)
+            return computed
+
+        result = await analysis_flight.do_async(key, compute)
+    return cohort.annotate(result) if cohort is not None else dict(result)
+
+
+async def run_analysis_batch_async(requests: Sequence[AnalysisRequest]) -> List[dict]:
+    """Score a batch inline if it is small, otherwise in a worker process."""
+    if len(requests) <= settings.analysis_inline_max_batch:
+        return run_analysis_batch(requests)
+    return await analysis_pool.submit(run_analysis_batch, list(requests))
+
+
+def iter_analysis_batch_async(
+    requests: Sequence[AnalysisRequest],
+    chunk_size: int = 500
+) -> AsyncIterator[dict]:
+    """Stream batch results, scoring one chunk at a time in the pool.
+
+    The slot is taken before the stream is returned, so saturation surfaces
+    as PoolSaturated before the response starts; the stream holds it until
+    it is exhausted or closed.
+    """
+    analysis_pool.acquire()
+    held = [True]
+
+    def release() -> None:
+        if held[0]:
+            held[0] = False
+            analysis_pool.release()
+
+    async def results() -> AsyncIterator[dict]:
+        try:
+            for start in range(0, len(requests), chunk_size):
+                chunk = list(requests[start:start + chunk_size])
+                for result in await analysis_pool.call(run_analysis_batch, chunk):
+                    yield result
+        finally:
+            release()
+
+    stream = results()
+    # A stream dropped before its first result (client gone) never runs its finally
+    weakref.finalize(stream, release)
+    return stream
+
+
+async def cohort_from_batch_async(requests: Sequence[AnalysisRequest], chunk_size: int = 500) -> "CohortStats":
+    """Score a batch for the cohort, splitting large ones across worker processes.
+
+    Each worker returns the statistics of its chunk rather than the results,
+    and the parts are merged here.
+    """
+    from app.services.cohort import CohortStats, cohort_from_batch
+
+    if len(requests) <= settings.analysis_inline_max_batch:
+        return cohort_from_batch(requests)
+
+    size = max(chunk_size, -(-len(requests) // analysis_pool.max_workers))
+    parts = await asyncio.gather(*(
+        analysis_pool.submit(cohort_from_batch, list(requests[start:start + size]))
+        for start in range(0, len(requests), size)
+    ))
+    stats = CohortStats()
+    for part in parts:
+        stats.merge(part)
+    return stats
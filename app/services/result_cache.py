@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.models.analysis import GradeInput
+from app.models.records import AnalysisOptions
+
+
+def transcript_fingerprint(
+    current_phase: int,
+    grades: Iterable[GradeInput],
+    version: str,
+    options: Optional[AnalysisOptions] = None
+) -> str:
+    """Canonical hash of a transcript and the catalogue version it was scored against.
+
+    Duplicate course names collapse to the last grade, as in run_analysis, so
+    reordered or repeated submissions of the same transcript share a key.
+    A signal filter changes the result, so it is part of the key.
+    """
+    grade_map = {g.course_name: g.grade for g in grades}
+    key = (current_phase, sorted(grade_map.items()), version)
+    if options is not None:
+        key += (tuple(options),)
+    canonical = repr(key)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+class AnalysisResultCache:
+    """Thread-safe LRU cache with a per-entry TTL for analysis results."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,146 @@
+"""What-if simulation: field-score ranges and required grades for courses not yet taken.
+
+Every simulated course gets a grade range. Rather than re-running the
+analysis per guess, the grade is swept over a grid, in 0.01 steps, from
+the lowest range minimum to the highest range maximum. Each course takes
+the grid grade clamped to its own range, so the first and last points are
+"every course at its minimum" and "every course at its maximum". Category
+totals and field scores are computed for the whole grid at once, as NumPy
+vectors.
+
+The vectors go through the same operations in the same order as
+run_analysis: catalogue-order sums, averages rounded to two decimals, and
+weights in FIELDS order. Each grid point therefore matches what
+POST /analysis would return for that transcript exactly.
+"""
+import math
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.data.curriculum import CurriculumIndex, get_curriculum_index
+from app.models.analysis import GradeInput, SimulatedCourse
+from app.models.records import AnalysisOptions
+from app.services.analysis_service import SIGNAL_THRESHOLDS, run_analysis_cached, signal_strength
+
+# Grid steps per grade point
+GRID_SCALE = 100
+
+SUMMARY = AnalysisOptions(detail="summary")
+
+
+class SimulationError(Exception):
+    """Raised for simulations that cannot be run against the catalogue."""
+
+
+def _grid(low: float, high: float) -> np.ndarray:
+    """`low`, every grid step strictly between, and `high`."""
+    steps = (k / GRID_SCALE for k in range(math.floor(low * GRID_SCALE), math.ceil(high * GRID_SCALE) + 1))
+    return np.array([low, *(x for x in steps if low < x < high), high])
+
+
+def _round(values: Any) -> Any:
+    # Python's round, as run_analysis uses; np.round can differ in the last digit
+    if isinstance(values, np.ndarray):
+        return np.array([round(v, 2) for v in values.tolist()])
+    return round(values, 2)
+
+
+def simulate(
+    current_phase: int,
+    grades: Sequence[GradeInput],
+    simulated: Sequence[SimulatedCourse],
+    fields: Optional[Sequence[str]] = None,
+    index: Optional[CurriculumIndex] = None,
+) -> Dict[str, Any]:
+    """Score ranges per category and field, and the grade needed for each signal strength.
+
+    A simulated course that was already graded replaces its grade.
+    `required_grade` is the lowest grid grade that, earned in every
+    simulated course, reaches the level, or None if the maxima do not.
+    """
+    index = index or get_curriculum_index()
+    ranges: Dict[str, Tuple[float, float]] = {}
+    for course in simulated:
+        record = index.by_name.get(course.course_name)
+        if record is None:
+            raise SimulationError(f"Unknown course name: '{course.course_name}'")
+        if record.phase > current_phase:
+            raise SimulationError(f"'{course.course_name}' is not available until phase {record.phase}")
+        ranges[course.course_name] = (course.min_grade, course.max_grade)
+    unknown = [field for field in fields or () if field not in index.fields]
+    if unknown:
+        raise SimulationError(f"Unknown field: '{unknown[0]}'")
+
+    grade_map = {g.course_name: g.grade for g in grades if g.course_name not in ranges}
+    courses = sorted(
+        (
+            index.by_name[name] for name in [*grade_map, *ranges]
+            if name in index.by_name and index.by_name[name].phase <= current_phase
+        ),
+        key=attrgetter("position"),
+    )
+    grid = _grid(min(low for low, _ in ranges.values()), max(high for _, high in ranges.values()))
+
+    # Category sums in catalogue order; vectors over the grid where a simulated course counts
+    totals: Dict[str, Any] = {}
+    credits: Dict[str, int] = {}
+    for course in courses:
+        if course.course_name in ranges:
+            grade = np.clip(grid, *ranges[course.course_name])
+        else:
+            grade = grade_map[course.course_name]
+        totals[course.category] = totals.get(course.category, 0) + grade * course.credits
+        credits[course.category] = credits.get(course.category, 0) + course.credits
+    averages = {category: _round(totals[category] / credits[category]) for category in totals}
+
+    current = run_analysis_cached(current_phase, list(grades), index=index, options=SUMMARY)
+    current_averages = {cs.category: cs.average_grade for cs in current["category_scores"]}
+    current_scores = {fs.field: fs.score for fs in current["field_signals"]}
+
+    categories = [
+        {
+            "category": category,
+            "current_average": current_averages.get(category),
+            "min_average": float(np.min(average)),
+            "max_average": float(np.max(average)),
+        }
+        for category, average in averages.items()
+    ]
+
+    field_ranges: List[Dict[str, Any]] = []
+    wanted = set(fields) if fields else None
+    for field, weights in index.fields.items():
+        if wanted is not None and field not in wanted:
+            continue
+        weighted_sum = 0
+        total_weight = 0
+        contributing = []
+        for category, weight in weights.items():
+            if category in averages:
+                weighted_sum += averages[category] * weight
+                total_weight += weight
+                contributing.append(category)
+        if total_weight == 0:
+            continue
+
+        scores = np.broadcast_to(weighted_sum / total_weight, grid.shape)
+        low, high = float(scores.min()), float(scores.max())
+        required: Dict[str, Optional[float]] = {}
+        for level, threshold in reversed(SIGNAL_THRESHOLDS):
+            reached = scores >= threshold
+            required[level] = float(grid[np.argmax(reached)]) if reached.any() else None
+
+        field_ranges.append({
+            "field": field,
+            "current_score": current_scores.get(field),
+            "min_score": round(low, 2),
+            "max_score": round(high, 2),
+            "min_signal": signal_strength(low),
+            "max_signal": signal_strength(high),
+            "evidence_level": "Complete" if len(contributing) == len(weights) else "Partial",
+            "required_grade": required,
+        })
+
+    return {"phase": current_phase, "categories": categories, "fields": field_ranges}
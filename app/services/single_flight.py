@@ -0,0 +1,132 @@
+"""Single-flight coalescing: concurrent calls with the same key share one computation.
+
+The first caller for a key (the leader) runs the computation; callers that
+arrive while it is in flight wait for its result, or its exception, instead
+of repeating the work. Nothing is kept once the computation ends. The result
+cache serves later callers.
+
+Threads and coroutines are coalesced separately: `do` is for threadpool
+callers and blocks, while `do_async` awaits on the event loop. An async
+computation runs as its own task, so a leader whose client disconnects does
+not cancel it for the others. Each key admits at most `max_waiters`
+followers. Past that, callers run the computation themselves, and admission
+control downstream, such as the process pool, bounds the extra load.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        # Held by the leader until the result is in; far cheaper to create than an Event
+        self.done = threading.Lock()
+        self.done.acquire()
+        self.result: Any = None
+        self.error: Any = None
+        self.waiters = 0
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent identical computations, with a per-key waiter limit."""
+
+    def __init__(self, max_waiters: int):
+        self.max_waiters = max_waiters
+        self._calls: Dict[Hashable, _Call] = {}
+        # Keyed by (event loop, key): a task can only be awaited on its own loop
+        self._flights: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.overflow = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn, or wait for the identical call already running in another thread."""
+        if self.max_waiters <= 0:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            elif call.waiters >= self.max_waiters:
+                self.overflow += 1
+                leader = None
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if leader is None:
+            return fn()
+        if not leader:
+            with call.done:
+                pass
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.release()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), or the identical call already in flight on this event loop."""
+        if self.max_waiters <= 0:
+            return await fn()
+        flight_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            if flight is None:
+                flight = self._flights[flight_key] = _Flight(asyncio.ensure_future(fn()))
+                flight.task.add_done_callback(lambda task: self._forget(flight_key, task))
+                self.leaders += 1
+            elif flight.waiters >= self.max_waiters:
+                self.overflow += 1
+                flight = None
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+
+        if flight is None:
+            return await fn()
+        # Shielded: a cancelled caller stops waiting, the computation carries on
+        return await asyncio.shield(flight.task)
+
+    def _forget(self, flight_key: Tuple[asyncio.AbstractEventLoop, Hashable], task: "asyncio.Future[Any]") -> None:
+        with self._lock:
+            del self._flights[flight_key]
+        if not task.cancelled():
+            task.exception()  # retrieved here, in case every caller was cancelled
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._flights)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._flights),
+                "max_waiters": self.max_waiters,
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "overflow": self.overflow,
+            }
@@ -0,0 +1,87 @@
+"""Streamed transcripts: NDJSON grade records folded into the analysis as they arrive.
+
+    {"course_name": "Databases", "grade": 15.5}
+    {"course_name": "Programming Fundamentals", "grade": 14}
+
+Each record is validated against the catalogue when its line completes (a
+name differing only in case or spacing takes the catalogue's spelling) and
+folded into one grade slot per catalogue course, then discarded. A
+duplicate overwrites its course's slot, since the last grade wins, as in
+AnalysisRequest. Memory is bounded by the catalogue, not by the number of
+records. When the body ends, categories are summed in catalogue order by
+run_analysis, so the result matches POST /analysis for the same grades
+exactly. Sums kept in arrival order would drift in the last float digit.
+"""
+from typing import Any, Dict, List
+
+from pydantic import ValidationError
+
+from app.data.curriculum import CurriculumIndex
+from app.models.analysis import GradeInput, canonical_course_name
+
+# A longer line is rejected rather than buffered without bound
+MAX_LINE_BYTES = 64 * 1024
+
+
+class RecordError(Exception):
+    """Raised for a record that fails validation; `errors` are in FastAPI's 422 format."""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(errors[0]["msg"])
+        self.errors = errors
+
+
+class TranscriptStream:
+    """Accumulates a transcript from NDJSON chunks, one grade slot per catalogue course."""
+
+    def __init__(self, index: CurriculumIndex):
+        self.index = index
+        self.grades: Dict[str, float] = {}
+        self.records = 0
+        self._line = 0
+        self._partial = b""
+
+    def feed(self, chunk: bytes) -> None:
+        """Fold every record completed by `chunk`; raises RecordError."""
+        lines = (self._partial + chunk if self._partial else chunk).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._add(line)
+        if len(self._partial) > MAX_LINE_BYTES:
+            raise RecordError([{
+                "type": "value_error",
+                "loc": ("body", self._line + 1),
+                "msg": f"Record is longer than {MAX_LINE_BYTES} bytes",
+            }])
+
+    def close(self) -> None:
+        """Fold a final record without a trailing newline."""
+        partial, self._partial = self._partial, b""
+        self._add(partial)
+
+    def _add(self, line: bytes) -> None:
+        self._line += 1
+        if not line.strip():
+            return
+        try:
+            record = GradeInput.model_validate_json(line)
+        except ValidationError as e:
+            raise RecordError([
+                {**error, "loc": ("body", self._line, *error["loc"])}
+                for error in e.errors(include_url=False, include_context=False)
+            ])
+        try:
+            course_name = canonical_course_name(record.course_name, self.index)
+        except ValueError as e:
+            raise RecordError([{
+                "type": "value_error",
+                "loc": ("body", self._line, "course_name"),
+                "msg": f"Value error, {e}",
+                "input": record.course_name,
+            }])
+        self.grades[course_name] = record.grade
+        self.records += 1
+
+    def transcript(self) -> List[GradeInput]:
+        """The folded grades, one per course, ready for run_analysis."""
+        return [GradeInput.model_construct(course_name=name, grade=grade) for name, grade in self.grades.items()]
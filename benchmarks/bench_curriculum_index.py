@@ -0,0 +1,81 @@
+"""Micro-benchmark: per-request cost of scan-based vs indexed analysis.
+
+Usage:
+    python -m benchmarks.bench_curriculum_index [--courses 10000] [--grades 40]
+"""
+import argparse
+import timeit
+
+from app.data.curriculum import CurriculumIndex
+from app.services.analysis_service import run_analysis
+from benchmarks.synthetic import make_catalogue, make_grades
+
+
+def scan_run_analysis(current_phase, grades, courses, fields):
+    """The pre-index algorithm: rescans the catalogue on every call."""
+    grade_map = {g.course_name: g.grade for g in grades}
+    eligible_courses = [c for c in courses if c.phase <= current_phase]
+    total_credits = sum(c.credits for c in eligible_courses)
+
+    category_totals, category_credits = {}, {}
+    for course in eligible_courses:
+        if course.course_name not in grade_map:
+            continue
+        category_totals.setdefault(course.category, 0)
+        category_credits.setdefault(course.category, 0)
+        category_totals[course.category] += grade_map[course.course_name] * course.credits
+        category_credits[course.category] += course.credits
+
+    averages = {
+        c: round(category_totals[c] / category_credits[c], 2) for c in category_totals
+    }
+
+    signals = []
+    for field, weights in fields.items():
+        present = [c for c in weights if c in averages]
+        if not present:
+            continue
+        contributing = [
+            c.course_name for c in eligible_courses
+            if c.category in present and c.course_name in grade_map
+        ]
+        signals.append((field, present, contributing))
+    return total_credits, averages, signals
+
+
+def scan_validate(grades, courses):
+    """The pre-index validator: rebuilds the name set per request."""
+    valid_course_names = {c.course_name for c in courses}
+    return all(g.course_name in valid_course_names for g in grades)
+
+
+def _per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=10_000)
+    parser.add_argument("--fields", type=int, default=5)
+    parser.add_argument("--grades", type=int, default=40)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    courses, fields = make_catalogue(args.courses, args.fields)
+    grades = make_grades(courses, args.grades)
+    index = CurriculumIndex(courses, fields)
+
+    rows = [
+        ("run_analysis (scan)", lambda: scan_run_analysis(3, grades, courses, fields)),
+        ("run_analysis (index)", lambda: run_analysis(3, grades, index=index)),
+        ("validate names (scan)", lambda: scan_validate(grades, courses)),
+        ("validate names (index)", lambda: all(g.course_name in index for g in grades)),
+    ]
+
+    print(f"catalogue={args.courses} courses, fields={args.fields}, grades={args.grades}")
+    for name, fn in rows:
+        print(f"{name:<26} {_per_call_us(fn, args.number):>10.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Memory benchmark: catalogue footprint and per-request allocations.
+
+Usage:
+    python -m benchmarks.bench_memory [--courses 10000] [--grades 40]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from app.data.curriculum import CurriculumIndex
+from app.models.course import Course
+from app.models.records import CourseRecord
+from app.services.analysis_service import run_analysis
+from benchmarks.synthetic import make_catalogue, make_grades
+
+
+def traced(fn):
+    """(bytes, blocks) still allocated by fn's return value, and peak bytes."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in diff)
+    blocks = sum(stat.count_diff for stat in diff)
+    del value
+    return size, blocks, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=10_000)
+    parser.add_argument("--grades", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    courses, fields = make_catalogue(args.courses, n_fields=50)
+    raw = [c.model_dump() for c in courses]
+
+    size, blocks, _ = traced(lambda: [Course(**r) for r in raw])
+    print(f"catalogue as pydantic Course list  {size / 1024:>10.0f} KiB  {blocks:>8} blocks")
+    size, blocks, _ = traced(lambda: [CourseRecord.from_course(c, i) for i, c in enumerate(courses)])
+    print(f"catalogue as CourseRecord slots    {size / 1024:>10.0f} KiB  {blocks:>8} blocks")
+
+    index = CurriculumIndex(courses, fields)
+    grades = make_grades(courses, args.grades, seed=1)
+
+    size, blocks, _ = traced(lambda: [run_analysis(3, grades, index=index) for _ in range(args.requests)])
+    print(f"retained per run_analysis result   {size / args.requests / 1024:>8.1f} KiB  "
+          f"{blocks / args.requests:>6.0f} blocks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Startup benchmark: worker import time and first-request latency.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--courses 10000]
+
+Each run is a fresh interpreter, as a new uvicorn worker would be. It reports
+the median time to import app.main, run the lifespan startup, and answer the
+first GET /courses and POST /analysis. Runs cover the built-in catalogue and
+its snapshot. With --courses, they also cover a synthetic catalogue loaded
+from a JSON CATALOGUE_FILE versus a CATALOGUE_SNAPSHOT.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.data.curriculum import get_curriculum_index
+with TestClient(app.main.app) as client:
+    ready = time.perf_counter()
+    client.get("/courses/")
+    courses = time.perf_counter()
+    course = get_curriculum_index().courses[0]
+    client.post("/analysis/", json={
+        "current_phase": 3, "grades": [{"course_name": course.course_name, "grade": 14}]
+    })
+    analysis = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "startup": ready - imported,
+    "first GET /courses": courses - ready,
+    "first POST /analysis": analysis - courses,
+}))
+"""
+
+STEPS = ("import", "startup", "first GET /courses", "first POST /analysis", "process")
+
+
+def run_once(env: Dict[str, str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], env={**os.environ, **env}, capture_output=True, text=True, check=True
+    ).stdout
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - started
+    return timings
+
+
+def report(label: str, env: Dict[str, str], runs: int) -> None:
+    samples: List[Dict[str, float]] = [run_once(env) for _ in range(runs)]
+    medians = "  ".join(
+        f"{step} {statistics.median(s[step] for s in samples) * 1000:7.1f} ms" for step in STEPS
+    )
+    print(f"{label:<22} {medians}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--courses", type=int, default=0, help="Also time a synthetic catalogue of this size")
+    parser.add_argument("--fields", type=int, default=500)
+    args = parser.parse_args()
+
+    from app.data.catalogue_file import write_catalogue_file
+    from app.data.courses import COURSES
+    from app.data.fields import FIELDS
+    from app.data.snapshot import write_snapshot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        builtin = os.path.join(tmp, "builtin.snapshot")
+        write_snapshot(builtin, COURSES, FIELDS)
+        report("built-in", {}, args.runs)
+        report("built-in snapshot", {"CATALOGUE_SNAPSHOT": builtin}, args.runs)
+
+        if args.courses:
+            from benchmarks.synthetic import make_catalogue
+
+            courses, fields = make_catalogue(args.courses, n_fields=args.fields)
+            path = os.path.join(tmp, "catalogue.json")
+            snapshot = os.path.join(tmp, "catalogue.snapshot")
+            write_catalogue_file(path, courses, fields)
+            write_snapshot(snapshot, courses, fields)
+            label = f"{args.courses} courses"
+            report(f"{label} file", {"CATALOGUE_FILE": path}, args.runs)
+            report(f"{label} snapshot", {"CATALOGUE_SNAPSHOT": snapshot}, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Worker memory benchmark: per-worker RSS and PSS by catalogue source.
+
+Usage:
+    python -m benchmarks.bench_worker_rss [--workers 4] [--courses 10000 50000]
+
+Starts --workers server processes side by side, as uvicorn --workers would,
+for each catalogue source. Each worker serves GET /courses, GET
+/courses/{id} and a few POST /analysis, then holds while its memory is read
+from /proc/<pid>/smaps_rollup. Sources are a JSON CATALOGUE_FILE (validated
+pydantic models, then per-worker records), a CATALOGUE_SNAPSHOT, and a
+CATALOGUE_IMAGE. PSS splits shared pages between the processes mapping
+them, so its total is what the workers cost together. Linux only.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+CHILD = """
+import sys
+import app.main
+from fastapi.testclient import TestClient
+from app.data.curriculum import get_curriculum_index
+with TestClient(app.main.app) as client:
+    index = get_curriculum_index()
+    courses = index.courses
+    client.get("/courses/")
+    client.get("/courses/", params={"phase": 2})
+    client.get(f"/courses/{courses[len(courses) // 2].id}")
+    for offset in range(4):
+        grades = [{"course_name": courses[i].course_name, "grade": 14} for i in range(offset, len(courses), 97)]
+        client.post("/analysis/", json={"current_phase": 3, "grades": grades[:200]})
+    print("ready", flush=True)
+    sys.stdin.read()
+"""
+
+FIELDS = ("Rss", "Pss", "Private")
+
+
+def memory(pid: int) -> Dict[str, float]:
+    """RSS, PSS and private memory of a process, in MB."""
+    values: Dict[str, float] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                values[name] = int(rest.split()[0]) / 1024
+    values["Private"] = values["Private_Clean"] + values["Private_Dirty"]
+    return values
+
+
+def measure(env: Dict[str, str], workers: int) -> List[Dict[str, float]]:
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", CHILD], env={**os.environ, **env},
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        for process in processes:
+            if process.stdout.readline().strip() != "ready":
+                raise RuntimeError("worker failed to start")
+        # Read only once every worker holds its catalogue, so shared pages are split
+        return [memory(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.communicate("")
+
+
+def report(label: str, env: Dict[str, str], workers: int) -> None:
+    samples = measure(env, workers)
+    medians = "  ".join(f"{name} {statistics.median(s[name] for s in samples):6.1f} MB" for name in FIELDS)
+    print(f"{label:<22} per worker: {medians}   total PSS {sum(s['Pss'] for s in samples):7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--courses", type=int, nargs="*", default=[10000], help="Synthetic catalogue sizes")
+    parser.add_argument("--fields", type=int, default=500)
+    args = parser.parse_args()
+
+    from app.data.catalogue_file import write_catalogue_file
+    from app.data.courses import COURSES
+    from app.data.fields import FIELDS as BUILTIN_FIELDS
+    from app.data.image import write_image
+    from app.data.snapshot import write_snapshot
+    from benchmarks.synthetic import make_catalogue
+
+    with tempfile.TemporaryDirectory() as tmp:
+        builtin = os.path.join(tmp, "builtin.image")
+        write_image(builtin, COURSES, BUILTIN_FIELDS)
+        report("built-in", {}, args.workers)
+        report("built-in image", {"CATALOGUE_IMAGE": builtin}, args.workers)
+
+        for n in args.courses:
+            courses, fields = make_catalogue(n, n_fields=args.fields)
+            path = os.path.join(tmp, f"{n}.json")
+            snapshot = os.path.join(tmp, f"{n}.snapshot")
+            image = os.path.join(tmp, f"{n}.image")
+            write_catalogue_file(path, courses, fields)
+            write_snapshot(snapshot, courses, fields)
+            write_image(image, courses, fields)
+            print(f"{n} courses: image {os.path.getsize(image) / 2**20:.1f} MB on disk")
+            report(f"{n} courses file", {"CATALOGUE_FILE": path}, args.workers)
+            report(f"{n} courses snapshot", {"CATALOGUE_SNAPSHOT": snapshot}, args.workers)
+            report(f"{n} courses image", {"CATALOGUE_IMAGE": image}, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Benchmark suite for the analysis and course paths.
+
+Usage:
+    python -m benchmarks.run [--quick] [--output results.json]
+                             [--baseline baseline.json] [--threshold 0.2]
+
+Runs every case against the real catalogue and against synthetic catalogues
+scaled up to 10k courses / 500 fields, writes machine-readable results and
+exits non-zero if any case's median regressed past the threshold relative to
+the baseline file.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.testclient import TestClient
+
+from app.data.curriculum import get_curriculum_index, reload_curriculum
+from app.main import app
+from app.models.analysis import AnalysisRequest
+from app.services import analysis_service
+from app.services.analysis_service import run_analysis
+from app.services.course_service import CourseRepository
+from app.services.name_resolver import name_resolver
+from benchmarks.synthetic import make_catalogue, make_grades
+
+# (label, courses, fields); None means the built-in catalogue
+CATALOGUES: List[Tuple[str, Optional[int], Optional[int]]] = [
+    ("builtin", None, None),
+    ("1k-50", 1_000, 50),
+    ("10k-500", 10_000, 500),
+]
+GRADE_COUNTS = (5, 20, 100, 400)
+PHASES = (1, 3)
+
+Case = Tuple[str, Callable[[], object]]
+
+
+@contextmanager
+def catalogue(n_courses: Optional[int], n_fields: Optional[int]) -> Iterator[None]:
+    """Temporarily swap in a synthetic catalogue for the whole stack."""
+    if n_courses is None:
+        yield
+        return
+    original = get_curriculum_index()
+    courses, fields = make_catalogue(n_courses, n_fields)
+    reload_curriculum(courses=courses, fields=fields)
+    try:
+        yield
+    finally:
+        reload_curriculum(courses=original.courses, fields=original.fields)
+
+
+def cases_for(label: str, quick: bool) -> Iterator[Case]:
+    index = get_curriculum_index()
+    courses = list(index.courses)
+    client = TestClient(app)
+
+    for n_grades in GRADE_COUNTS[:2] if quick else GRADE_COUNTS:
+        for phase in PHASES:
+            grades = make_grades(courses, n_grades, max_phase=phase)
+            yield (f"run_analysis[{label},grades={n_grades},phase={phase}]",
+                   lambda p=phase, g=grades: run_analysis(p, g))
+
+        payload = {
+            "current_phase": 3,
+            "grades": [g.model_dump() for g in make_grades(courses, n_grades)],
+        }
+        yield (f"validate_request[{label},grades={n_grades}]",
+               lambda p=payload: AnalysisRequest.model_validate(p))
+        yield (f"http_analysis[{label},grades={n_grades}]",
+               lambda p=payload: client.post("/analysis/", json=p))
+
+    middle = courses[len(courses) // 2]
+    yield f"repository_get_by_id[{label}]", lambda: CourseRepository.get_by_id(middle.id)
+    yield f"repository_filter_all[{label}]", lambda: CourseRepository.filter()
+    yield (f"repository_filter_phase_category[{label}]",
+           lambda: CourseRepository.filter(phase=middle.phase, category=middle.category))
+    yield f"http_courses_list[{label}]", lambda: client.get("/courses/", params={"phase": 1})
+    yield f"http_course_by_id[{label}]", lambda: client.get(f"/courses/{middle.id}")
+
+    resolver = name_resolver(index)
+    misspelt = f"{middle.course_name[:2]}x{middle.course_name[3:]}"
+    yield f"resolve_course_name[{label}]", lambda: resolver.resolve(middle.course_name.upper())
+    yield f"suggest_course_names[{label}]", lambda: resolver.suggest(misspelt)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Per-call timings in microseconds over `repeat` calibrated runs."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    per_call = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": statistics.median(per_call),
+        "min_us": min(per_call),
+        "mean_us": statistics.fmean(per_call),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Describe every case whose median is slower than baseline * (1 + threshold)."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = stats["median_us"] / base["median_us"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {base['median_us']:.1f}us -> {stats['median_us']:.1f}us (+{ratio - 1:.0%})"
+            )
+    return regressions
+
+
+def run(quick: bool = False, selected: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    results = {}
+    # Measure the computation, not the result cache
+    cache_size = analysis_service.result_cache.max_size
+    analysis_service.result_cache.max_size = 0
+    try:
+        for label, n_courses, n_fields in CATALOGUES:
+            if quick and n_courses and n_courses > 1_000:
+                continue
+            with catalogue(n_courses, n_fields):
+                for name, fn in cases_for(label, quick):
+                    if selected and selected not in name:
+                        continue
+                    results[name] = measure(fn, repeat=3 if quick else 5)
+                    print(f"{name:<60} {results[name]['median_us']:>12.1f} us", file=sys.stderr)
+    finally:
+        analysis_service.result_cache.max_size = cache_size
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Smaller grid, skip the 10k catalogue")
+    parser.add_argument("-k", dest="selected", help="Only run cases whose name contains this")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed median slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick, selected=args.selected)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions beyond threshold:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
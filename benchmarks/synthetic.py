@@ -0,0 +1,60 @@
+"""Synthetic catalogue generator for benchmarks.
+
+Scales COURSES/FIELDS up to arbitrary sizes while keeping the shape of the
+real catalogue: three phases, the existing categories, and fields that weight
+two to four categories.
+"""
+import random
+from typing import Dict, List, Tuple
+
+from app.models.course import Course, CourseCategory
+from app.models.analysis import GradeInput
+
+CREDIT_CHOICES = (3, 3, 3, 6, 6, 9)
+
+
+def make_catalogue(
+    n_courses: int,
+    n_fields: int = 5,
+    seed: int = 0
+) -> Tuple[List[Course], Dict[str, Dict[str, float]]]:
+    """Build a reproducible (courses, fields) pair of the requested size."""
+    rng = random.Random(seed)
+    categories = list(CourseCategory)
+
+    courses = [
+        Course(
+            id=i + 1,
+            course_name=f"Course {i + 1:05d}",
+            category=rng.choice(categories),
+            phase=rng.randint(1, 3),
+            credits=rng.choice(CREDIT_CHOICES),
+        )
+        for i in range(n_courses)
+    ]
+
+    fields = {}
+    for i in range(n_fields):
+        chosen = rng.sample(categories, rng.randint(2, 4))
+        raw = [rng.randint(1, 10) for _ in chosen]
+        fields[f"Field {i + 1:03d}"] = {
+            c.value: round(w / sum(raw), 2) for c, w in zip(chosen, raw)
+        }
+
+    return courses, fields
+
+
+def make_grades(
+    courses: List[Course],
+    n_grades: int,
+    max_phase: int = 3,
+    seed: int = 0
+) -> List[GradeInput]:
+    """Pick n_grades courses up to max_phase and give them random grades."""
+    rng = random.Random(seed)
+    eligible = [c for c in courses if c.phase <= max_phase]
+    chosen = rng.sample(eligible, min(n_grades, len(eligible)))
+    return [
+        GradeInput(course_name=c.course_name, grade=round(rng.uniform(8, 20), 1))
+        for c in chosen
+    ]
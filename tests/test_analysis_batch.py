@@ -0,0 +1,80 @@
+import json
+import random
+
+from fastapi.testclient import TestClient
+
+from app.data.courses import COURSES
+from app.main import app
+from app.models.analysis import AnalysisRequest, AnalysisResponse, GradeInput
+from app.services.analysis_service import run_analysis, run_analysis_batch
+
+
+def _random_requests(count, seed=7):
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        courses = rng.sample(COURSES, rng.randint(0, 25))
+        grades = [
+            GradeInput(course_name=c.course_name, grade=round(rng.uniform(0, 20), rng.choice([0, 1, 2])))
+            for c in courses
+        ]
+        requests.append(AnalysisRequest(current_phase=rng.randint(1, 3), grades=grades))
+    return requests
+
+
+class TestRunAnalysisBatch:
+    """Test that vectorized batch scoring matches run_analysis."""
+
+    def test_matches_run_analysis(self):
+        requests = _random_requests(300)
+        batch = run_analysis_batch(requests)
+
+        assert len(batch) == len(requests)
+        for request, result in zip(requests, batch):
+            expected = run_analysis(current_phase=request.current_phase, grades=request.grades)
+            assert AnalysisResponse(**result) == AnalysisResponse(**expected)
+
+    def test_duplicate_course_uses_last_grade(self):
+        request = AnalysisRequest(current_phase=1, grades=[
+            GradeInput(course_name="Databases", grade=10.0),
+            GradeInput(course_name="Databases", grade=16.0)
+        ])
+        result = run_analysis_batch([request])[0]
+
+        assert result["category_scores"][0].average_grade == 16.0
+
+    def test_warnings_match(self):
+        requests = [
+            AnalysisRequest(current_phase=1, grades=[]),
+            AnalysisRequest(current_phase=1, grades=[GradeInput(course_name="Internship", grade=15.0)]),
+            AnalysisRequest(current_phase=1, grades=[GradeInput(course_name="Databases", grade=15.0)])
+        ]
+        for request, result in zip(requests, run_analysis_batch(requests)):
+            expected = run_analysis(current_phase=request.current_phase, grades=request.grades)
+            assert result.get("warnings") == expected.get("warnings")
+
+    def test_empty_batch(self):
+        assert run_analysis_batch([]) == []
+
+
+class TestBatchEndpoint:
+    """Test the POST /analysis/batch route."""
+
+    payload = {"requests": [
+        {"current_phase": 1, "grades": [{"course_name": "Databases", "grade": 15.0}]},
+        {"current_phase": 2, "grades": [{"course_name": "Scripting", "grade": 12.0}]}
+    ]}
+
+    def test_json_response(self):
+        response = TestClient(app).post("/analysis/batch", json=self.payload)
+
+        assert response.status_code == 200
+        assert [r["phase"] for r in response.json()] == [1, 2]
+
+    def test_ndjson_stream(self):
+        response = TestClient(app).post("/analysis/batch?stream=true", json=self.payload)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines == TestClient(app).post("/analysis/batch", json=self.payload).json()
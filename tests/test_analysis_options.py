@@ -0,0 +1,143 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.courses import COURSES
+from app.data.curriculum import CurriculumIndex
+from app.main import app
+from app.models.analysis import AnalysisRequest
+from app.models.records import AnalysisOptions, analysis_to_dict
+from app.services.analysis_service import run_analysis, run_analysis_batch
+from app.services.incremental import update_analysis
+from benchmarks.synthetic import make_catalogue, make_grades
+
+FILTERS = [
+    AnalysisOptions(top_k=1),
+    AnalysisOptions(top_k=5),
+    AnalysisOptions(top_k=1000),
+    AnalysisOptions(min_score=12.0),
+    AnalysisOptions(min_evidence_level="Complete"),
+    AnalysisOptions(top_k=3, min_score=10.0, min_evidence_level="Partial"),
+    AnalysisOptions(detail="summary"),
+    AnalysisOptions(top_k=4, detail="categories"),
+]
+
+
+def expected_signals(full, options):
+    """The full, sorted field list filtered after the fact."""
+    signals = [
+        s for s in full["field_signals"]
+        if (options.min_score is None or s.score >= options.min_score)
+        and (options.min_evidence_level != "Complete" or s.evidence_level == "Complete")
+    ]
+    return signals if options.top_k is None else signals[:options.top_k]
+
+
+@pytest.fixture(scope="module")
+def index():
+    courses, fields = make_catalogue(300, n_fields=200)
+    return CurriculumIndex(courses, fields)
+
+
+class TestAnalysisOptions:
+    """Test top_k and thresholds applied during field scoring."""
+
+    @pytest.mark.parametrize("options", FILTERS)
+    def test_matches_filtering_the_full_result(self, index, options):
+        for seed in range(20):
+            grades = make_grades(index.courses, 30, seed=seed)
+            full = run_analysis(3, grades, index=index)
+            filtered = run_analysis(3, grades, index=index, options=options)
+
+            expected = expected_signals(full, options)
+            assert [(s.field, s.score) for s in filtered["field_signals"]] == [(s.field, s.score) for s in expected]
+            if options.detail == "full":
+                assert filtered["field_signals"] == expected
+                assert filtered["category_scores"] == full["category_scores"]
+
+    @pytest.mark.parametrize("options", FILTERS)
+    def test_batch_and_incremental_agree(self, index, options):
+        rng = random.Random(5)
+        requests = [
+            AnalysisRequest.model_construct(
+                current_phase=rng.randint(1, 3),
+                grades=make_grades(index.courses, 20, seed=seed),
+                **options._asdict()
+            )
+            for seed in range(10)
+        ]
+
+        batch = run_analysis_batch(requests, index=index)
+        for request, result in zip(requests, batch):
+            expected = run_analysis(request.current_phase, request.grades, index=index, options=options)
+            incremental, _ = update_analysis(
+                None, request.current_phase, request.grades, index=index, options=options
+            )
+            assert result == expected
+            assert incremental == expected
+
+
+class TestDetailLevels:
+    """Test the contributor detail levels."""
+
+    def test_summary_drops_contributors(self, index):
+        grades = make_grades(index.courses, 30, seed=3)
+        full = analysis_to_dict(run_analysis(3, grades, index=index))
+        summary = analysis_to_dict(run_analysis(3, grades, index=index, options=AnalysisOptions(detail="summary")))
+
+        assert all("contributors" not in s for s in summary["field_signals"])
+        assert [s["score"] for s in summary["field_signals"]] == [s["score"] for s in full["field_signals"]]
+        assert summary["category_scores"] == full["category_scores"]
+
+    def test_category_course_ids_reconstruct_full_detail(self, index):
+        grades = make_grades(index.courses, 30, seed=4)
+        full = run_analysis(3, grades, index=index)
+        compact = run_analysis(3, grades, index=index, options=AnalysisOptions(detail="categories"))
+        ids = {cs.category: set(cs.course_ids) for cs in compact["category_scores"]}
+
+        for compact_signal, full_signal in zip(compact["field_signals"], full["field_signals"]):
+            wanted = set().union(*(ids[category] for category in compact_signal.contributors["categories"]))
+            courses = [c.course_name for c in index.courses if c.id in wanted]
+            assert compact_signal.contributors["categories"] == full_signal.contributors["categories"]
+            assert courses == full_signal.contributors["courses"]
+
+
+class TestAnalysisOptionsEndpoint:
+    """Test the request options on POST /analysis."""
+
+    payload = {
+        "current_phase": 3,
+        "grades": [{"course_name": c.course_name, "grade": 14.0 + i % 5} for i, c in enumerate(COURSES[::2])],
+    }
+
+    def test_top_k_and_thresholds(self):
+        client = TestClient(app)
+        full = client.post("/analysis/", json=self.payload).json()
+        top = client.post("/analysis/", json={**self.payload, "top_k": 2}).json()
+        complete = client.post("/analysis/", json={**self.payload, "min_evidence_level": "Complete"}).json()
+
+        assert top["field_signals"] == full["field_signals"][:2]
+        assert complete["field_signals"] == [s for s in full["field_signals"] if s["evidence_level"] == "Complete"]
+
+    @pytest.mark.parametrize("options", [
+        {"top_k": 0}, {"min_score": 25}, {"min_evidence_level": "Strong"}, {"detail": "verbose"}
+    ])
+    def test_invalid_options(self, options):
+        response = TestClient(app).post("/analysis/", json={**self.payload, **options})
+        assert response.status_code == 422
+
+    def test_detail_shrinks_the_response(self):
+        client = TestClient(app)
+        sizes = {
+            detail: len(client.post("/analysis/", json={**self.payload, "detail": detail}).content)
+            for detail in ("summary", "categories", "full")
+        }
+
+        assert sizes["summary"] < sizes["categories"] < sizes["full"]
+
+    def test_options_are_part_of_the_cache_key(self):
+        client = TestClient(app)
+        client.post("/analysis/", json=self.payload)
+
+        assert len(client.post("/analysis/", json={**self.payload, "top_k": 1}).json()["field_signals"]) == 1
@@ -0,0 +1,55 @@
+import json
+
+from app.data.curriculum import CurriculumIndex
+from benchmarks import run as bench
+from benchmarks.synthetic import make_catalogue, make_grades
+
+
+class TestSyntheticCatalogue:
+    """Test the scaled catalogue generator."""
+
+    def test_sizes_and_reproducibility(self):
+        courses, fields = make_catalogue(10_000, n_fields=500)
+
+        assert len(courses) == 10_000
+        assert len(fields) == 500
+        assert len({c.course_name for c in courses}) == 10_000
+        assert make_catalogue(50, 5)[1] == make_catalogue(50, 5)[1]
+
+    def test_fields_reference_catalogue_categories(self):
+        courses, fields = make_catalogue(200, n_fields=30)
+        index = CurriculumIndex(courses, fields)
+
+        for weights in fields.values():
+            assert set(weights) <= set(index.category_courses)
+
+    def test_grades_respect_phase(self):
+        courses, _ = make_catalogue(300)
+        phases = {c.course_name: c.phase for c in courses}
+
+        assert all(phases[g.course_name] <= 1 for g in make_grades(courses, 50, max_phase=1))
+
+
+class TestRegressionCheck:
+    """Test baseline comparison in the benchmark runner."""
+
+    def test_compare_flags_slowdowns(self):
+        baseline = {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}}
+        results = {"a": {"median_us": 125.0}, "b": {"median_us": 115.0}, "new": {"median_us": 1.0}}
+
+        regressions = bench.compare(results, baseline, threshold=0.2)
+
+        assert len(regressions) == 1
+        assert regressions[0].startswith("a:")
+
+    def test_main_exit_code(self, tmp_path, monkeypatch):
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps({"results": {"case": {"median_us": 10.0}}}))
+        output = tmp_path / "out.json"
+
+        monkeypatch.setattr(bench, "run", lambda quick, selected: {"case": {"median_us": 20.0}})
+        assert bench.main(["--baseline", str(baseline), "--output", str(output)]) == 1
+        assert json.loads(output.read_text())["results"]["case"]["median_us"] == 20.0
+
+        monkeypatch.setattr(bench, "run", lambda quick, selected: {"case": {"median_us": 11.0}})
+        assert bench.main(["--baseline", str(baseline)]) == 0
@@ -0,0 +1,170 @@
+import json
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cli import main
+from app.data.catalogue_file import (
+    CatalogueFileError, FileCatalogue, read_catalogue_file, write_catalogue_file
+)
+from app.data.courses import COURSES
+from app.data.curriculum import get_curriculum_index, reload_curriculum
+from app.data.fields import FIELDS
+from app.main import app
+from app.models.analysis import GradeInput
+from app.services.analysis_service import run_analysis
+from app.services.catalogue_cache import catalogue_cache
+
+TOML = """
+version = "v7"
+
+[[courses]]
+id = 1
+course_name = "Databases"
+category = "Data"
+phase = 1
+credits = 6
+
+[[courses]]
+id = 2
+course_name = "Python"
+category = "Programming"
+phase = 1
+credits = 3
+
+[fields."Data Science"]
+Data = 0.6
+Programming = 0.4
+"""
+
+
+@pytest.fixture
+def restore_catalogue():
+    yield
+    reload_curriculum(COURSES, FIELDS)
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestCatalogueFile:
+    """Test reading and writing versioned catalogue files."""
+
+    @pytest.mark.parametrize("name", ["catalogue.json", "catalogue.yaml"])
+    def test_round_trip(self, tmp_path, name):
+        if name.endswith(".yaml"):
+            pytest.importorskip("yaml")
+        path = str(tmp_path / name)
+        write_catalogue_file(path, COURSES, FIELDS, version="2026.1")
+
+        version, courses, fields = read_catalogue_file(path)
+
+        assert version == "2026.1"
+        assert [c.to_dict() for c in courses] == [c.model_dump(mode="json") for c in COURSES]
+        assert fields == FIELDS
+        assert list(fields) == list(FIELDS)
+
+    def test_yaml_without_pyyaml(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(sys.modules, "yaml", None)
+        path = tmp_path / "catalogue.yaml"
+
+        with pytest.raises(CatalogueFileError, match="PyYAML"):
+            write_catalogue_file(str(path), COURSES, FIELDS)
+        path.write_text("version: v1\n")
+        with pytest.raises(CatalogueFileError, match="PyYAML"):
+            read_catalogue_file(str(path))
+
+    def test_toml(self, tmp_path):
+        path = tmp_path / "catalogue.toml"
+        path.write_text(TOML)
+
+        version, courses, fields = read_catalogue_file(str(path))
+
+        assert version == "v7"
+        assert [c.course_name for c in courses] == ["Databases", "Python"]
+        assert fields == {"Data Science": {"Data": 0.6, "Programming": 0.4}}
+
+    @pytest.mark.parametrize("content, message", [
+        ("{}", "'courses' list"),
+        ('{"courses": [{"id": 1}]}', "Invalid course"),
+        ('{"courses": [], "fields": {"X": {"Astrology": 1}}}', "unknown category"),
+        ('{"courses": [], "fields": {"X": {"Data": "high"}}}', "must be a number"),
+        ("{not json", "Cannot read"),
+    ])
+    def test_invalid_files(self, tmp_path, content, message):
+        path = tmp_path / "catalogue.json"
+        path.write_text(content)
+
+        with pytest.raises(CatalogueFileError, match=message):
+            read_catalogue_file(str(path))
+
+    def test_export_command(self, tmp_path):
+        path = str(tmp_path / "catalogue.json")
+
+        assert main(["export-catalogue", path, "--version", "1"]) == 0
+        assert json.loads(open(path).read())["version"] == "1"
+
+
+class TestFileCatalogue:
+    """Test hot reloading a catalogue file."""
+
+    def test_reloads_only_when_content_changes(self, tmp_path, restore_catalogue):
+        path = str(tmp_path / "catalogue.json")
+        write_catalogue_file(path, COURSES, FIELDS)
+        catalogue = FileCatalogue(path)
+
+        assert catalogue.refresh() is not None
+        assert catalogue.refresh() is None
+
+        bump_mtime(path)
+        assert catalogue.refresh() is None
+        assert catalogue.loads == 1
+
+        write_catalogue_file(path, COURSES[:-1], FIELDS, version="next")
+        bump_mtime(path)
+        index = catalogue.refresh()
+
+        assert index is get_curriculum_index()
+        assert catalogue.version == "next"
+        assert len(index.courses) == len(COURSES) - 1
+
+    def test_caches_are_rebuilt_by_the_reload(self, tmp_path, restore_catalogue):
+        path = str(tmp_path / "catalogue.json")
+        write_catalogue_file(path, COURSES[:3], FIELDS)
+        FileCatalogue(path).refresh()
+
+        # Rebuilt in the reloading thread, not by the next request
+        assert catalogue_cache._entries is not None
+        assert len(TestClient(app).get("/courses/").json()) == 3
+
+    def test_in_flight_work_keeps_its_snapshot(self, tmp_path, restore_catalogue):
+        old = get_curriculum_index()
+        grades = [GradeInput(course_name=c.course_name, grade=16.0) for c in COURSES[:5]]
+        expected = run_analysis(3, grades, index=old)
+
+        path = str(tmp_path / "catalogue.json")
+        write_catalogue_file(path, COURSES[5:], FIELDS)
+        FileCatalogue(path).refresh()
+
+        assert get_curriculum_index() is not old
+        assert run_analysis(3, grades, index=old) == expected
+
+    def test_bad_file_keeps_previous_catalogue(self, tmp_path, restore_catalogue):
+        path = tmp_path / "catalogue.json"
+        write_catalogue_file(str(path), COURSES[:3], FIELDS)
+        catalogue = FileCatalogue(str(path))
+        catalogue.refresh()
+
+        path.write_text('{"courses": ')
+        with pytest.raises(CatalogueFileError):
+            catalogue.refresh()
+        assert len(get_curriculum_index().courses) == 3
+
+        write_catalogue_file(str(path), COURSES[:4], FIELDS)
+        bump_mtime(path)
+        catalogue.refresh()
+        assert len(get_curriculum_index().courses) == 4
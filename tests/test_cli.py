@@ -0,0 +1,91 @@
+import csv
+import json
+
+from app import cli
+from app.cli import main
+from app.models.analysis import GradeInput
+from app.models.records import analysis_to_dict
+from app.services.analysis_service import run_analysis
+
+ROWS = [
+    ("s1", "Databases", "15.0", "1"),
+    ("s1", "Programming Fundamentals", "13.5", "1"),
+    ("s1", "Data Science Fundamentals", "16.0", "2"),
+    ("s2", "Computing Fundamentals", "12.0", "1"),
+]
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["student_id", "course_name", "grade", "phase"])
+        writer.writerows(rows)
+
+
+class TestScoreCommand:
+    """Test the bulk cohort scoring command."""
+
+    def test_ndjson_matches_run_analysis(self, tmp_path, capsys):
+        _write_csv(tmp_path / "in.csv", ROWS)
+        out = tmp_path / "out.ndjson"
+
+        assert main(["score", str(tmp_path / "in.csv"), "-o", str(out), "--workers", "0"]) == 0
+
+        lines = [json.loads(line) for line in out.read_text().splitlines()]
+        assert [line.pop("student_id") for line in lines] == ["s1", "s2"]
+        expected = run_analysis(2, [
+            GradeInput(course_name=name, grade=float(grade)) for _, name, grade, _ in ROWS[:3]
+        ])
+        assert lines[0] == analysis_to_dict(expected)
+        assert "students/sec" in capsys.readouterr().err
+
+    def test_csv_output_with_workers(self, tmp_path):
+        _write_csv(tmp_path / "in.csv", ROWS)
+        out = tmp_path / "out.csv"
+
+        assert main(["score", str(tmp_path / "in.csv"), "-o", str(out), "--workers", "1", "--chunk-size", "1"]) == 0
+
+        rows = list(csv.DictReader(out.open()))
+        assert [r["student_id"] for r in rows] == ["s1", "s2"]
+        assert rows[0]["phase"] == "2"
+        assert rows[1]["Security average"] == "12.0"
+        assert rows[1]["Data Science score"] == ""
+
+    def test_output_file_is_closed(self, tmp_path, monkeypatch):
+        _write_csv(tmp_path / "in.csv", ROWS)
+        opened = []
+
+        def recording_open(*args, **kwargs):
+            opened.append(open(*args, **kwargs))
+            return opened[-1]
+
+        monkeypatch.setattr(cli, "open", recording_open, raising=False)
+        for name in ("out.ndjson", "out.csv"):
+            assert main(["score", str(tmp_path / "in.csv"), "-o", str(tmp_path / name), "--workers", "0"]) == 0
+
+        assert len(opened) == 4 and all(f.closed for f in opened)
+
+    def test_non_contiguous_student_is_rejected(self, tmp_path, capsys):
+        _write_csv(tmp_path / "in.csv", ROWS + [("s1", "Scripting", "10", "1")])
+
+        assert main(["score", str(tmp_path / "in.csv"), "--workers", "0"]) == 2
+        assert "not contiguous" in capsys.readouterr().err
+
+    def test_missing_column(self, tmp_path, capsys):
+        (tmp_path / "in.csv").write_text("student_id,course_name,grade\ns1,Databases,15\n")
+
+        assert main(["score", str(tmp_path / "in.csv"), "--workers", "0"]) == 2
+        assert "phase" in capsys.readouterr().err
+
+    def test_out_of_range_grade(self, tmp_path, capsys):
+        _write_csv(tmp_path / "in.csv", [("s1", "Databases", "21", "1")])
+
+        assert main(["score", str(tmp_path / "in.csv"), "--workers", "0"]) == 2
+        assert "Row 2" in capsys.readouterr().err
+
+    def test_out_of_range_phase(self, tmp_path, capsys):
+        for phase in ("0", "-1", "4"):
+            _write_csv(tmp_path / "in.csv", ROWS[:1] + [("s1", "Scripting", "10", phase)])
+
+            assert main(["score", str(tmp_path / "in.csv"), "--workers", "0"]) == 2
+            assert "Row 3: phase must be between 1 and 3" in capsys.readouterr().err
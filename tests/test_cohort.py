@@ -0,0 +1,275 @@
+import asyncio
+import pickle
+import random
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.data.courses import COURSES
+from app.data.programs import programs
+from app.data.snapshot import write_snapshot
+from app.main import app
+from app.models.analysis import AnalysisRequest, GradeInput
+from app.services import offload
+from app.services.analysis_service import result_cache, run_analysis, run_analysis_batch, run_analysis_cached
+from app.services.cohort import (
+    CohortStats,
+    GradeHistogram,
+    cohort_from_batch,
+    cohort_stats,
+    load_cohort_stats,
+    save_cohort_stats,
+)
+from app.services.offload import AnalysisPool
+from benchmarks.synthetic import make_catalogue
+
+client = TestClient(app)
+
+
+def transcripts(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        AnalysisRequest(
+            current_phase=3,
+            grades=[
+                GradeInput(course_name=c.course_name, grade=round(rng.uniform(4, 20), 1))
+                for c in rng.sample(COURSES, rng.randint(3, 12))
+            ],
+        )
+        for _ in range(n)
+    ]
+
+
+ALPHA_COURSES, ALPHA_FIELDS = make_catalogue(60, n_fields=6)
+
+
+def alpha_transcripts(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    return [
+        AnalysisRequest(
+            program="alpha",
+            current_phase=3,
+            grades=[
+                GradeInput(course_name=c.course_name, grade=round(rng.uniform(4, 20), 1))
+                for c in rng.sample(ALPHA_COURSES, rng.randint(3, 12))
+            ],
+        )
+        for _ in range(n)
+    ]
+
+
+@pytest.fixture
+def programs_dir(tmp_path, monkeypatch):
+    write_snapshot(str(tmp_path / "alpha.snapshot"), ALPHA_COURSES, ALPHA_FIELDS)
+    monkeypatch.setattr(programs, "directory", str(tmp_path))
+    programs.clear()
+    yield tmp_path
+    programs.clear()
+
+
+@pytest.fixture
+def empty_cohort():
+    cohort_stats.clear()
+    yield cohort_stats
+    cohort_stats.clear()
+
+
+class TestGradeHistogram:
+    """Test percentile, quantile and distribution queries."""
+
+    def test_empty(self):
+        histogram = GradeHistogram()
+        assert histogram.count == 0
+        assert histogram.percentile_rank(10) is None
+        assert histogram.quantile(0.5) is None
+        assert histogram.mean() is None
+
+    def test_percentile_rank_counts_ties_as_half(self):
+        histogram = GradeHistogram()
+        histogram.add([10, 12, 12, 14.5])
+
+        assert histogram.percentile_rank(9.99) == 0.0
+        assert histogram.percentile_rank(10) == 12.5
+        assert histogram.percentile_rank(12) == 50.0
+        assert histogram.percentile_rank(20) == 100.0
+
+    def test_quantiles_are_exact_at_two_decimals(self):
+        values = [i / 100 for i in range(0, 2001, 7)] + [12.34] * 3
+        histogram = GradeHistogram()
+        histogram.add(values)
+
+        ordered = sorted(values)
+        assert histogram.quantile(0.5) == ordered[(len(ordered) - 1) // 2]
+        assert histogram.quantile(0) == ordered[0]
+        assert histogram.quantile(1) == ordered[-1]
+        assert histogram.mean() == round(sum(values) / len(values), 2)
+
+    def test_distribution_per_whole_grade(self):
+        histogram = GradeHistogram()
+        histogram.add([0, 0.99, 1, 19.5, 20])
+
+        bins = histogram.distribution()
+        assert len(bins) == 20
+        assert bins[0] == 2 and bins[1] == 1 and bins[19] == 2
+        assert sum(bins) == 5
+
+    def test_merge_adds_counts(self):
+        a, b, both = GradeHistogram(), GradeHistogram(), GradeHistogram()
+        a.add([10, 11])
+        b.add([11, 17.25])
+        both.add([10, 11, 11, 17.25])
+
+        a.percentile_rank(11)  # builds the cumulative counts before the merge
+        a.merge(b)
+        assert (a.counts == both.counts).all()
+        assert a.percentile_rank(11) == both.percentile_rank(11)
+
+
+class TestCohortStats:
+    """Test ingestion, merging and persistence."""
+
+    def test_ingest_collects_every_score(self):
+        requests = transcripts(20)
+        results = run_analysis_batch(requests)
+        stats = CohortStats()
+
+        assert stats.ingest(results) == 20
+        assert stats.transcripts == {3: 20}
+        data = stats.histogram(3, "category", "Data")
+        expected = [cs.average_grade for r in results for cs in r["category_scores"] if cs.category == "Data"]
+        assert data.count == len(expected)
+
+    def test_merged_parts_equal_whole(self):
+        requests = transcripts(30)
+        whole = cohort_from_batch(requests)
+        merged = CohortStats()
+        merged.merge(cohort_from_batch(requests[:11]))
+        merged.merge(cohort_from_batch(requests[11:]))
+
+        assert merged.to_dict() == whole.to_dict()
+
+    def test_pickles_for_worker_processes(self):
+        stats = cohort_from_batch(transcripts(5))
+        assert pickle.loads(pickle.dumps(stats)).to_dict() == stats.to_dict()
+
+    def test_save_and_load(self, tmp_path):
+        stats = cohort_from_batch(transcripts(10))
+        path = str(tmp_path / "cohort.json")
+        save_cohort_stats(stats, path)
+        assert load_cohort_stats(path).to_dict() == stats.to_dict()
+
+    def test_programme_cohorts_round_trip(self, programs_dir, tmp_path):
+        stats = cohort_from_batch(transcripts(5) + alpha_transcripts(4))
+        path = str(tmp_path / "cohort.json")
+        save_cohort_stats(stats, path)
+
+        loaded = load_cohort_stats(path)
+        assert loaded.to_dict() == stats.to_dict()
+        assert loaded.transcripts == {3: 5} and loaded.programs["alpha"].transcripts == {3: 4}
+        assert pickle.loads(pickle.dumps(stats)).to_dict() == stats.to_dict()
+
+    def test_processes_sharing_a_file_converge(self, tmp_path):
+        path = str(tmp_path / "cohort.json")
+        first, second = CohortStats(path), CohortStats(path)
+        first.ingest(run_analysis_batch(transcripts(4, seed=1)))
+        second.ingest(run_analysis_batch(transcripts(6, seed=2)))
+
+        first.sync()
+        second.sync()
+        first.sync()
+        second.sync()
+
+        expected = cohort_from_batch(transcripts(4, seed=1))
+        expected.merge(cohort_from_batch(transcripts(6, seed=2)))
+        assert first.to_dict() == second.to_dict() == expected.to_dict()
+        assert load_cohort_stats(path).transcripts == {3: 10}
+
+    def test_annotate_leaves_cached_result_untouched(self):
+        stats = cohort_from_batch(transcripts(50))
+        request = transcripts(1, seed=99)[0]
+        result_cache.clear()
+
+        ranked = run_analysis_cached(3, request.grades, cohort=stats)
+        cached = run_analysis_cached(3, request.grades)
+
+        assert all(cs.percentile is not None for cs in ranked["category_scores"])
+        assert all(cs.percentile is None for cs in cached["category_scores"])
+        assert ranked == run_analysis(3, request.grades, cohort=stats)
+
+
+class TestCohortAPI:
+    """Test POST /cohort/ingest, GET /cohort/distribution and percentiles on /analysis."""
+
+    def payload(self, requests):
+        return {"requests": [r.model_dump() for r in requests]}
+
+    def test_ingest_and_distribution(self, empty_cohort):
+        response = client.post("/cohort/ingest", json=self.payload(transcripts(40)))
+        assert response.json() == {"ingested": 40, "transcripts": {"3": 40}}
+
+        response = client.get("/cohort/distribution", params={"phase": 3, "category": "Data", "score": 14})
+        body = response.json()
+        histogram = empty_cohort.histogram(3, "category", "Data")
+        assert body["count"] == histogram.count == sum(body["histogram"])
+        assert body["quantiles"]["p50"] == histogram.quantile(0.5)
+        assert body["percentile"] == histogram.percentile_rank(14)
+
+    def test_programme_transcripts_go_to_their_cohort(self, empty_cohort, programs_dir):
+        requests = alpha_transcripts(8)  # scored inline, where PROGRAMS_DIR is patched
+        response = client.post("/cohort/ingest", json=self.payload(requests))
+
+        assert response.json() == {"ingested": 8, "transcripts": {}, "programs": {"alpha": {"3": 8}}}
+        assert empty_cohort.histograms == {}
+        alpha = empty_cohort.for_program("alpha")
+        results = run_analysis_batch(requests)
+        for category in {cs.category for result in results for cs in result["category_scores"]}:
+            expected = GradeHistogram()
+            expected.add([
+                cs.average_grade for result in results for cs in result["category_scores"] if cs.category == category
+            ])
+            assert alpha.histogram(3, "category", category).counts.tolist() == expected.counts.tolist()
+
+        category = results[0]["category_scores"][0].category
+        params = {"phase": 3, "category": category, "program": "alpha"}
+        assert client.get("/cohort/distribution", params=params).json()["count"] == alpha.histogram(
+            3, "category", category).count
+        assert client.get("/cohort/distribution", params={**params, "program": "gamma"}).status_code == 422
+
+        ranked = client.post("/analysis/", json={**requests[0].model_dump(), "percentiles": True}).json()
+        for cs in ranked["category_scores"]:
+            assert cs["percentile"] == alpha.percentile_rank(3, "category", cs["category"], cs["average_grade"])
+
+    def test_distribution_needs_one_target(self, empty_cohort):
+        assert client.get("/cohort/distribution", params={"phase": 1}).status_code == 422
+        response = client.get("/cohort/distribution", params={"phase": 1, "field": "Data Science"})
+        assert response.status_code == 200
+        assert response.json()["count"] == 0
+
+    def test_analysis_percentiles(self, empty_cohort):
+        client.post("/cohort/ingest", json=self.payload(transcripts(40)))
+        request = transcripts(1, seed=5)[0].model_dump()
+
+        plain = client.post("/analysis/", json=request).json()
+        ranked = client.post("/analysis/", json={**request, "percentiles": True}).json()
+
+        assert all("percentile" not in cs for cs in plain["category_scores"])
+        for cs in ranked["category_scores"]:
+            assert cs["percentile"] == empty_cohort.percentile_rank(3, "category", cs["category"], cs["average_grade"])
+        assert all(0 <= fs["percentile"] <= 100 for fs in ranked["field_signals"])
+
+        batch = client.post("/analysis/batch", json={"requests": [request, {**request, "percentiles": True}]}).json()
+        assert batch == [plain, ranked]
+
+    def test_ingest_in_worker_processes(self, monkeypatch):
+        pool = AnalysisPool(max_workers=2, max_queue=2)
+        monkeypatch.setattr(offload, "analysis_pool", pool)
+        monkeypatch.setattr(offload, "settings", replace(settings, analysis_inline_max_batch=0))
+        requests = transcripts(1200)
+        try:
+            stats = asyncio.run(offload.cohort_from_batch_async(requests))
+        finally:
+            pool.shutdown()
+
+        assert stats.to_dict() == cohort_from_batch(requests).to_dict()
@@ -0,0 +1,52 @@
+from app.data.courses import COURSES
+from app.models.course import CourseCategory
+from app.services.course_service import CourseIndexes, CourseRepository, get_course_by_id, get_courses
+
+
+class TestCourseRepository:
+    """Test indexed course lookups."""
+
+    def test_get_by_id(self):
+        assert get_course_by_id(24).course_name == "Databases"
+        assert get_course_by_id(9999) is None
+
+    def test_filters_match_linear_scan(self):
+        for phase in (None, 1, 2, 3):
+            for category in (None, *CourseCategory):
+                expected = [
+                    c.id for c in COURSES
+                    if (phase is None or c.phase == phase)
+                    and (category is None or c.category == category)
+                ]
+                assert [c.id for c in get_courses(phase=phase, category=category)] == expected
+
+    def test_filtered_results_are_shared_and_immutable(self):
+        first = get_courses(phase=1, category=CourseCategory.DATA)
+
+        assert isinstance(first, tuple)
+        assert get_courses(phase=1, category=CourseCategory.DATA) is first
+
+    def test_category_value_lookup(self):
+        assert get_courses(category="Data") == get_courses(category=CourseCategory.DATA)
+
+    def test_unknown_phase_is_empty(self):
+        assert get_courses(phase=4) == ()
+
+    def test_invalidate_rebuilds(self):
+        indexes = CourseRepository.indexes()
+        CourseRepository.invalidate()
+
+        assert CourseRepository.indexes() is not indexes
+        assert [c.id for c in CourseRepository.get_all()] == [c.id for c in COURSES]
+
+
+class TestCourseIndexes:
+    """Test the storage-agnostic index builder."""
+
+    def test_build_from_any_sequence(self):
+        indexes = CourseIndexes(COURSES[:3])
+
+        assert indexes.by_id.keys() == {1, 2, 3}
+        assert [c.course_name for c in indexes.by_phase[1]] == [c.course_name for c in COURSES[:3]]
+        assert indexes.filter(category=CourseCategory.BUSINESS) == indexes.all
+        assert indexes.filter(phase=2) == ()
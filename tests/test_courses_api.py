@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+
+from app.data.courses import COURSES
+from app.data.curriculum import reload_curriculum
+from app.main import app
+
+client = TestClient(app)
+
+
+class TestCourseListCaching:
+    """Test pre-serialized, ETag-cached catalogue responses."""
+
+    def test_body_matches_catalogue(self):
+        response = client.get("/courses/", params={"phase": 1, "category": "Data"})
+
+        assert response.status_code == 200
+        assert [c["course_name"] for c in response.json()] == [
+            "Databases", "Data Processing & Analysis"
+        ]
+        assert response.headers["cache-control"] == "public, max-age=300"
+        assert response.headers["etag"].startswith('"')
+
+    def test_empty_filter(self):
+        response = client.get("/courses/", params={"phase": 1, "category": "Hands-On Experience"})
+        assert len(response.json()) == 1
+
+        response = client.get("/courses/", params={"phase": 2, "category": "Business Intelligence"})
+        assert response.json() == [c.model_dump(mode="json") for c in COURSES if c.id == 22]
+
+    def test_not_modified(self):
+        etag = client.get("/courses/").headers["etag"]
+
+        response = client.get("/courses/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        weak = client.get("/courses/", headers={"If-None-Match": f'"other", W/{etag}'})
+        assert weak.status_code == 304
+
+    def test_stale_etag_gets_body(self):
+        response = client.get("/courses/", headers={"If-None-Match": '"stale"'})
+        assert response.status_code == 200
+        assert len(response.json()) == len(COURSES)
+
+    def test_etags_differ_per_filter(self):
+        assert client.get("/courses/?phase=1").headers["etag"] != client.get("/courses/?phase=2").headers["etag"]
+
+    def test_reload_invalidates(self):
+        etag = client.get("/courses/").headers["etag"]
+        try:
+            reload_curriculum(courses=COURSES[:-1])
+            response = client.get("/courses/", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert len(response.json()) == len(COURSES) - 1
+        finally:
+            reload_curriculum(courses=COURSES)
+
+        assert client.get("/courses/").headers["etag"] == etag
@@ -0,0 +1,66 @@
+from app.data.courses import COURSES
+from app.data.curriculum import CurriculumIndex, get_curriculum_index
+from app.data.fields import FIELDS
+from app.models.analysis import GradeInput
+from app.services.analysis_service import run_analysis
+from benchmarks.synthetic import make_catalogue, make_grades
+
+
+class TestCurriculumIndex:
+    """Test the precompiled catalogue lookups."""
+
+    def test_lookup_by_name(self):
+        index = get_curriculum_index()
+
+        assert index.by_name["Databases"].id == 24
+        assert "Databases" in index
+        assert "Unknown Course" not in index
+
+    def test_phase_lists_are_cumulative(self):
+        index = get_curriculum_index()
+
+        assert [c.id for c in index.eligible_courses(1)] == [c.id for c in COURSES if c.phase == 1]
+        assert [c.id for c in index.eligible_courses(3)] == [c.id for c in COURSES]
+        assert index.total_credits(2) == sum(c.credits for c in COURSES if c.phase <= 2)
+
+    def test_category_maps(self):
+        index = get_curriculum_index()
+
+        assert [c.course_name for c in index.category_courses["Data"]][:2] == [
+            "Databases", "Data Processing & Analysis"
+        ]
+        assert set(index.category_fields["Security"]) == {"Cybersecurity", "DevSecOps"}
+        assert "Communication" not in index.category_fields
+
+    def test_is_built_once(self):
+        assert get_curriculum_index() is get_curriculum_index()
+
+
+class TestRunAnalysisWithIndex:
+    """Test run_analysis against an explicitly supplied index."""
+
+    def test_custom_catalogue(self):
+        courses, fields = make_catalogue(500, n_fields=20, seed=3)
+        index = CurriculumIndex(courses, fields)
+        grades = make_grades(courses, 30, max_phase=2, seed=3)
+
+        result = run_analysis(current_phase=2, grades=grades, index=index)
+
+        assert result["category_scores"]
+        graded = {g.course_name for g in grades}
+        for signal in result["field_signals"]:
+            assert signal.field in fields
+            assert set(signal.contributors["courses"]) <= graded
+
+    def test_contributors_in_catalogue_order(self):
+        grades = [
+            GradeInput(course_name="Data Processing & Analysis", grade=14.0),
+            GradeInput(course_name="Databases", grade=15.0)
+        ]
+        result = run_analysis(current_phase=1, grades=grades)
+
+        analytics = next(fs for fs in result["field_signals"] if fs.field == "Data Analytics")
+        assert analytics.contributors["courses"] == ["Databases", "Data Processing & Analysis"]
+
+    def test_default_index_uses_builtin_fields(self):
+        assert get_curriculum_index().fields is FIELDS
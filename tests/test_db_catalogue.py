@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect
+
+from app.cli import main
+from app.data.courses import COURSES
+from app.data.curriculum import get_curriculum_index, poll_catalogue, reload_curriculum
+from app.data.fields import FIELDS
+from app.db import CatalogueNotSeeded, DatabaseCatalogue, create_catalogue_engine, write_catalogue
+from app.db.models import Base
+from app.models.analysis import GradeInput
+from app.services.analysis_service import run_analysis
+from app.services.course_service import get_course_by_id
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_catalogue_engine(f"sqlite:///{tmp_path / 'catalogue.db'}", pool_size=2)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def catalogue(engine):
+    yield DatabaseCatalogue(engine)
+    reload_curriculum(COURSES, FIELDS)
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestDatabaseCatalogue:
+    """Test the database-backed catalogue and its in-process cache."""
+
+    def test_round_trip_preserves_catalogue(self, engine, catalogue):
+        write_catalogue(engine, COURSES, FIELDS)
+        index = catalogue.refresh()
+
+        assert index is get_curriculum_index()
+        assert [c.to_dict() for c in index.courses] == [c.model_dump(mode="json") for c in COURSES]
+        assert index.fields == FIELDS
+        assert list(index.fields) == list(FIELDS)
+        assert index.version == reload_curriculum(COURSES, FIELDS).version
+
+    def test_refresh_only_reloads_on_version_change(self, engine, catalogue):
+        write_catalogue(engine, COURSES, FIELDS)
+        catalogue.refresh()
+        statements = count_queries(engine)
+
+        assert catalogue.refresh() is None
+        assert len(statements) == 1
+        assert catalogue.loads == 1
+
+        write_catalogue(engine, COURSES[:-1], FIELDS)
+        assert catalogue.refresh() is not None
+        assert catalogue.loads == 2
+        assert get_course_by_id(COURSES[-1].id) is None
+
+    def test_analysis_does_not_query_the_database(self, engine, catalogue):
+        write_catalogue(engine, COURSES, FIELDS)
+        catalogue.refresh()
+        statements = count_queries(engine)
+
+        grades = [GradeInput(course_name=c.course_name, grade=15.0) for c in COURSES[:10]]
+        run_analysis(3, grades)
+
+        assert statements == []
+
+    def test_unseeded_database_raises(self, catalogue):
+        with pytest.raises(CatalogueNotSeeded):
+            catalogue.refresh()
+
+    def test_bad_category_keeps_previous_catalogue(self, engine, catalogue):
+        write_catalogue(engine, COURSES, FIELDS)
+        catalogue.refresh()
+        with engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE courses SET category = 'Astrology' WHERE id = 1")
+            conn.exec_driver_sql("UPDATE catalogue_meta SET version = version + 1")
+
+        with pytest.raises(ValueError):
+            catalogue.refresh()
+        assert get_course_by_id(1).category == COURSES[0].category.value
+
+    def test_poller_refreshes_in_background(self, engine, catalogue):
+        write_catalogue(engine, COURSES, FIELDS)
+        catalogue.refresh()
+        write_catalogue(engine, COURSES[:-1], FIELDS)
+
+        async def poll_once():
+            task = asyncio.create_task(poll_catalogue(catalogue, 0.01))
+            while catalogue.loads < 2:
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(asyncio.wait_for(poll_once(), timeout=5))
+        assert len(get_curriculum_index().courses) == len(COURSES) - 1
+
+
+    def test_app_serves_stored_catalogue(self, engine, catalogue, monkeypatch):
+        import app.main
+
+        write_catalogue(engine, COURSES[:5], FIELDS)
+        monkeypatch.setattr(app.main, "catalogue_source", lambda: catalogue)
+
+        with TestClient(app.main.app) as client:
+            assert [c["id"] for c in client.get("/courses/").json()] == [c.id for c in COURSES[:5]]
+
+    def test_seed_db_command(self, engine, catalogue):
+        assert main(["seed-db", "--url", str(engine.url)]) == 0
+
+        catalogue.refresh()
+        assert len(get_curriculum_index().courses) == len(COURSES)
+
+
+class TestEngine:
+    """Test engine pooling and the migration."""
+
+    def test_pool_settings(self, engine):
+        assert engine.pool.size() == 2
+        assert engine.pool._pre_ping
+
+    def test_in_memory_sqlite_skips_pool_sizing(self):
+        engine = create_catalogue_engine("sqlite://")
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT 1").scalar() == 1
+        engine.dispose()
+
+    def test_migration_matches_models(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'migrated.db'}"
+        config = Config("alembic.ini")
+        config.set_main_option("sqlalchemy.url", url)
+        config.attributes["configure_logger"] = False
+        command.upgrade(config, "head")
+
+        engine = create_catalogue_engine(url)
+        tables = set(inspect(engine).get_table_names()) - {"alembic_version"}
+        assert tables == set(Base.metadata.tables)
+        write_catalogue(engine, COURSES, FIELDS)
+        engine.dispose()
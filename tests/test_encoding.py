@@ -0,0 +1,151 @@
+import gzip
+
+import brotli
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.api.encoding import JSON, MSGPACK, VARY, Negotiated, dump_json, negotiate
+from app.main import app
+
+client = TestClient(app)
+
+TRANSCRIPT = {
+    "current_phase": 2,
+    "grades": [
+        {"course_name": "Databases", "grade": 15.0},
+        {"course_name": "Scripting", "grade": 12.5},
+        {"course_name": "Entrepreneurial Management", "grade": 17.0},
+    ],
+}
+
+
+def negotiated(accept=None, accept_encoding=None) -> Negotiated:
+    headers = [
+        (name.encode(), value.encode())
+        for name, value in (("accept", accept), ("accept-encoding", accept_encoding))
+        if value is not None
+    ]
+    return negotiate(Request({"type": "http", "headers": headers}))
+
+
+def raw(path: str, accept: str = JSON, accept_encoding: str = "identity", **kwargs):
+    """Request without httpx's transparent decompression."""
+    with client.stream(
+        kwargs.pop("method", "GET"), path,
+        headers={"Accept": accept, "Accept-Encoding": accept_encoding, **kwargs.pop("headers", {})},
+        **kwargs,
+    ) as response:
+        response.body = b"".join(response.iter_raw())
+    return response
+
+
+class TestNegotiation:
+    """Test Accept and Accept-Encoding parsing."""
+
+    @pytest.mark.parametrize("accept, media_type", [
+        (None, JSON),
+        ("*/*", JSON),
+        ("application/msgpack", MSGPACK),
+        ("application/x-msgpack", MSGPACK),
+        ("application/json, application/msgpack", JSON),
+        ("application/json;q=0.5, application/msgpack", MSGPACK),
+        ("application/msgpack;q=0", JSON),
+        ("text/html", JSON),
+    ])
+    def test_media_type(self, accept, media_type):
+        assert negotiated(accept=accept).media_type == media_type
+
+    @pytest.mark.parametrize("accept_encoding, coding", [
+        (None, None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", "br"),
+        ("*, br;q=0", "gzip"),
+        ("gzip;q=0", None),
+    ])
+    def test_coding(self, accept_encoding, coding):
+        assert negotiated(accept_encoding=accept_encoding).coding == coding
+
+
+class TestAnalysisEncodings:
+    """Test negotiated encodings for analysis responses."""
+
+    def test_msgpack_matches_json(self):
+        as_json = client.post("/analysis/", json=TRANSCRIPT).json()
+        response = client.post("/analysis/", json=TRANSCRIPT, headers={"Accept": MSGPACK})
+
+        assert response.headers["content-type"] == MSGPACK
+        assert response.headers["vary"] == VARY
+        assert msgpack.unpackb(response.content) == as_json
+
+    @pytest.mark.parametrize("coding, decompress", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+    def test_compressed(self, coding, decompress):
+        plain = raw("/analysis/", method="POST", json=TRANSCRIPT)
+        response = raw("/analysis/", method="POST", json=TRANSCRIPT, accept_encoding=coding)
+
+        assert "content-encoding" not in plain.headers
+        assert response.headers["content-encoding"] == coding
+        assert len(response.body) < len(plain.body)
+        assert decompress(response.body) == plain.body
+
+    def test_small_body_not_compressed(self):
+        response = raw("/analysis/incremental", method="POST", json={"current_phase": 1}, accept_encoding="gzip")
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == VARY
+
+    def test_msgpack_stream(self):
+        batch = {"requests": [TRANSCRIPT, {**TRANSCRIPT, "current_phase": 3}]}
+        expected = client.post("/analysis/batch", json=batch).json()
+        response = client.post("/analysis/batch?stream=true", json=batch, headers={"Accept": MSGPACK})
+
+        assert response.headers["content-type"] == MSGPACK
+        unpacker = msgpack.Unpacker()
+        unpacker.feed(response.content)
+        assert list(unpacker) == expected
+
+
+class TestCourseEncodings:
+    """Test per-representation catalogue bodies and ETags."""
+
+    def test_msgpack_course_list(self):
+        response = raw("/courses/", accept=MSGPACK)
+
+        assert response.headers["content-type"] == MSGPACK
+        assert msgpack.unpackb(response.body) == client.get("/courses/").json()
+
+    def test_msgpack_single_course(self):
+        response = client.get("/courses/5", headers={"Accept": MSGPACK})
+        assert msgpack.unpackb(response.content) == client.get("/courses/5").json()
+
+    def test_variants_have_own_etags(self):
+        variants = [(JSON, "identity"), (JSON, "gzip"), (JSON, "br"), (MSGPACK, "identity"), (MSGPACK, "br")]
+        etags = {raw("/courses/", accept, coding).headers["etag"] for accept, coding in variants}
+        assert len(etags) == len(variants)
+
+    def test_not_modified_per_variant(self):
+        etag = raw("/courses/", MSGPACK, "br").headers["etag"]
+
+        response = raw("/courses/", MSGPACK, "br", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["vary"] == VARY
+
+        assert raw("/courses/", JSON, "br", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_compressed_body_decodes(self):
+        plain = raw("/courses/")
+        response = raw("/courses/", accept_encoding="gzip")
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(response.body) == plain.body == dump_json(client.get("/courses/").json())
+
+    def test_small_list_not_compressed(self):
+        response = raw("/courses/?phase=1&category=Hands-On%20Experience", accept_encoding="br")
+
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"] == raw("/courses/?phase=1&category=Hands-On%20Experience").headers["etag"]
@@ -0,0 +1,193 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.encoding import dump_json
+from app.cli import main
+from app.data.catalogue_file import write_catalogue_file
+from app.data.courses import COURSES
+from app.data.curriculum import CurriculumIndex, get_curriculum_index, reload_curriculum
+from app.data.fields import FIELDS
+from app.data.image import ImageError, MappedCurriculumIndex, read_image, write_image
+from app.data.programs import ProgramRegistry
+from app.main import app
+from app.services.analysis_service import run_analysis
+from app.services.course_service import CourseIndexes, ImageCourseIndexes, build_indexes
+from app.services.offload import _worker_catalogue
+from benchmarks.synthetic import make_catalogue, make_grades
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+client = TestClient(app)
+
+COURSES_2K, FIELDS_2K = make_catalogue(2000, n_fields=40)
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = str(tmp_path / "catalogue.image")
+    write_image(path, COURSES_2K, FIELDS_2K)
+    return read_image(path)
+
+
+class TestImage:
+    """Test compiling catalogues into images and reading them in place."""
+
+    def test_matches_curriculum_index(self, image):
+        expected = CurriculumIndex(COURSES_2K, FIELDS_2K)
+
+        assert image.version == expected.version
+        assert list(image.courses) == list(expected.courses)
+        assert image.fields == expected.fields and list(image.fields) == list(expected.fields)
+        assert image.phases == expected.phases
+        assert image.phase_credits == expected.phase_credits
+        assert {p: list(c) for p, c in image.phase_courses.items()} == {
+            p: list(c) for p, c in expected.phase_courses.items()
+        }
+        assert {k: list(c) for k, c in image.category_courses.items()} == {
+            k: list(c) for k, c in expected.category_courses.items()
+        }
+        assert image.category_fields == expected.category_fields
+        assert image.field_order == expected.field_order
+
+    def test_lookups(self, image):
+        course = COURSES_2K[1234]
+
+        assert image.by_name[course.course_name].id == course.id
+        assert image.by_name.get(course.course_name) is image.by_name.get(course.course_name)
+        assert course.course_name in image
+        assert "Nope" not in image and image.by_name.get("Nope") is None
+        assert image.courses[-1].position == len(COURSES_2K) - 1
+        assert [c.id for c in image.courses[10:13]] == [c.id for c in COURSES_2K[10:13]]
+        with pytest.raises(KeyError):
+            image.by_name["Nope"]
+
+    def test_analysis_matches(self, image):
+        expected = CurriculumIndex(COURSES_2K, FIELDS_2K)
+        for seed in range(10):
+            grades = make_grades(COURSES_2K, 60, seed=seed)
+            for phase in (1, 2, 3):
+                assert run_analysis(phase, grades, index=image) == run_analysis(phase, grades, index=expected)
+
+    def test_course_indexes_and_bodies(self, image):
+        indexes = build_indexes(image.courses)
+        expected = CourseIndexes(COURSES_2K)
+
+        assert isinstance(indexes, ImageCourseIndexes)
+        assert set(indexes.filtered) == set(expected.filtered)
+        for key, courses in expected.filtered.items():
+            assert list(indexes.filtered[key]) == list(courses)
+            assert bytes(indexes.body(key)) == dump_json([c.to_dict() for c in courses])
+        assert indexes.by_id[COURSES_2K[7].id].course_name == COURSES_2K[7].course_name
+        assert indexes.by_id.get(10 ** 6) is None
+        assert list(indexes.filter(phase=2, category="Data")) == list(expected.filter(phase=2, category="Data"))
+
+    def test_pool_workers_map_the_image_again(self, image):
+        courses, fields, path = pickle.loads(pickle.dumps(_worker_catalogue(image)))
+
+        assert (courses, fields, path) == (None, None, image.image.path)
+
+    def test_empty_catalogue(self, tmp_path):
+        path = str(tmp_path / "empty.image")
+        write_image(path, [], {})
+        index = read_image(path)
+
+        assert len(index.courses) == 0 and index.fields == {} and index.eligible_courses(3) == ()
+        assert bytes(build_indexes(index.courses).body((None, None))) == b"[]"
+
+    @pytest.mark.parametrize("content", [b"", b"not an image", b"CSCATIMG" + b"\0" * 200])
+    def test_invalid_images(self, tmp_path, content):
+        path = tmp_path / "catalogue.image"
+        path.write_bytes(content)
+
+        with pytest.raises(ImageError):
+            read_image(str(path))
+
+    def test_truncated_images(self, tmp_path):
+        path = tmp_path / "catalogue.image"
+        write_image(str(path), COURSES, FIELDS)
+        data = path.read_bytes()
+
+        for cut in range(0, len(data), 211):
+            path.write_bytes(data[:cut])
+            with pytest.raises(ImageError):
+                read_image(str(path))
+
+    def test_missing_image(self, tmp_path):
+        with pytest.raises(ImageError):
+            read_image(str(tmp_path / "missing.image"))
+
+    def test_build_image_command(self, tmp_path):
+        builtin = str(tmp_path / "builtin.image")
+        assert main(["build-image", builtin]) == 0
+        assert read_image(builtin).version == get_curriculum_index().version
+
+        source = str(tmp_path / "catalogue.json")
+        write_catalogue_file(source, COURSES_2K[:100], FIELDS_2K)
+        image = str(tmp_path / "catalogue.image")
+        assert main(["build-image", image, "--from", source]) == 0
+        assert len(read_image(image).courses) == 100
+
+    def test_programme_images(self, tmp_path):
+        write_image(str(tmp_path / "alpha.image"), COURSES_2K, FIELDS_2K)
+        registry = ProgramRegistry(str(tmp_path), max_loaded=2, idle_ttl=600)
+
+        assert isinstance(registry.get("alpha").index, MappedCurriculumIndex)
+
+
+class TestImageAPI:
+    """Test serving the default catalogue from an image."""
+
+    @pytest.fixture
+    def mapped(self, tmp_path):
+        original = get_curriculum_index()
+        path = str(tmp_path / "builtin.image")
+        write_image(path, COURSES, FIELDS)
+        expected = {
+            "all": client.get("/courses/").content,
+            "filtered": client.get("/courses/", params={"phase": 2, "category": "Data"}).content,
+            "msgpack": client.get("/courses/", headers={"Accept": "application/msgpack"}).content,
+            "course": client.get(f"/courses/{COURSES[3].id}").json(),
+        }
+        reload_curriculum(index=read_image(path))
+        yield expected
+        reload_curriculum(index=original)
+
+    def test_responses_match(self, mapped):
+        assert client.get("/courses/").content == mapped["all"]
+        assert client.get("/courses/", params={"phase": 2, "category": "Data"}).content == mapped["filtered"]
+        assert client.get("/courses/", headers={"Accept": "application/msgpack"}).content == mapped["msgpack"]
+        assert client.get(f"/courses/{COURSES[3].id}").json() == mapped["course"]
+        assert client.get("/courses/999999").status_code == 404
+
+    def test_gzip(self, mapped):
+        response = client.get("/courses/", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.content == mapped["all"]
+
+    def test_analysis(self, mapped):
+        grades = [{"course_name": c.course_name, "grade": 13} for c in COURSES[:15]]
+        response = client.post("/analysis/", json={"current_phase": 3, "grades": grades})
+
+        assert response.status_code == 200
+        assert client.post("/analysis/", json={"current_phase": 3, "grades": [{"course_name": "Nope", "grade": 1}]}
+                           ).status_code == 422
+
+    def test_startup_maps_the_image(self, tmp_path):
+        path = str(tmp_path / "catalogue.image")
+        version = write_image(path, COURSES, FIELDS)
+
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, app.main\n"
+             "from app.data.curriculum import get_curriculum_index\n"
+             "print('app.data.courses' in sys.modules, type(get_curriculum_index()).__name__, "
+             "get_curriculum_index().version)"],
+            cwd=ROOT, env={**os.environ, "CATALOGUE_IMAGE": path}, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        assert output == ["False", "MappedCurriculumIndex", version]
@@ -0,0 +1,144 @@
+import random
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.data.courses import COURSES
+from app.data.curriculum import get_curriculum_index, reload_curriculum
+from app.data.fields import FIELDS
+from app.main import app
+from app.models.analysis import GradeInput
+from app.models.records import analysis_to_dict
+from app.services import incremental
+from app.services.analysis_service import run_analysis
+from app.services.incremental import InvalidState, decode_state, encode_state, update_analysis
+
+NAMES = [c.course_name for c in COURSES]
+
+
+def _grades(grade_map):
+    return [GradeInput(course_name=name, grade=grade) for name, grade in grade_map.items()]
+
+
+class TestUpdateAnalysis:
+    """Test that incremental updates match a full run_analysis."""
+
+    def test_random_deltas_match_run_analysis(self):
+        rng = random.Random(13)
+        for _ in range(200):
+            phase = rng.randint(1, 3)
+            grade_map, state = {}, None
+            for _ in range(rng.randint(1, 5)):
+                upsert = [
+                    GradeInput(course_name=rng.choice(NAMES), grade=round(rng.uniform(0, 20), rng.choice([0, 1, 2])))
+                    for _ in range(rng.randint(0, 6))
+                ]
+                remove = rng.sample(sorted(grade_map), min(len(grade_map), rng.randint(0, 2)))
+                for name in remove:
+                    del grade_map[name]
+                grade_map.update((g.course_name, g.grade) for g in upsert)
+
+                result, new_state = update_analysis(state, phase, upsert, remove)
+                state = decode_state(encode_state(new_state))
+
+                assert result == run_analysis(phase, _grades(grade_map))
+
+    def test_phase_change_recomputes(self):
+        grade_map = {name: 15.0 for name in NAMES[::3]}
+        _, state = update_analysis(None, 1, _grades(grade_map))
+
+        result, state = update_analysis(state, 3, [GradeInput(course_name=NAMES[1], grade=9.0)])
+
+        grade_map[NAMES[1]] = 9.0
+        assert result == run_analysis(3, _grades(grade_map))
+        assert state.phase == 3
+
+    def test_catalogue_change_recomputes(self):
+        grade_map = {name: 12.5 for name in NAMES[:20]}
+        _, state = update_analysis(None, 3, _grades(grade_map))
+        try:
+            index = reload_curriculum(courses=COURSES[10:])
+            result, state = update_analysis(state, 3, remove=[NAMES[15]])
+
+            del grade_map[NAMES[15]]
+            assert result == run_analysis(3, _grades(grade_map), index=index)
+            assert state.catalogue == index.version
+        finally:
+            reload_curriculum(COURSES, FIELDS)
+
+    def test_only_affected_categories_are_resummed(self):
+        grade_map = {name: 14.0 for name in NAMES}
+        _, state = update_analysis(None, 3, _grades(grade_map))
+        changed = get_curriculum_index().by_name[NAMES[0]].category
+        untouched = {category: entry for category, entry in state.categories.items() if category != changed}
+
+        _, new_state = update_analysis(state, 3, [GradeInput(course_name=NAMES[0], grade=4.0)])
+
+        assert new_state.categories[changed] != state.categories[changed]
+        for category, entry in untouched.items():
+            assert new_state.categories[category] is entry
+
+    def test_tampered_state_is_rejected(self):
+        _, state = update_analysis(None, 2, [GradeInput(course_name=NAMES[0], grade=10.0)])
+        token = encode_state(state)
+        body, signature = token.split(".")
+
+        with pytest.raises(InvalidState):
+            decode_state(body[:-2] + "AA." + signature)
+        with pytest.raises(InvalidState):
+            decode_state("not-a-state")
+
+
+class TestIncrementalEndpoint:
+    """Test POST /analysis/incremental."""
+
+    def test_round_trip_matches_full_analysis(self):
+        client = TestClient(app)
+        first = client.post("/analysis/incremental", json={
+            "current_phase": 2,
+            "upsert": [{"course_name": name, "grade": 13.0} for name in NAMES[:12]],
+        })
+        assert first.status_code == 200
+
+        second = client.post("/analysis/incremental", json={
+            "state": first.json()["state"],
+            "upsert": [{"course_name": NAMES[3], "grade": 19.0}],
+            "remove": [NAMES[0]],
+        })
+        body = second.json()
+        del body["state"]
+
+        grade_map = {name: 13.0 for name in NAMES[1:12]}
+        grade_map[NAMES[3]] = 19.0
+        full = client.post("/analysis/", json={
+            "current_phase": 2,
+            "grades": [{"course_name": name, "grade": grade} for name, grade in grade_map.items()],
+        })
+        assert body == full.json()
+        assert body == analysis_to_dict(run_analysis(2, _grades(grade_map)))
+
+    def test_bad_state_and_missing_phase(self):
+        client = TestClient(app)
+
+        assert client.post("/analysis/incremental", json={"state": "x.y"}).status_code == 400
+        assert client.post("/analysis/incremental", json={"upsert": []}).status_code == 422
+
+    def test_startup_warns_without_a_shared_secret(self, monkeypatch, caplog):
+        monkeypatch.setattr(incremental, "settings", replace(settings, analysis_state_secret=""))
+        with TestClient(app):
+            pass
+        assert "ANALYSIS_STATE_SECRET is not set" in caplog.text
+
+        caplog.clear()
+        monkeypatch.setattr(incremental, "settings", replace(settings, analysis_state_secret="shared"))
+        with TestClient(app):
+            pass
+        assert "ANALYSIS_STATE_SECRET" not in caplog.text
+
+    def test_unknown_course_is_rejected(self):
+        response = TestClient(app).post("/analysis/incremental", json={
+            "current_phase": 1, "upsert": [{"course_name": "Alchemy", "grade": 10}],
+        })
+        assert response.status_code == 422
@@ -0,0 +1,261 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import jobs as jobs_api
+from app.api.encoding import dump_json
+from app.main import app
+from app.models.analysis import AnalysisRequest, GradeInput
+from app.models.records import analysis_to_dict
+from app.services.analysis_service import run_analysis_batch
+from app.services.jobs import CANCELLED, COMPLETED, FAILED, FINISHED, RUNNING, JobQueue, JobQueueFull, JobStore
+from app.services.offload import AnalysisPool
+
+msgpack = pytest.importorskip("msgpack")
+
+NAMES = ["Databases", "Programming Fundamentals", "Data Science Fundamentals", "Data Processing & Analysis"]
+
+REQUESTS = [
+    AnalysisRequest(
+        current_phase=1 + i % 3,
+        grades=[GradeInput(course_name=name, grade=8 + (i * 7 + j) % 12) for j, name in enumerate(NAMES[:1 + i % 4])],
+    )
+    for i in range(25)
+]
+
+
+def expected_bodies(requests):
+    return [dump_json(analysis_to_dict(result)) for result in run_analysis_batch(requests)]
+
+
+def wait(store: JobStore, job_id: str, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = store.get(job_id)
+        if job["status"] in FINISHED or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(
+        JobStore(), AnalysisPool(max_workers=1, max_queue=0),
+        max_running=1, max_pending=4, chunk_size=4, ttl=60
+    )
+    yield queue
+    queue.shutdown()
+    queue.pool.shutdown()
+
+
+@pytest.fixture
+def gated(queue, monkeypatch):
+    """Chunks wait for the gate to open, one chunk per release."""
+    gate = threading.Semaphore(0)
+    score = queue._score
+
+    def gated_score(chunk):
+        gate.acquire(timeout=10)
+        return score(chunk)
+
+    monkeypatch.setattr(queue, "_score", gated_score)
+    return gate
+
+
+class TestJobStore:
+    """Test job status and result storage in SQLite."""
+
+    def test_lifecycle(self):
+        store = JobStore()
+        job = store.create(3, ttl=60)
+
+        assert store.get(job["id"])["status"] == "queued"
+        assert store.start(job["id"], ttl=60)
+        assert store.add_results(job["id"], 0, [b"0", b"1"], ttl=60)
+        assert store.add_results(job["id"], 2, [b"2"], ttl=60)
+        assert store.finish(job["id"], COMPLETED, ttl=60)
+        assert not store.finish(job["id"], FAILED, ttl=60)
+
+        assert store.get(job["id"])["completed"] == 3
+        assert store.results(job["id"], 0, 10) == [b"0", b"1", b"2"]
+        assert store.results(job["id"], 1, 1) == [b"1"]
+        assert store.get("missing") is None
+
+    def test_cancelled_jobs_take_no_results(self):
+        store = JobStore()
+        job = store.create(2, ttl=60)
+        store.start(job["id"], ttl=60)
+        store.add_results(job["id"], 0, [b"0"], ttl=60)
+
+        assert store.cancel(job["id"], ttl=60)["status"] == CANCELLED
+        assert store.results(job["id"], 0, 10) == []
+        assert not store.add_results(job["id"], 1, [b"1"], ttl=60)
+        assert not store.start(job["id"], ttl=60)
+
+    def test_purge_expired(self):
+        store = JobStore()
+        expired = store.create(1, ttl=-1)
+        kept = store.create(1, ttl=60)
+
+        assert store.get(expired["id"]) is None
+        assert store.purge() == 1
+        assert store.get(kept["id"]) is not None
+
+    def test_shared_between_processes(self, tmp_path):
+        path = str(tmp_path / "jobs.db")
+        runner, reader = JobStore(path), JobStore(path)
+        job = runner.create(1, ttl=60)
+        runner.start(job["id"], ttl=60)
+
+        reader.cancel(job["id"], ttl=60)
+
+        assert not runner.add_results(job["id"], 0, [b"0"], ttl=60)
+        assert runner.get(job["id"])["status"] == CANCELLED
+        runner.close()
+        reader.close()
+
+
+class TestJobQueue:
+    """Test running, cancelling and stopping background jobs."""
+
+    def test_results_match_batch_analysis(self, queue):
+        job = queue.submit(REQUESTS)
+
+        assert wait(queue.store, job["id"])["status"] == COMPLETED
+        assert queue.store.results(job["id"], 0, 100) == expected_bodies(REQUESTS)
+        assert queue.pending == 0
+
+    def test_large_chunks_run_in_the_pool(self, queue):
+        queue.chunk_size = 20
+        job = queue.submit(REQUESTS)
+
+        assert wait(queue.store, job["id"], timeout=60)["status"] == COMPLETED
+        assert queue.pool._pool is not None
+        assert queue.store.results(job["id"], 0, 100) == expected_bodies(REQUESTS)
+
+    def test_cancel_stops_before_the_next_chunk(self, queue, gated):
+        job = queue.submit(REQUESTS)
+        gated.release()
+        while queue.store.get(job["id"])["completed"] == 0:
+            time.sleep(0.01)
+
+        assert queue.cancel(job["id"])["status"] == CANCELLED
+        gated.release()
+
+        while queue.pending:
+            time.sleep(0.01)
+        cancelled = queue.store.get(job["id"])
+        assert cancelled["status"] == CANCELLED and cancelled["completed"] == 4
+        assert queue.store.results(job["id"], 0, 100) == []
+
+    def test_full_queue(self, queue, gated):
+        for _ in range(4):
+            queue.submit(REQUESTS[:1])
+
+        with pytest.raises(JobQueueFull):
+            queue.submit(REQUESTS[:1])
+        assert queue.rejected == 1
+        for _ in range(4):
+            gated.release()
+
+    def test_failures_are_recorded(self, queue, monkeypatch):
+        def broken(chunk):
+            raise RuntimeError("worker lost")
+
+        monkeypatch.setattr(queue, "_score", broken)
+        job = wait(queue.store, queue.submit(REQUESTS)["id"])
+
+        assert job["status"] == FAILED and job["error"] == "worker lost"
+
+    def test_shutdown(self, queue, gated):
+        running = queue.submit(REQUESTS)
+        queued = queue.submit(REQUESTS)
+        while queue.store.get(running["id"])["status"] != RUNNING:
+            time.sleep(0.01)
+
+        queue.shutdown()
+        gated.release()
+
+        assert queue.store.get(queued["id"])["error"] == "Server stopped before the job ran"
+        stopped = wait(queue.store, running["id"])
+        assert stopped["status"] == FAILED and stopped["completed"] == 4
+        gated.release()
+        assert wait(queue.store, queue.submit(REQUESTS[:2])["id"])["status"] == COMPLETED
+
+
+class TestJobsAPI:
+    """Test submitting, polling, paging and cancelling jobs over HTTP."""
+
+    @pytest.fixture
+    def client(self, queue, monkeypatch):
+        monkeypatch.setattr(jobs_api, "job_queue", queue)
+        with TestClient(app) as client:
+            yield client
+
+    @staticmethod
+    def payload(requests):
+        return {"requests": [r.model_dump(exclude_none=True) for r in requests]}
+
+    def test_submit_poll_and_page(self, client, queue):
+        response = client.post("/jobs/", json=self.payload(REQUESTS))
+
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.headers["Location"] == f"/jobs/{job_id}"
+        assert response.json()["total"] == 25
+        wait(queue.store, job_id)
+        assert client.get(f"/jobs/{job_id}").json()["status"] == COMPLETED
+
+        results, offset = [], 0
+        while offset is not None:
+            page = client.get(f"/jobs/{job_id}/results", params={"offset": offset, "limit": 10}).json()
+            results.extend(page["results"])
+            offset = page["next_offset"]
+        assert results == [json.loads(body) for body in expected_bodies(REQUESTS)]
+
+    def test_msgpack_page(self, client, queue):
+        job_id = client.post("/jobs/", json=self.payload(REQUESTS)).json()["job_id"]
+        wait(queue.store, job_id)
+        params = {"offset": 20, "limit": 10}
+
+        packed = client.get(f"/jobs/{job_id}/results", params=params, headers={"Accept": "application/msgpack"})
+
+        assert msgpack.unpackb(packed.content) == client.get(f"/jobs/{job_id}/results", params=params).json()
+
+    def test_progress_stream(self, client, queue, gated):
+        job_id = client.post("/jobs/", json=self.payload(REQUESTS)).json()["job_id"]
+        for _ in range(7):
+            gated.release()
+
+        with client.stream("GET", f"/jobs/{job_id}/events") as response:
+            events = [json.loads(line) for line in response.iter_lines()]
+
+        assert events[-1]["status"] == COMPLETED and events[-1]["completed"] == 25
+        assert [e["completed"] for e in events] == sorted(e["completed"] for e in events)
+
+    def test_cancel_and_delete(self, client, queue, gated):
+        job_id = client.post("/jobs/", json=self.payload(REQUESTS)).json()["job_id"]
+
+        response = client.delete(f"/jobs/{job_id}")
+        gated.release()
+
+        assert response.status_code == 200 and response.json()["status"] == CANCELLED
+        assert client.get(f"/jobs/{job_id}/results").json()["results"] == []
+        assert client.delete(f"/jobs/{job_id}").status_code == 204
+        assert client.get(f"/jobs/{job_id}").status_code == 404
+
+    def test_errors(self, client, queue, gated):
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.get("/jobs/missing/events").status_code == 404
+        unknown = {"requests": [{"current_phase": 1, "grades": [{"course_name": "Alchemy", "grade": 10}]}]}
+        assert client.post("/jobs/", json=unknown).status_code == 422
+
+        for _ in range(4):
+            client.post("/jobs/", json=self.payload(REQUESTS[:1]))
+        full = client.post("/jobs/", json=self.payload(REQUESTS[:1]))
+        assert full.status_code == 429 and full.headers["Retry-After"] == "30"
+        for _ in range(4):
+            gated.release()
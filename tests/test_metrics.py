@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.metrics import ANALYSIS_STAGE, REQUESTS, Counter, Histogram
+
+client = TestClient(app)
+
+
+class TestMetricTypes:
+    """Test histogram/counter bookkeeping and text rendering."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+        child = histogram.labels("a")
+        for value in (0.05, 0.5, 0.5, 5.0):
+            child.observe(value)
+
+        lines = histogram.render()
+        assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{stage="a",le="1.0"} 3' in lines
+        assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+        assert 'test_seconds_count{stage="a"} 4' in lines
+        assert "# TYPE test_seconds histogram" in lines
+
+    def test_labels_are_resolved_once(self):
+        counter = Counter("test_total", "Test.", ("route",))
+        assert counter.labels("/x") is counter.labels("/x")
+
+        counter.labels("/x").inc()
+        counter.labels("/x").inc(2)
+        assert counter.render()[-1] == 'test_total{route="/x"} 3.0'
+
+
+class TestMetricsEndpoint:
+    """Test the /metrics route and what feeds it."""
+
+    def test_records_route_template(self):
+        before = REQUESTS.labels("GET", "/courses/{course_id}", "200").value
+        client.get("/courses/24")
+
+        assert REQUESTS.labels("GET", "/courses/{course_id}", "200").value == before + 1
+
+    def test_analysis_stages_are_timed(self):
+        stages = ("validation", "category_aggregation", "field_scoring", "serialization")
+        before = {stage: ANALYSIS_STAGE.labels(stage).count for stage in stages}
+
+        client.post("/analysis/", json={
+            "current_phase": 2,
+            "grades": [{"course_name": "Scripting", "grade": 13.25}]
+        })
+
+        for stage in stages:
+            assert ANALYSIS_STAGE.labels(stage).count == before[stage] + 1
+
+    def test_prometheus_text(self):
+        client.get("/courses/")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'http_requests_total{method="GET",route="/courses/",status="200"}' in response.text
+        assert "analysis_cache_hits_total" in response.text
+        assert 'http_response_size_bytes_bucket{method="GET",route="/courses/",le="+Inf"}' in response.text
@@ -0,0 +1,145 @@
+import csv
+import gc
+import json
+import weakref
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cli import main
+from app.data.curriculum import CurriculumIndex
+from app.main import app
+from app.models.analysis import GradeInput
+from app.models.records import analysis_to_dict
+from app.services.analysis_service import run_analysis
+from app.services.name_resolver import CourseNameResolver, name_resolver, normalize, resolve_course_name
+from benchmarks.synthetic import make_catalogue
+
+client = TestClient(app)
+
+NAMES = ["Databases", "Data Processing & Analysis", "Programming Fundamentals", "Data Science Fundamentals"]
+
+
+class TestCourseNameResolver:
+    """Test case-insensitive resolution and trigram suggestions."""
+
+    @pytest.mark.parametrize("variant, canonical", [
+        ("databases", "Databases"),
+        ("DATABASES", "Databases"),
+        ("  Databases ", "Databases"),
+        ("Data Processing and Analysis", "Data Processing & Analysis"),
+        ("data processing&analysis", "Data Processing & Analysis"),
+    ])
+    def test_case_and_spacing_variants_resolve(self, variant, canonical):
+        assert CourseNameResolver(NAMES).resolve(variant) == canonical
+
+    def test_normalize(self):
+        assert normalize("  Data\tProcessing   &analysis ") == "data processing and analysis"
+        assert normalize("Ｄａｔａｂａｓｅｓ") == "databases"  # full-width forms
+
+    def test_colliding_names_are_not_resolved(self):
+        resolver = CourseNameResolver(["Ethics", "ETHICS", "Logic"])
+
+        assert resolver.resolve("ethics") is None
+        assert set(resolver.suggest("ethics")[:2]) == {"Ethics", "ETHICS"}
+        assert resolver.resolve("logic") == "Logic"
+
+    def test_typos_are_suggested_not_resolved(self):
+        resolver = CourseNameResolver(NAMES)
+
+        assert resolver.resolve("Databses") is None
+        assert resolver.suggest("Databses")[0] == "Databases"
+        assert resolver.suggest("Data Procesing and Analysis")[0] == "Data Processing & Analysis"
+        assert resolver.suggest("Quantum Basket Weaving") == []
+        assert len(resolver.suggest("Data Fundamentals", limit=2)) == 2
+
+    def test_large_catalogue(self):
+        courses, _ = make_catalogue(20_000)
+        names = [c.course_name for c in courses]
+        resolver = CourseNameResolver(names)
+
+        assert resolver.resolve(names[12345].upper()) == names[12345]
+        assert names[12345] in resolver.suggest(names[12345].replace("Course", "Cuorse"))
+
+    def test_resolver_is_dropped_with_its_catalogue(self):
+        index = CurriculumIndex(*make_catalogue(50))
+        resolver = name_resolver(index)
+        assert name_resolver(index) is resolver
+        assert resolve_course_name(index.courses[0].course_name.upper(), index) == index.courses[0].course_name
+
+        collected = weakref.ref(index), weakref.ref(resolver)
+        del index, resolver
+        gc.collect()
+        assert [ref() for ref in collected] == [None, None]
+
+
+class TestCourseNameValidation:
+    """Test course-name resolution in the endpoints that take course names."""
+
+    def test_case_variants_are_accepted(self):
+        grades = [{"course_name": name, "grade": 14.0} for name in NAMES]
+        variants = [{"course_name": name.lower(), "grade": 14.0} for name in NAMES]
+
+        expected = client.post("/analysis/", json={"current_phase": 2, "grades": grades}).json()
+        response = client.post("/analysis/", json={"current_phase": 2, "grades": variants})
+
+        assert response.status_code == 200
+        assert response.json() == expected
+
+    def test_typo_suggestions_in_validation_error(self):
+        response = client.post("/analysis/", json={
+            "current_phase": 1, "grades": [{"course_name": "Databses", "grade": 14.0}],
+        })
+
+        assert response.status_code == 422
+        message = response.json()["detail"][0]["msg"]
+        assert "Unknown course name: 'Databses'. Did you mean 'Databases'" in message
+
+    def test_no_suggestions(self):
+        response = client.post("/analysis/", json={
+            "current_phase": 1, "grades": [{"course_name": "Alchemy", "grade": 14.0}],
+        })
+
+        assert "Must be one of the courses in the catalogue" in response.json()["detail"][0]["msg"]
+
+    def test_transcript_stream(self):
+        body = b'{"course_name": "databases", "grade": 12}\n{"course_name": "DATABASES", "grade": 16.5}'
+        response = client.post("/analysis/stream", params={"current_phase": 1}, content=body)
+        expected = client.post("/analysis/", json={
+            "current_phase": 1, "grades": [{"course_name": "Databases", "grade": 16.5}],
+        })
+
+        assert response.json() == expected.json()
+        typo = client.post(
+            "/analysis/stream", params={"current_phase": 1}, content=b'{"course_name": "Databses", "grade": 1}'
+        )
+        assert "Did you mean 'Databases'" in typo.json()["detail"][0]["msg"]
+
+    def test_incremental_remove(self):
+        first = client.post("/analysis/incremental", json={
+            "current_phase": 1, "upsert": [{"course_name": "databases", "grade": 14}],
+        }).json()
+        second = client.post("/analysis/incremental", json={
+            "state": first["state"], "remove": ["DATABASES", "Alchemy"],
+        })
+
+        assert second.status_code == 200
+        assert second.json()["category_scores"] == []
+
+    def test_score_command(self, tmp_path):
+        path = tmp_path / "in.csv"
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["student_id", "course_name", "grade", "phase"])
+            writer.writerow(["s1", "databases", "15.0", "1"])
+            writer.writerow(["s1", "PROGRAMMING fundamentals", "13.5", "1"])
+        out = tmp_path / "out.ndjson"
+
+        assert main(["score", str(path), "-o", str(out), "--workers", "0"]) == 0
+        line = json.loads(out.read_text())
+        line.pop("student_id")
+        expected = run_analysis(1, [
+            GradeInput(course_name="Databases", grade=15.0),
+            GradeInput(course_name="Programming Fundamentals", grade=13.5),
+        ])
+        assert line == analysis_to_dict(expected)
@@ -0,0 +1,115 @@
+import asyncio
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.models.analysis import AnalysisRequest, GradeInput
+from app.services import offload
+from app.services.analysis_service import run_analysis, run_analysis_batch
+from app.services.offload import AnalysisPool, PoolSaturated
+
+GRADES = [
+    GradeInput(course_name="Databases", grade=15.0),
+    GradeInput(course_name="Programming Fundamentals", grade=13.0)
+]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = AnalysisPool(max_workers=1, max_queue=0)
+    monkeypatch.setattr(offload, "analysis_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def offload_everything(monkeypatch):
+    monkeypatch.setattr(offload, "settings", replace(
+        settings, analysis_inline_max_grades=0, analysis_inline_max_batch=0
+    ))
+
+
+class TestAnalysisPool:
+    """Test admission control on the process pool."""
+
+    def test_rejects_when_full(self, pool):
+        pool.acquire()
+        with pytest.raises(PoolSaturated):
+            pool.acquire()
+        assert pool.rejected == 1
+
+        pool.release()
+        pool.acquire()
+        pool.release()
+
+    def test_runs_in_worker_process(self, pool):
+        result = asyncio.run(pool.submit(run_analysis, 1, GRADES))
+
+        assert result == run_analysis(1, GRADES)
+        assert pool.in_flight == 0
+
+
+class TestAsyncAnalysis:
+    """Test the inline vs offload split."""
+
+    def test_small_transcript_stays_inline(self, pool):
+        asyncio.run(offload.run_analysis_async(1, GRADES))
+        assert pool._pool is None
+
+    def test_large_transcript_is_offloaded(self, pool, offload_everything):
+        result = asyncio.run(offload.run_analysis_async(2, GRADES))
+
+        assert pool._pool is not None
+        assert result == run_analysis(2, GRADES)
+
+    def test_batch_is_offloaded(self, pool, offload_everything):
+        requests = [AnalysisRequest(current_phase=1, grades=GRADES)] * 3
+        result = asyncio.run(offload.run_analysis_batch_async(requests))
+
+        assert result == run_analysis_batch(requests)
+
+    def test_stream_holds_its_slot_from_the_start(self, pool):
+        requests = [AnalysisRequest(current_phase=1, grades=GRADES)] * 3
+        results = offload.iter_analysis_batch_async(requests, chunk_size=2)
+
+        # Taken before the first result, so a competing stream is refused up front
+        assert pool.in_flight == 1
+        with pytest.raises(PoolSaturated):
+            offload.iter_analysis_batch_async(requests)
+
+        async def collect():
+            return [result async for result in results]
+
+        assert asyncio.run(collect()) == run_analysis_batch(requests)
+        assert pool.in_flight == 0
+
+        offload.iter_analysis_batch_async(requests)
+        assert pool.in_flight == 0  # never iterated, released when dropped
+
+
+class TestBackpressure:
+    """Test that a saturated pool answers 429."""
+
+    payload = {"current_phase": 1, "grades": [{"course_name": "Databases", "grade": 15.0}]}
+
+    def test_analysis_returns_429(self, pool, offload_everything):
+        pool.acquire()
+        try:
+            response = TestClient(app).post("/analysis/", json=self.payload)
+        finally:
+            pool.release()
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+
+    def test_stream_returns_429_before_starting(self, pool):
+        pool.acquire()
+        try:
+            response = TestClient(app).post("/analysis/batch?stream=true", json={"requests": [self.payload]})
+        finally:
+            pool.release()
+
+        assert response.status_code == 429
@@ -0,0 +1,234 @@
+import asyncio
+import gc
+import json
+import threading
+import weakref
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.encoding import dump_json
+from app.config import settings
+from app.data.catalogue_file import write_catalogue_file
+from app.data.courses import COURSES
+from app.data.fields import FIELDS
+from app.data.programs import ProgramRegistry, UnknownProgram, get_program_index, programs
+from app.data.snapshot import write_snapshot
+from app.main import app
+from app.models.analysis import AnalysisRequest, GradeInput, SimulatedCourse
+from app.models.records import analysis_to_dict
+from app.services import offload
+from app.services.analysis_service import run_analysis, run_analysis_batch
+from app.services.offload import AnalysisPool
+from app.services.simulation import simulate
+from benchmarks.synthetic import make_catalogue, make_grades
+
+client = TestClient(app)
+
+ALPHA_COURSES, ALPHA_FIELDS = make_catalogue(60, n_fields=6)
+BETA_COURSES = COURSES[:20]
+
+
+@pytest.fixture
+def programs_dir(tmp_path, monkeypatch):
+    write_snapshot(str(tmp_path / "alpha.snapshot"), ALPHA_COURSES, ALPHA_FIELDS)
+    write_catalogue_file(str(tmp_path / "beta.json"), BETA_COURSES, FIELDS)
+    monkeypatch.setattr(programs, "directory", str(tmp_path))
+    programs.clear()
+    yield tmp_path
+    programs.clear()
+
+
+class TestProgramRegistry:
+    """Test lazy loading and LRU/idle eviction of programme catalogues."""
+
+    def test_loads_on_first_use(self, programs_dir):
+        assert programs.loaded() == []
+
+        alpha = programs.get("alpha")
+        assert programs.loaded() == ["alpha"]
+        assert programs.get("alpha") is alpha
+        assert [c.course_name for c in alpha.index.courses] == [c.course_name for c in ALPHA_COURSES]
+        assert [c.course_name for c in programs.get("beta").index.courses] == [c.course_name for c in BETA_COURSES]
+
+    @pytest.mark.parametrize("program_id", ["gamma", "../beta", "beta.json", ""])
+    def test_unknown_programs(self, programs_dir, program_id):
+        with pytest.raises(UnknownProgram):
+            programs.get(program_id)
+        assert programs.loaded() == []
+
+    def test_least_recently_used_is_evicted(self, programs_dir):
+        registry = ProgramRegistry(str(programs_dir), max_loaded=1, idle_ttl=600)
+        alpha = registry.get("alpha")
+        registry.get("beta")
+
+        assert registry.loaded() == ["beta"]
+        assert registry.evictions == 1
+        assert registry.get("alpha") is not alpha
+
+    def test_idle_programs_are_evicted(self, programs_dir):
+        registry = ProgramRegistry(str(programs_dir), max_loaded=8, idle_ttl=0)
+        registry.get("alpha")
+        registry.get("beta")
+
+        assert registry.loaded() == ["beta"]
+
+    def test_derived_structures_go_with_the_programme(self, programs_dir):
+        registry = ProgramRegistry(str(programs_dir), max_loaded=1, idle_ttl=600)
+        built = []
+        alpha = registry.get("alpha")
+        first = alpha.derived("courses", lambda: built.append(1) or object())
+
+        assert alpha.derived("courses", object) is first
+        registry.get("beta")
+        registry.get("alpha").derived("courses", lambda: built.append(1) or object())
+        assert len(built) == 2
+
+    def test_evicted_programmes_can_be_collected(self, programs_dir):
+        requests = [AnalysisRequest(program="alpha", current_phase=3, grades=make_grades(ALPHA_COURSES, 10))]
+        run_analysis_batch(requests)
+        index = weakref.ref(get_program_index("alpha"))
+
+        programs.clear()
+        gc.collect()
+        assert index() is None
+
+    def test_concurrent_requests_load_once(self, programs_dir):
+        registry = ProgramRegistry(str(programs_dir), max_loaded=8, idle_ttl=600)
+        loaded = []
+        threads = [threading.Thread(target=lambda: loaded.append(registry.get("alpha"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert registry.loads == 1
+        assert all(program is loaded[0] for program in loaded)
+
+
+class TestProgramCourses:
+    """Test GET /courses with a programme."""
+
+    def test_lists_only_the_programme(self, programs_dir):
+        response = client.get("/courses/", params={"program": "alpha", "phase": 1})
+
+        assert response.status_code == 200
+        assert [c["course_name"] for c in response.json()] == [
+            c.course_name for c in ALPHA_COURSES if c.phase == 1
+        ]
+        assert programs.loaded() == ["alpha"]
+        assert client.get("/courses/").json()[0]["course_name"] == COURSES[0].course_name
+
+    def test_etags_differ_between_programmes(self, programs_dir):
+        alpha = client.get("/courses/", params={"program": "alpha"})
+        beta = client.get("/courses/", params={"program": "beta"})
+
+        assert alpha.headers["etag"] != beta.headers["etag"]
+        response = client.get("/courses/", params={"program": "alpha"}, headers={"If-None-Match": alpha.headers["etag"]})
+        assert response.status_code == 304
+
+    def test_course_by_id(self, programs_dir):
+        response = client.get("/courses/1", params={"program": "alpha"})
+        assert response.json()["course_name"] == ALPHA_COURSES[0].course_name
+        assert client.get(f"/courses/{COURSES[-1].id}", params={"program": "beta"}).status_code == 404
+
+    def test_unknown_programme(self, programs_dir):
+        response = client.get("/courses/", params={"program": "gamma"})
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Program not found"
+        assert client.get("/courses/1", params={"program": "gamma"}).status_code == 404
+
+
+class TestProgramAnalysis:
+    """Test POST /analysis and batches against programme catalogues."""
+
+    def payload(self, program, grades, phase=3):
+        return {"program": program, "current_phase": phase, "grades": [g.model_dump() for g in grades]}
+
+    def test_scores_against_the_programme(self, programs_dir):
+        grades = make_grades(ALPHA_COURSES, 12)
+        response = client.post("/analysis/", json=self.payload("alpha", grades))
+
+        assert response.status_code == 200
+        expected = run_analysis(3, grades, index=get_program_index("alpha"))
+        assert [fs["field"] for fs in response.json()["field_signals"]] == [
+            fs.field for fs in expected["field_signals"]
+        ]
+        assert programs.loaded() == ["alpha"]
+
+    def test_courses_of_other_programmes_are_rejected(self, programs_dir):
+        grades = [GradeInput(course_name=ALPHA_COURSES[0].course_name, grade=14)]
+
+        assert client.post("/analysis/", json=self.payload("beta", grades)).status_code == 422
+        assert client.post("/analysis/", json=self.payload(None, grades)).status_code == 422
+
+    def test_unknown_programme(self, programs_dir):
+        grades = [GradeInput(course_name=COURSES[0].course_name, grade=14)]
+        response = client.post("/analysis/", json=self.payload("gamma", grades))
+
+        assert response.status_code == 422
+        errors = response.json()["detail"]
+        assert len(errors) == 1 and "Unknown program" in errors[0]["msg"]
+
+    def test_mixed_batch_matches_single_requests(self, programs_dir):
+        requests = [
+            AnalysisRequest(program="alpha", current_phase=3, grades=make_grades(ALPHA_COURSES, 10, seed=1)),
+            AnalysisRequest(current_phase=3, grades=[GradeInput(course_name=COURSES[0].course_name, grade=12)]),
+            AnalysisRequest(program="beta", current_phase=2, grades=make_grades(BETA_COURSES, 6, seed=2)),
+            AnalysisRequest(program="alpha", current_phase=2, grades=make_grades(ALPHA_COURSES, 5, seed=3)),
+        ]
+
+        results = run_analysis_batch(requests)
+        assert results == [
+            run_analysis(r.current_phase, r.grades, index=get_program_index(r.program)) for r in requests
+        ]
+
+    def test_incremental_uses_the_programme(self, programs_dir):
+        grades = make_grades(ALPHA_COURSES, 10, seed=4)
+        index = get_program_index("alpha")
+        first = client.post("/analysis/incremental", json={
+            "program": "alpha", "current_phase": 3, "upsert": [g.model_dump() for g in grades],
+        }).json()
+        state = first.pop("state")
+        assert first == analysis_to_dict(run_analysis(3, grades, index=index))
+
+        removed = {"program": "alpha", "state": state, "remove": [grades[0].course_name]}
+        second = client.post("/analysis/incremental", json=removed).json()
+        second.pop("state")
+        assert second == analysis_to_dict(run_analysis(3, grades[1:], index=index))
+
+        # A state cannot be replayed against another programme
+        for program in (None, "beta"):
+            response = client.post("/analysis/incremental", json={**removed, "program": program})
+            assert response.status_code == 400
+
+    def test_simulation_uses_the_programme(self, programs_dir):
+        grades = make_grades(ALPHA_COURSES, 6, seed=5)
+        graded = {g.course_name for g in grades}
+        course = next(c for c in ALPHA_COURSES if c.course_name not in graded)
+        payload = {
+            "program": "alpha", "current_phase": 3, "grades": [g.model_dump() for g in grades],
+            "simulate": [{"course_name": course.course_name}],
+        }
+
+        response = client.post("/analysis/simulate", json=payload)
+
+        assert response.status_code == 200
+        expected = simulate(3, grades, [SimulatedCourse(course_name=course.course_name)],
+                            index=get_program_index("alpha"))
+        assert response.json() == json.loads(dump_json(expected))
+        assert client.post("/analysis/simulate", json={**payload, "program": None}).status_code == 422
+
+    def test_worker_processes_load_the_programme(self, programs_dir, monkeypatch):
+        monkeypatch.setenv("PROGRAMS_DIR", str(programs_dir))
+        pool = AnalysisPool(max_workers=1, max_queue=1)
+        monkeypatch.setattr(offload, "analysis_pool", pool)
+        monkeypatch.setattr(offload, "settings", replace(settings, analysis_inline_max_grades=0))
+        grades = make_grades(ALPHA_COURSES, 8)
+        try:
+            result = asyncio.run(offload.run_analysis_async(3, grades, program="alpha"))
+        finally:
+            pool.shutdown()
+
+        assert result == run_analysis(3, grades, index=get_program_index("alpha"))
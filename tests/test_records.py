@@ -0,0 +1,32 @@
+import json
+
+from app.data.courses import COURSES
+from app.data.curriculum import get_curriculum_index
+from app.models.analysis import AnalysisResponse, GradeInput
+from app.models.course import Course
+from app.models.records import CourseRecord, analysis_to_dict
+from app.services.analysis_service import run_analysis
+
+
+class TestRecords:
+    """Test the internal __slots__ records against the API models."""
+
+    def test_course_record_round_trips_through_course_model(self):
+        record = CourseRecord.from_course(COURSES[0], 0)
+
+        assert not hasattr(record, "__dict__")
+        assert Course.model_validate(record) == COURSES[0]
+        assert record.to_dict() == COURSES[0].model_dump(mode="json")
+
+    def test_records_compare_by_value(self):
+        assert CourseRecord.from_course(COURSES[0], 0) == CourseRecord.from_course(COURSES[0], 0)
+        assert CourseRecord.from_course(COURSES[0], 0) != CourseRecord.from_course(COURSES[1], 1)
+
+    def test_analysis_to_dict_matches_response_model(self):
+        index = get_curriculum_index()
+        grades = [GradeInput(course_name=c.course_name, grade=14.0) for c in index.eligible_courses(2)[:6]]
+        result = run_analysis(2, grades)
+
+        data = json.loads(json.dumps(analysis_to_dict(result)))
+        assert AnalysisResponse.model_validate(data) == AnalysisResponse.model_validate(result)
+        assert "course_ids" not in data["category_scores"][0]
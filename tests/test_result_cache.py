@@ -0,0 +1,96 @@
+import time
+
+from app.data.courses import COURSES
+from app.data.curriculum import get_curriculum_index, reload_curriculum
+from app.models.analysis import GradeInput
+from app.services import analysis_service
+from app.services.analysis_service import run_analysis, run_analysis_cached
+from app.services.result_cache import AnalysisResultCache, transcript_fingerprint
+
+
+class TestTranscriptFingerprint:
+    """Test canonical transcript keys."""
+
+    def test_order_independent(self):
+        a = [GradeInput(course_name="Databases", grade=15.0), GradeInput(course_name="Scripting", grade=12.0)]
+        assert transcript_fingerprint(1, a, "v1") == transcript_fingerprint(1, a[::-1], "v1")
+
+    def test_duplicates_collapse_to_last_grade(self):
+        a = [GradeInput(course_name="Databases", grade=10.0), GradeInput(course_name="Databases", grade=15.0)]
+        b = [GradeInput(course_name="Databases", grade=15.0)]
+        assert transcript_fingerprint(1, a, "v1") == transcript_fingerprint(1, b, "v1")
+
+    def test_phase_grade_and_version_matter(self):
+        a = [GradeInput(course_name="Databases", grade=15.0)]
+        b = [GradeInput(course_name="Databases", grade=15.5)]
+        key = transcript_fingerprint(1, a, "v1")
+        assert key != transcript_fingerprint(2, a, "v1")
+        assert key != transcript_fingerprint(1, b, "v1")
+        assert key != transcript_fingerprint(1, a, "v2")
+
+
+class TestAnalysisResultCache:
+    """Test LRU/TTL behaviour and counters."""
+
+    def test_hit_and_miss(self):
+        cache = AnalysisResultCache(max_size=2, ttl=60)
+        assert cache.get("a") is None
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = AnalysisResultCache(max_size=2, ttl=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size"] == 2
+
+    def test_ttl_expiry(self):
+        cache = AnalysisResultCache(max_size=2, ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_zero_size_disables(self):
+        cache = AnalysisResultCache(max_size=0, ttl=60)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+
+
+class TestRunAnalysisCached:
+    """Test the memoized analysis entry point."""
+
+    grades = [GradeInput(course_name="Databases", grade=15.0)]
+
+    def setup_method(self):
+        analysis_service.result_cache.clear()
+
+    def test_repeat_is_a_hit(self):
+        first = run_analysis_cached(1, self.grades)
+        hits = analysis_service.result_cache.hits
+        second = run_analysis_cached(1, self.grades)
+
+        assert analysis_service.result_cache.hits == hits + 1
+        assert second == first == run_analysis(1, self.grades)
+        assert second is not first
+
+    def test_catalogue_change_invalidates(self):
+        run_analysis_cached(1, self.grades)
+        version = get_curriculum_index().version
+        try:
+            reload_curriculum(courses=COURSES[:-1])
+            assert get_curriculum_index().version != version
+            misses = analysis_service.result_cache.misses
+            run_analysis_cached(1, self.grades)
+            assert analysis_service.result_cache.misses == misses + 1
+        finally:
+            reload_curriculum(courses=COURSES)
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.courses import COURSES
+from app.main import app
+from app.models.analysis import GradeInput, SimulatedCourse
+from app.services.analysis_service import run_analysis
+from app.services.simulation import SimulationError, _grid, simulate
+
+client = TestClient(app)
+
+GRADES = [
+    GradeInput(course_name=c.course_name, grade=round(random.Random(c.id).uniform(8, 17), 1))
+    for c in COURSES if c.phase <= 2
+]
+SECURITY_PHASE_3 = ["Cyber Resilience", "Hacking AI Systems", "Privacy & Security by Design"]
+
+
+def brute_force(grades, names, grade):
+    """run_analysis with every simulated course at `grade`."""
+    transcript = [g for g in grades if g.course_name not in names]
+    transcript += [GradeInput(course_name=name, grade=grade) for name in names]
+    return {fs.field: fs for fs in run_analysis(3, transcript)["field_signals"]}
+
+
+class TestSimulate:
+    """Test the vectorized grade sweep against run_analysis."""
+
+    def test_required_grade_matches_brute_force(self):
+        simulated = [SimulatedCourse(course_name=name) for name in SECURITY_PHASE_3]
+        result = simulate(3, GRADES, simulated, fields=["Cybersecurity"])
+
+        (field,) = result["fields"]
+        assert field["field"] == "Cybersecurity"
+        assert field["required_grade"]["Consistent"] is not None
+        for level, threshold in (("Consistent", 11), ("Strong", 14)):
+            required = field["required_grade"][level]
+            if required is None:
+                assert brute_force(GRADES, SECURITY_PHASE_3, 20)["Cybersecurity"].score < threshold
+                continue
+            assert brute_force(GRADES, SECURITY_PHASE_3, required)["Cybersecurity"].signal_strength in (level, "Strong")
+            below = brute_force(GRADES, SECURITY_PHASE_3, round(required - 0.01, 2))["Cybersecurity"]
+            assert below.signal_strength not in (level, "Strong")
+
+    def test_ranges_match_run_analysis_at_the_bounds(self):
+        simulated = [
+            SimulatedCourse(course_name="DevOps", min_grade=9.5, max_grade=14),
+            SimulatedCourse(course_name="Machine Learning & Forecasting", min_grade=12, max_grade=18.25),
+        ]
+        result = simulate(3, GRADES, simulated)
+        low = run_analysis(3, GRADES + [GradeInput(course_name=s.course_name, grade=s.min_grade) for s in simulated])
+        high = run_analysis(3, GRADES + [GradeInput(course_name=s.course_name, grade=s.max_grade) for s in simulated])
+        low_scores = {fs.field: fs for fs in low["field_signals"]}
+        high_scores = {fs.field: fs for fs in high["field_signals"]}
+
+        assert {f["field"] for f in result["fields"]} == set(low_scores)
+        for field in result["fields"]:
+            assert field["min_score"] == low_scores[field["field"]].score
+            assert field["max_score"] == high_scores[field["field"]].score
+            assert field["max_signal"] == high_scores[field["field"]].signal_strength
+            assert field["evidence_level"] == high_scores[field["field"]].evidence_level
+
+    def test_unreachable_and_already_reached(self):
+        strong = [GradeInput(course_name=c.course_name, grade=19) for c in COURSES if c.category == "Security"]
+        result = simulate(3, strong, [SimulatedCourse(course_name="Hacking AI Systems", min_grade=15)], ["Cybersecurity"])
+        assert result["fields"][0]["required_grade"] == {"Consistent": 15.0, "Strong": 15.0}
+
+        result = simulate(3, [], [SimulatedCourse(course_name="Hacking AI Systems", max_grade=10)], ["Cybersecurity"])
+        assert result["fields"][0]["required_grade"] == {"Consistent": None, "Strong": None}
+
+    def test_current_scores(self):
+        result = simulate(3, GRADES, [SimulatedCourse(course_name="DevOps")])
+        current = {fs.field: fs.score for fs in run_analysis(3, GRADES)["field_signals"]}
+        assert {f["field"]: f["current_score"] for f in result["fields"]} == current
+
+    def test_rejects_courses_beyond_phase(self):
+        with pytest.raises(SimulationError, match="phase 3"):
+            simulate(2, GRADES, [SimulatedCourse(course_name="DevOps")])
+
+    def test_grid(self):
+        grid = _grid(12.345, 12.4)
+        assert grid.tolist() == [12.345, 12.35, 12.36, 12.37, 12.38, 12.39, 12.4]
+        assert len(_grid(0, 20)) == 2001
+
+
+class TestSimulateEndpoint:
+    """Test POST /analysis/simulate."""
+
+    def test_simulate(self):
+        response = client.post("/analysis/simulate", json={
+            "current_phase": 3,
+            "grades": [g.model_dump() for g in GRADES],
+            "simulate": [{"course_name": name} for name in SECURITY_PHASE_3],
+            "fields": ["Cybersecurity"],
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert [f["field"] for f in body["fields"]] == ["Cybersecurity"]
+        assert set(body["fields"][0]["required_grade"]) == {"Consistent", "Strong"}
+        assert any(c["category"] == "Security" for c in body["categories"])
+
+    @pytest.mark.parametrize("payload", [
+        {"current_phase": 3, "simulate": []},
+        {"current_phase": 3, "simulate": [{"course_name": "Basket Weaving"}]},
+        {"current_phase": 3, "simulate": [{"course_name": "DevOps", "min_grade": 15, "max_grade": 12}]},
+        {"current_phase": 2, "simulate": [{"course_name": "DevOps"}]},
+        {"current_phase": 3, "simulate": [{"course_name": "DevOps"}], "fields": ["Astrology"]},
+    ])
+    def test_invalid(self, payload):
+        assert client.post("/analysis/simulate", json=payload).status_code == 422
@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.data.courses import COURSES
+from app.main import app
+from app.models.analysis import GradeInput
+from app.services import analysis_service, offload
+from app.services.analysis_service import analysis_flight, result_cache, run_analysis, run_analysis_cached
+from app.services.single_flight import SingleFlight
+
+client = TestClient(app)
+
+GRADES = [GradeInput(course_name=c.course_name, grade=14.5) for c in COURSES[:12]]
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class TestSingleFlightThreads:
+    """Test coalescing of blocking calls from threads."""
+
+    def test_identical_calls_share_one_computation(self):
+        flight = SingleFlight(max_waiters=16)
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait()
+            return {"value": 42}
+
+        with ThreadPoolExecutor(8) as pool:
+            futures = [pool.submit(flight.do, "k", fn) for _ in range(8)]
+            wait_until(lambda: flight.coalesced == 7)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert flight.stats() == {"in_flight": 0, "max_waiters": 16, "leaders": 1, "coalesced": 7, "overflow": 0}
+
+    def test_waiter_limit(self):
+        flight = SingleFlight(max_waiters=2)
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait()
+            return len(calls)
+
+        with ThreadPoolExecutor(5) as pool:
+            futures = [pool.submit(flight.do, "k", fn) for _ in range(5)]
+            wait_until(lambda: flight.coalesced + flight.overflow == 4)
+            release.set()
+            [f.result() for f in futures]
+
+        assert len(calls) == 3
+        assert (flight.coalesced, flight.overflow) == (2, 2)
+
+    def test_errors_reach_every_waiter_and_are_not_kept(self):
+        flight = SingleFlight(max_waiters=8)
+        release = threading.Event()
+
+        def fail():
+            release.wait()
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(3) as pool:
+            futures = [pool.submit(flight.do, "k", fail) for _ in range(3)]
+            wait_until(lambda: flight.coalesced == 2)
+            release.set()
+            for future in futures:
+                with pytest.raises(ValueError, match="boom"):
+                    future.result()
+
+        assert flight.do("k", lambda: "fresh") == "fresh"
+
+    def test_disabled(self):
+        flight = SingleFlight(max_waiters=0)
+        assert flight.do("k", lambda: 1) == 1
+        assert flight.stats()["leaders"] == 0
+
+
+class TestSingleFlightAsync:
+    """Test coalescing of coroutines on the event loop."""
+
+    def test_identical_calls_share_one_task(self):
+        flight = SingleFlight(max_waiters=16)
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        async def main():
+            return await asyncio.gather(*(flight.do_async("k", fn) for _ in range(10)))
+
+        results = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert (flight.coalesced, flight.in_flight) == (9, 0)
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight(max_waiters=16)
+
+        async def fn():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def main():
+            leader = asyncio.ensure_future(flight.do_async("k", fn))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do_async("k", fn))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower, leader.cancelled()
+
+        assert asyncio.run(main()) == ("done", True)
+
+    def test_waiter_limit(self):
+        flight = SingleFlight(max_waiters=3)
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def main():
+            return await asyncio.gather(*(flight.do_async("k", fn) for _ in range(6)))
+
+        asyncio.run(main())
+        assert len(calls) == 3
+        assert (flight.coalesced, flight.overflow) == (3, 2)
+
+
+class TestAnalysisCoalescing:
+    """Test coalescing in front of run_analysis on the threadpool and pool paths."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        result_cache.clear()
+        yield
+        result_cache.clear()
+
+    def test_threadpool_path(self, monkeypatch):
+        release = threading.Event()
+        calls = []
+
+        def slow_run_analysis(*args, **kwargs):
+            calls.append(1)
+            release.wait()
+            return run_analysis(*args, **kwargs)
+
+        monkeypatch.setattr(analysis_service, "run_analysis", slow_run_analysis)
+        before = analysis_flight.coalesced
+        with ThreadPoolExecutor(6) as pool:
+            futures = [pool.submit(run_analysis_cached, 3, GRADES) for _ in range(6)]
+            wait_until(lambda: analysis_flight.coalesced - before == 5)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert len(calls) == 1
+        assert all(r == run_analysis(3, GRADES) for r in results)
+        # Every caller gets its own top-level dict
+        assert len({id(r) for r in results}) == 6
+
+    def test_pool_path(self, monkeypatch):
+        submitted = []
+
+        class FakePool:
+            async def submit(self, fn, *args):
+                submitted.append(args)
+                await asyncio.sleep(0.01)
+                return fn(*args)
+
+        monkeypatch.setattr(offload, "analysis_pool", FakePool())
+        monkeypatch.setattr(offload, "settings", replace(settings, analysis_inline_max_grades=0))
+        before = analysis_flight.coalesced
+
+        async def main():
+            return await asyncio.gather(*(offload.run_analysis_async(3, GRADES) for _ in range(20)))
+
+        results = asyncio.run(main())
+        assert len(submitted) == 1
+        assert all(r == run_analysis(3, GRADES) for r in results)
+        assert analysis_flight.coalesced - before == 19
+        assert "analysis_coalesced_total" in client.get("/metrics").text
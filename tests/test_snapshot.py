@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.cli import main
+from app.data.catalogue_file import write_catalogue_file
+from app.data.courses import COURSES
+from app.data.curriculum import CurriculumIndex, get_curriculum_index
+from app.data.fields import FIELDS
+from app.data.snapshot import SnapshotError, read_snapshot, write_snapshot
+from app.models.analysis import GradeInput
+from app.services.analysis_service import run_analysis
+from benchmarks.synthetic import make_catalogue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestSnapshot:
+    """Test writing and reading catalogue snapshots."""
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "catalogue.snapshot")
+
+        version = write_snapshot(path, COURSES, FIELDS)
+        index = read_snapshot(path)
+
+        assert version == index.version == get_curriculum_index().version
+        assert index.courses == get_curriculum_index().courses
+        assert index.fields == FIELDS
+        grades = [GradeInput(course_name=COURSES[0].course_name, grade=15)]
+        assert run_analysis(3, grades, index=index) == run_analysis(3, grades)
+
+    def test_version_is_the_content_hash(self, tmp_path):
+        courses, fields = make_catalogue(300, n_fields=20)
+        path = str(tmp_path / "catalogue.snapshot")
+
+        write_snapshot(path, courses, fields)
+        assert read_snapshot(path).version == CurriculumIndex(courses, fields).version
+
+    @pytest.mark.parametrize("content", [b"", b"not a pickle", b"\x80\x05N."])
+    def test_invalid_snapshots(self, tmp_path, content):
+        path = tmp_path / "catalogue.snapshot"
+        path.write_bytes(content)
+
+        with pytest.raises(SnapshotError):
+            read_snapshot(str(path))
+
+    def test_build_snapshot_command(self, tmp_path):
+        builtin = str(tmp_path / "builtin.snapshot")
+        assert main(["build-snapshot", builtin]) == 0
+        assert read_snapshot(builtin).version == get_curriculum_index().version
+
+        courses, fields = make_catalogue(100, n_fields=10)
+        source = str(tmp_path / "catalogue.json")
+        write_catalogue_file(source, courses, fields)
+        snapshot = str(tmp_path / "catalogue.snapshot")
+        assert main(["build-snapshot", snapshot, "--from", source]) == 0
+        assert len(read_snapshot(snapshot).courses) == 100
+
+
+class TestColdStart:
+    """Test what a fresh worker process loads."""
+
+    def run(self, code, **env):
+        return subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, env={**os.environ, **env},
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+
+    def test_heavy_modules_are_imported_lazily(self):
+        loaded = self.run(
+            "import sys, app.main; print(*[m in sys.modules for m in ('numpy', 'sqlalchemy', 'app.data.image')])"
+        )
+        assert loaded == ["False", "False", "False"]
+
+    def test_snapshot_startup_skips_builtin_catalogue(self, tmp_path):
+        path = str(tmp_path / "catalogue.snapshot")
+        version = write_snapshot(path, COURSES, FIELDS)
+
+        output = self.run(
+            "import sys, app.main\n"
+            "from app.data.curriculum import get_curriculum_index\n"
+            "print('app.data.courses' in sys.modules, get_curriculum_index().version)",
+            CATALOGUE_SNAPSHOT=path,
+        )
+        assert output == ["False", version]
@@ -0,0 +1,134 @@
+import json
+import random
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.courses import COURSES
+from app.data.curriculum import get_curriculum_index
+from app.main import app
+from app.services.transcript_stream import MAX_LINE_BYTES, RecordError, TranscriptStream
+
+client = TestClient(app)
+
+
+def records(n, seed=3):
+    rng = random.Random(seed)
+    return [
+        {"course_name": rng.choice(COURSES).course_name, "grade": round(rng.uniform(4, 20), 1)}
+        for _ in range(n)
+    ]
+
+
+def ndjson(grades):
+    return "\n".join(json.dumps(g) for g in grades).encode()
+
+
+class TestTranscriptStream:
+    """Test folding NDJSON records into a transcript."""
+
+    def test_chunk_boundaries_do_not_matter(self):
+        body = ndjson(records(40)) + b"\n"
+        whole = TranscriptStream(get_curriculum_index())
+        whole.feed(body)
+        whole.close()
+        split = TranscriptStream(get_curriculum_index())
+        for i in range(len(body)):
+            split.feed(body[i:i + 1])
+        split.close()
+
+        assert split.grades == whole.grades
+        assert split.records == whole.records == 40
+
+    def test_last_grade_wins(self):
+        stream = TranscriptStream(get_curriculum_index())
+        stream.feed(b'{"course_name": "Databases", "grade": 9}\n\n{"course_name": "Databases", "grade": 16}')
+        stream.close()
+
+        assert stream.grades == {"Databases": 16}
+        assert [(g.course_name, g.grade) for g in stream.transcript()] == [("Databases", 16)]
+
+    @pytest.mark.parametrize("body, loc, message", [
+        (b'{"course_name": "Databases", "grade": 9}\n{"course_name": "Nope", "grade": 9}', ["body", 2, "course_name"],
+         "Unknown course name: 'Nope'"),
+        (b'{"course_name": "Databases", "grade": 21}', ["body", 1, "grade"], "less than or equal to 20"),
+        (b'{"course_name": "Databases"', ["body", 1], "Invalid JSON"),
+        (b'{"grade": 3}', ["body", 1, "course_name"], "Field required"),
+    ])
+    def test_invalid_records(self, body, loc, message):
+        stream = TranscriptStream(get_curriculum_index())
+        with pytest.raises(RecordError) as raised:
+            stream.feed(body)
+            stream.close()
+
+        error = raised.value.errors[0]
+        assert list(error["loc"]) == loc
+        assert message in error["msg"]
+
+    def test_overlong_line(self):
+        stream = TranscriptStream(get_curriculum_index())
+        with pytest.raises(RecordError, match="longer than"):
+            stream.feed(b" " * (MAX_LINE_BYTES + 1))
+
+    def test_memory_does_not_grow_with_the_upload(self):
+        line = json.dumps({"course_name": COURSES[0].course_name, "grade": 12.5}).encode() + b"\n"
+        chunk = line * 2000
+        stream = TranscriptStream(get_curriculum_index())
+
+        tracemalloc.start()
+        try:
+            for _ in range(50):  # 100k records, about 5 MB
+                stream.feed(chunk)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        assert stream.records == 100_000
+        assert peak < 2 * len(chunk) + 256 * 1024
+
+
+class TestStreamAnalysisAPI:
+    """Test POST /analysis/stream against POST /analysis."""
+
+    def test_matches_analysis(self):
+        grades = records(300)
+        expected = client.post("/analysis/", json={"current_phase": 3, "grades": grades}).json()
+        response = client.post(
+            "/analysis/stream", params={"current_phase": 3}, content=ndjson(grades),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == expected
+
+    def test_options(self):
+        grades = records(50, seed=9)
+        options = {"top_k": 2, "detail": "categories"}
+        expected = client.post("/analysis/", json={"current_phase": 2, "grades": grades, **options}).json()
+        response = client.post("/analysis/stream", params={"current_phase": 2, **options}, content=ndjson(grades))
+
+        assert response.json() == expected
+        assert len(response.json()["field_signals"]) == 2
+
+    def test_chunked_upload(self):
+        grades = records(120, seed=4)
+        body = ndjson(grades)
+
+        def chunks():
+            for i in range(0, len(body), 97):
+                yield body[i:i + 97]
+
+        response = client.post("/analysis/stream", params={"current_phase": 3}, content=chunks())
+        assert response.json() == client.post("/analysis/", json={"current_phase": 3, "grades": grades}).json()
+
+    def test_invalid_record(self):
+        response = client.post("/analysis/stream", params={"current_phase": 3}, content=b'{"course_name": "Nope", "grade": 3}')
+
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", 1, "course_name"]
+
+    def test_invalid_parameters(self):
+        assert client.post("/analysis/stream", content=b"").status_code == 422
+        assert client.post("/analysis/stream", params={"current_phase": 3, "program": "nope"}).status_code == 422
+        assert client.post("/analysis/stream", params={"current_phase": 3, "top_k": 0}).status_code == 422